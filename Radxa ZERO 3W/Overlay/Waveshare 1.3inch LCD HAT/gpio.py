@@ -1,4 +1,5 @@
-import gpiod
+import errno
+import os
 import time
 import signal
 import sys
@@ -76,73 +77,126 @@ def draw_button_state(name, pressed):
         elif name == "KEY3":
             draw.rectangle((key_x - key_width // 2, key_y[2], key_x + key_width // 2, key_y[2] + key_height), outline=(255,255,255), fill=color)
 
-# 将图像转换为 RGB565 格式，确保字节序正确
-def rgb_to_rgb565(image):
-    result = bytearray()
-    for pixel in image.getdata():
-        r, g, b = pixel[:3]
-        red = (r >> 3) & 0x1F
-        green = (g >> 2) & 0x3F
-        blue = (b >> 3) & 0x1F
-        rgb565 = (red << 11) | (green << 5) | blue
-        result.append(rgb565 & 0xFF)
-        result.append((rgb565 >> 8) & 0xFF)
-    return result
+# 将图像转换为 RGB565 格式并输出到帧缓冲
+# 优先复用 Pi Tool Python 中的向量化编码器和mmap帧缓冲，单独拷贝本脚本时退回逐帧打开写入
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Pi Tool Python'))
+try:
+    from framebuffer import FrameBuffer
+except ImportError:
+    def rgb_to_rgb565(image):
+        result = bytearray()
+        for pixel in image.getdata():
+            r, g, b = pixel[:3]
+            red = (r >> 3) & 0x1F
+            green = (g >> 2) & 0x3F
+            blue = (b >> 3) & 0x1F
+            rgb565 = (red << 11) | (green << 5) | blue
+            result.append(rgb565 & 0xFF)
+            result.append((rgb565 >> 8) & 0xFF)
+        return result
+
+    class FrameBuffer:
+        def __init__(self, path="/dev/fb0", width=WIDTH, height=HEIGHT):
+            self.path = path
+
+        def show(self, image):
+            with open(self.path, "wb") as fb:
+                fb.write(rgb_to_rgb565(image))
+
+        def close(self):
+            pass
+
+fb = FrameBuffer("/dev/fb0", WIDTH, HEIGHT)
+
+# 优先复用 Pi Tool Python 中的按键输入：启用本目录的-keys overlay时gpio-keys占用了全部按键引脚，
+# 此时gpiod申请引脚会返回EBUSY，只能读取/dev/input/event*；单独拷贝本脚本时直接使用gpiod
+try:
+    from keys import open_keys
+except ImportError:
+    open_keys = None
+
+keys = None
 
 def signal_handler(sig, frame):
     print("\n脚本已停止")
     draw_background()
-    byte_data = rgb_to_rgb565(image)
-    with open("/dev/fb0", "wb") as fb:
-        fb.write(byte_data)
-    for chip in chips.values():
-        chip.close()
+    fb.show(image)
+    fb.close()
+    close_buttons()
     sys.exit(0)
 
 # 注册信号处理函数
 signal.signal(signal.SIGTSTP, signal_handler)
 
+def close_buttons():
+    if keys is not None:
+        keys.close()
+    for chip in chips.values():
+        chip.close()
+
+# 使用gpiod申请按键引脚，引脚被gpio-keys驱动占用时给出说明
+def request_gpiod_lines():
+    import gpiod
+    for name, (chip_name, pin) in buttons.items():
+        if chip_name not in chips:
+            chips[chip_name] = gpiod.Chip(chip_name)
+        line = chips[chip_name].get_line(pin)
+        try:
+            line.request(consumer='button_test', type=gpiod.LINE_REQ_DIR_IN, flags=gpiod.LINE_REQ_FLAG_BIAS_PULL_UP)
+        except OSError as e:
+            if e.errno == errno.EBUSY:
+                raise SystemExit(f"按钮 {name}（{chip_name} {pin}）的引脚已被占用：radxa-zero3-waveshare13-lcd-hat-keys overlay"
+                                 f"中的gpio-keys驱动会占用全部按键引脚，请与 Pi Tool Python 放在一起运行本脚本（读取evdev），"
+                                 f"或换用radxa-zero3-waveshare13-lcd-hat overlay")
+            raise
+        lines[name] = line
+        prev_values[name] = line.get_value()
+
+# 读取各按钮当前是否按下，状态变化时输出
+def read_button_states():
+    if keys is not None:
+        for event in keys.read_events(0.1):
+            print(f"按钮 {event.name} 被{'按下' if event.pressed else '松开'}")
+        return keys.pressed
+    states = {}
+    for name, line in lines.items():
+        current_value = line.get_value()
+        if current_value != prev_values[name]:
+            if current_value == 0:  # 按钮被按下
+                print(f"按钮 {name} 被按下")
+            else:  # 按钮被松开
+                print(f"按钮 {name} 被松开")
+            prev_values[name] = current_value
+        states[name] = current_value == 0
+    time.sleep(0.1)
+    return states
+
 def detect_button_press():
+    global keys
     try:
         # 初始绘制背景
         draw_background()
-        # 获取GPIO芯片和引脚
-        for name, (chip_name, pin) in buttons.items():
-            if chip_name not in chips:
-                chips[chip_name] = gpiod.Chip(chip_name)
-            line = chips[chip_name].get_line(pin)
-            line.request(consumer='button_test', type=gpiod.LINE_REQ_DIR_IN, flags=gpiod.LINE_REQ_FLAG_BIAS_PULL_UP)
-            lines[name] = line
-            prev_values[name] = line.get_value()
+        # 打开按键输入（PI_TOOL_INPUT与 Pi Tool Python 相同）
+        if open_keys is not None:
+            keys = open_keys(buttons, os.environ.get('PI_TOOL_INPUT', 'auto'))
+        else:
+            request_gpiod_lines()
 
         while True:
-            # 先重绘背景，清除所有按钮状态
+            states = read_button_states()
+            # 先重绘背景，清除所有按钮状态，再根据按钮的当前状态绘制按钮
             draw_background()
-            # 检测每个按钮的状态并绘制
-            for name, line in lines.items():
-                current_value = line.get_value()
-                if current_value != prev_values[name]:
-                    if current_value == 0:  # 按钮被按下
-                        print(f"按钮 {name} 被按下")
-                    else:  # 按钮被松开
-                        print(f"按钮 {name} 被松开")
-                    prev_values[name] = current_value
-                # 根据按钮的当前状态绘制按钮
-                draw_button_state(name, current_value == 0)
+            for name, pressed in states.items():
+                draw_button_state(name, pressed)
             # 将图像转换为 RGB565 格式并写入帧缓冲设备
-            byte_data = rgb_to_rgb565(image)
-            with open("/dev/fb0", "wb") as fb:
-                fb.write(byte_data)
-            time.sleep(0.1)
+            fb.show(image)
 
     except KeyboardInterrupt:
         print("\n测试结束")
         draw_background()  # 恢复初始背景
-        byte_data = rgb_to_rgb565(image)
-        with open("/dev/fb0", "wb") as fb:
-            fb.write(byte_data)
-        for chip in chips.values():
-            chip.close()
+        fb.show(image)
+        fb.close()
+        close_buttons()
 
 if __name__ == "__main__":
     detect_button_press()
\ No newline at end of file
@@ -0,0 +1,170 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+
+from harness import load_tool, tool_dir
+
+import rgb565
+from pages import PageScheduler
+
+ROUNDS = 50
+PRESSES = 30
+
+# 编码器吞吐量测试的重复次数（纯Python实现很慢，单独设置）
+ENCODER_ROUNDS = {'numpy': 200, 'pillow': 200, 'python': 3}
+
+# 按键延迟测试：按下前等待的随机时间（秒），模拟主循环阻塞在等待按键中的任意时刻
+PRESS_DELAY = (0.01, 0.05)
+PRESS_HOLD = 0.03
+
+
+# 各页面整帧的渲染、编码、写入耗时（毫秒）
+def bench_pages(tool):
+    fb = tool.fb
+    results = {}
+    for page_id, page in tool.PAGES.items():
+        tool.current_page = page_id
+        render = encode = write = 0.0
+        for _ in range(ROUNDS):
+            fb._last_raw = None  # 强制整帧编码和写入
+            fb.encode_time = 0.0
+            start = time.perf_counter()
+            image = page.render()
+            rendered = time.perf_counter()
+            fb.show(image)
+            shown = time.perf_counter()
+            render += rendered - start
+            encode += fb.encode_time
+            write += shown - rendered - fb.encode_time
+        results[page.name] = {
+            'render_ms': render / ROUNDS * 1000,
+            'encode_ms': encode / ROUNDS * 1000,
+            'write_ms': write / ROUNDS * 1000,
+            'total_ms': (render + encode + write) / ROUNDS * 1000,
+        }
+    tool.current_page = 0
+    return results
+
+
+# 编码器吞吐量（帧/秒、MB/秒），使用真实页面图像
+def bench_encoders(tool):
+    tool.current_page = 0
+    image = tool.PAGES[0].render()
+    pixels = image.width * image.height
+    results = {}
+    for name, func in rgb565.ENCODERS.items():
+        rounds = ENCODER_ROUNDS.get(name, 10)
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(image)
+        elapsed = (time.perf_counter() - start) / rounds
+        results[name] = {
+            'ms_per_frame': elapsed * 1000,
+            'fps': 1 / elapsed,
+            'mpixels_per_sec': pixels / elapsed / 1e6,
+        }
+    return results
+
+
+# 模拟按键到画面更新的延迟：另一个线程按下按键，主循环和tool.main()一样等待按键、处理、重绘并写入
+def bench_latency(tool, fake):
+    tool.current_page = 3
+    scheduler = PageScheduler()
+    page = tool.PAGES[tool.current_page]
+    tool.fb.show(page.render())
+    scheduler.rendered(page, time.monotonic())
+
+    latencies = []
+    for i in range(PRESSES):
+        name = 'Down' if i % 2 == 0 else 'Up'
+        pressed_at = []
+
+        def press():
+            time.sleep(random.uniform(*PRESS_DELAY))
+            pressed_at.append(time.monotonic())
+            fake.press(name)
+            time.sleep(PRESS_HOLD)
+            fake.release(name)
+
+        before = tool.fb.read_frame()
+        thread = threading.Thread(target=press)
+        thread.start()
+        while True:
+            events = tool.keys.read_events(1.0)
+            if events:
+                scheduler.notify_input()
+            tool.handle_button_press(events)
+            page = tool.PAGES[tool.current_page]
+            now = time.monotonic()
+            if scheduler.due(page, now):
+                tool.fb.show(page.render())
+                scheduler.rendered(page, now)
+            if tool.fb.read_frame() != before:
+                latencies.append((time.monotonic() - pressed_at[0]) * 1000)
+                break
+        thread.join()
+        tool.keys.read_events(0)  # 丢弃松开事件
+
+    latencies.sort()
+    return {
+        'presses': len(latencies),
+        'debounce_ms': tool.keys.debounce * 1000,
+        'median_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1],
+        'max_ms': latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="无开发板的帧耗时测试")
+    parser.add_argument('--json', metavar='PATH', help="把结果写入JSON文件（- 表示标准输出）")
+    args = parser.parse_args()
+
+    os.chdir(tool_dir)  # 字体和cmd.json使用相对路径
+
+    # tool.py的调试输出不计入结果
+    with contextlib.redirect_stdout(io.StringIO()):
+        tool, fake = load_tool()
+        results = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'encoder': rgb565.ENCODER,
+            'pages': bench_pages(tool),
+            'encoders': bench_encoders(tool),
+            'latency': bench_latency(tool, fake),
+        }
+        tool.keys.close()
+        tool.fb.close()
+
+    if args.json == '-':
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    print(f"{'page':<10}{'render ms':>11}{'encode ms':>11}{'write ms':>10}{'total ms':>10}")
+    for name, stage in results['pages'].items():
+        print(f"{name:<10}{stage['render_ms']:>11.3f}{stage['encode_ms']:>11.3f}{stage['write_ms']:>10.3f}{stage['total_ms']:>10.3f}")
+    print()
+    print(f"{'encoder':<10}{'ms/frame':>10}{'fps':>10}{'Mpx/s':>10}")
+    for name, encoder in results['encoders'].items():
+        print(f"{name:<10}{encoder['ms_per_frame']:>10.3f}{encoder['fps']:>10.1f}{encoder['mpixels_per_sec']:>10.2f}")
+    print()
+    latency = results['latency']
+    print(f"按键到画面延迟（消抖窗口 {latency['debounce_ms']:.0f} ms）: 中位数 {latency['median_ms']:.1f} ms, "
+          f"P95 {latency['p95_ms']:.1f} ms, 最大 {latency['max_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+# 允许从 bench 目录直接运行
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+import tool
+
+ROUNDS = 500
+
+PAGES = [
+    ('system', tool.update_system_display),
+    ('network', tool.update_network_display),
+    ('wifi', tool.update_wifi_list_display),
+    ('command', tool.update_command_display),
+    ('password', tool.update_password_input_display),
+]
+
+
+# 密码输入页光标每帧在当前行内移动一个键：缓存时只重绘原来的键和新选中的键
+def move_password_cursor():
+    row = tool.keyboard_layout[tool.selected_key_row]
+    tool.selected_key_col = (tool.selected_key_col + 1) % len(row)
+    return tool.update_password_input_display()
+
+
+# 每帧都重新绘制静态背景，密码输入页不复用上一帧
+def render_uncached(render):
+    tool.backgrounds.clear()
+    tool.keyboard_view = None
+    return render()
+
+
+def bench(func, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(*args)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main():
+    tool.load_font()
+    tool.sampler.start()
+    tool.load_commands()
+
+    # 静态背景：每帧绘制 vs 从缓存复制
+    print(f"{'layer':<10}{'draw ms':>13}{'copy ms':>11}{'saved ms':>10}{'saved':>8}")
+    for name in tool.PAGE_BACKGROUNDS:
+        draw = bench(tool.PAGE_BACKGROUNDS[name])
+        copy = bench(tool.page_background, name)
+        print(f"{name:<10}{draw * 1000:>13.3f}{copy * 1000:>11.3f}{(draw - copy) * 1000:>10.3f}{(draw - copy) / draw:>8.0%}")
+    print()
+
+    # 整页渲染：每帧重绘背景 vs 使用背景缓存（password内容不变时直接复用上一帧，pw-cursor为光标移动时的增量重绘）
+    print(f"{'page':<10}{'uncached ms':>13}{'cached ms':>11}{'saved ms':>10}{'saved':>8}")
+    for name, render in PAGES + [('pw-cursor', move_password_cursor)]:
+        uncached = bench(render_uncached, render)
+        tool.backgrounds.clear()
+        tool.keyboard_view = None
+        cached = bench(render)
+        saved = uncached - cached
+        print(f"{name:<10}{uncached * 1000:>13.3f}{cached * 1000:>11.3f}{saved * 1000:>10.3f}{saved / uncached:>8.0%}")
+    print(f"背景缓存命中 {tool.backgrounds.hits} 次，未命中 {tool.backgrounds.misses} 次")
+    print(f"文字缓存: {tool.text_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import time
+
+# 允许从 bench 目录直接运行
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(current_dir))
+
+import netinfo
+
+ROUNDS = 50
+
+
+# 原实现：通过 ip route 获取网关
+def legacy_get_gateway():
+    try:
+        result = subprocess.run(['ip', 'route'], stdout=subprocess.PIPE)
+        routes = result.stdout.decode().split('\n')
+        for route in routes:
+            if 'default' in route:
+                gateway = route.split()[2]
+                return gateway
+        return "N/A"
+    except:
+        return "N/A"
+
+
+# 原实现：通过 iwconfig 和 echo -e 获取无线网络信息
+def legacy_get_wireless_info():
+    try:
+        output = subprocess.check_output(['iwconfig', 'wlan0'])
+        output = output.decode('utf-8', errors='replace')
+
+        essid_start = output.find('ESSID:"') + 7
+        essid_end = output.find('"', essid_start)
+        essid = output[essid_start:essid_end]
+
+        try:
+            decoded_essid = subprocess.check_output(['echo', '-e', essid])
+            decoded_essid = decoded_essid.decode('utf-8').strip()
+        except:
+            decoded_essid = essid
+
+        if all(c in '0123456789abcdefABCDEF' for c in decoded_essid):
+            decoded_essid = netinfo.hex_to_chinese(decoded_essid)
+
+        bit_rate_start = output.find('Bit Rate=') + 9
+        bit_rate_end = output.find(' ', bit_rate_start)
+        bit_rate = output[bit_rate_start:bit_rate_end] + ' Mb/s'
+
+        link_quality_start = output.find('Link Quality=') + 13
+        link_quality_end = output.find(' ', link_quality_start)
+        link_quality = output[link_quality_start:link_quality_end]
+
+        signal_level_start = output.find('Signal level=') + 13
+        signal_level_end = output.find(' ', signal_level_start)
+        signal_level = output[signal_level_start:signal_level_end] + ' dBm'
+
+        return {
+            'essid': decoded_essid,
+            'bit_rate': bit_rate,
+            'link_quality': link_quality,
+            'signal_level': signal_level
+        }
+    except:
+        return {
+            'essid': "N/A",
+            'bit_rate': "N/A",
+            'link_quality': "N/A",
+            'signal_level': "N/A"
+        }
+
+
+def bench(func):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func()
+    return (time.perf_counter() - start) / ROUNDS, result
+
+
+def main():
+    cases = [
+        ('gateway', legacy_get_gateway, netinfo.get_gateway),
+        ('wireless', legacy_get_wireless_info, netinfo.get_wireless_info),
+    ]
+    print(f"{'call':<10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, before, after in cases:
+        before_time, before_result = bench(before)
+        after_time, after_result = bench(after)
+        print(f"{name:<10}{before_time * 1000:>12.3f}{after_time * 1000:>12.3f}{before_time / after_time:>9.1f}x")
+        if before_result != after_result:
+            print(f"  before: {before_result}")
+            print(f"  after:  {after_result}")
+
+
+if __name__ == "__main__":
+    main()
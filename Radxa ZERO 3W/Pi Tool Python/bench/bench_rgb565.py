@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+from PIL import Image
+
+# 允许从 bench 目录直接运行
+current_dir = os.path.dirname(os.path.abspath(__file__))
+tool_dir = os.path.dirname(current_dir)
+sys.path.insert(0, tool_dir)
+
+import rgb565
+
+# 每种实现的重复次数（纯Python实现很慢，单独设置）
+ROUNDS = {'numpy': 50, 'pillow': 50, 'python': 3}
+
+
+# 收集用于测试的真实页面图像
+def collect_images():
+    images = {}
+    splash = Image.open(os.path.join(tool_dir, 'meimo.png')).resize((240, 240), Image.LANCZOS)
+    images['splash'] = splash
+
+    try:
+        import tool
+    except ImportError as e:
+        print(f"无法导入tool.py（{e}），只测试启动图片")
+        return images
+
+    tool.load_font()
+    tool.sampler.start()
+    images['system'] = tool.update_system_display()
+    images['network'] = tool.update_network_display()
+    images['wifi'] = tool.update_wifi_list_display()
+    images['command'] = tool.update_command_display()
+    images['password'] = tool.update_password_input_display()
+    return images
+
+
+def bench(func, image, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(image)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    images = collect_images()
+    print(f"{'page':<10}{'encoder':<10}{'ms/frame':>10}{'speedup':>10}  identical")
+    for page, image in images.items():
+        reference = rgb565.rgb_to_rgb565_python(image)
+        baseline = bench(rgb565.rgb_to_rgb565_python, image, ROUNDS['python'])
+        for name, func in rgb565.ENCODERS.items():
+            if name == 'python':
+                elapsed = baseline
+            else:
+                elapsed = bench(func, image, ROUNDS[name])
+            identical = func(image) == reference
+            print(f"{page:<10}{name:<10}{elapsed * 1000:>10.2f}{baseline / elapsed:>9.1f}x  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+
+# 允许从 bench 目录直接运行
+current_dir = os.path.dirname(os.path.abspath(__file__))
+tool_dir = os.path.dirname(current_dir)
+sys.path.insert(0, tool_dir)
+
+from framebuffer import FileFrameBuffer
+from keys import FakeGpiod, GpiodKeys
+from netinfo import format_wireless
+from wifi import parse_scan
+
+# 模拟的命令输出，保证每次测试的画面内容一致
+CANNED_WIRELESS_STATS = {
+    'essid': 'Radxa-Lab',
+    'bit_rate': 72200000,
+    'link_quality': 58,
+    'link_quality_max': 70,
+    'signal_level': -52,
+}
+CANNED_WIRELESS_INFO = format_wireless(CANNED_WIRELESS_STATS)
+CANNED_IP_ADDRESS = '192.168.1.123'
+CANNED_GATEWAY = '192.168.1.1'
+CANNED_IWLIST = ''.join(
+    f'''          Cell {i + 1:02d} - Address: 00:11:22:33:44:{i:02X}
+                    Channel:{1 + i % 11}
+                    Quality={60 - i * 3}/70  Signal level={-40 - i * 4} dBm
+                    Encryption key:on
+                    ESSID:"{ssid}"
+                    IE: IEEE 802.11i/WPA2 Version 1
+'''
+    for i, ssid in enumerate(['Radxa-Lab', 'Office', 'Guest', 'Printer', 'IoT', 'Cafe', 'Home-5G', 'Mesh', 'Lab-2G'])
+)
+
+
+# 记录编码耗时的帧缓冲：写入时间 = show()总耗时 - 编码耗时
+class TimedFrameBuffer(FileFrameBuffer):
+    def __init__(self, path, width=240, height=240):
+        super().__init__(path, width, height)
+        self.encode_time = 0.0
+
+    def _encode_rows(self, image, top, bottom, buffer, offset):
+        start = time.perf_counter()
+        super()._encode_rows(image, top, bottom, buffer, offset)
+        self.encode_time += time.perf_counter() - start
+
+
+# 打开内存中的帧缓冲：优先使用memfd，不支持时使用临时文件
+def open_framebuffer(width=240, height=240):
+    if hasattr(os, 'memfd_create'):
+        fd = os.memfd_create('pi-tool-fb')
+        fb = TimedFrameBuffer(f'/proc/self/fd/{fd}', width, height)
+        os.close(fd)
+        return fb
+    return TimedFrameBuffer(os.path.join(current_dir, 'fb.raw'), width, height)
+
+
+# 在没有开发板的环境中导入tool.py：模拟按键、帧缓冲和命令输出
+def load_tool():
+    import tool
+
+    tool.load_font()
+
+    # 网络信息使用固定的采样结果
+    tool.sampler.groups['netinfo'][1] = lambda: {
+        'wifi': dict(CANNED_WIRELESS_STATS),
+        'addresses': {'wlan0': (CANNED_IP_ADDRESS,)},
+        'gateway': CANNED_GATEWAY,
+    }
+
+    # Wi-Fi列表使用固定的扫描结果
+    networks = parse_scan(CANNED_IWLIST)
+    tool.wifi_scanner.connected = CANNED_WIRELESS_INFO['essid']
+    tool.wifi_scanner.networks = [n for n in networks if n.ssid != tool.wifi_scanner.connected]
+    tool.wifi_scanner.scanned_at = time.time()
+    tool.wifi_scanner.ttl = float('inf')
+    tool.wifi_scanner.version += 1
+    tool.sync_wifi_list()
+
+    # 系统指标只采样一次，不启动后台线程
+    for name in list(tool.sampler.groups):
+        tool.sampler.sample(name)
+
+    tool.load_commands()
+
+    fake = FakeGpiod(tool.buttons)
+    tool.keys = GpiodKeys(tool.buttons, gpiod=fake)
+    tool.fb = open_framebuffer(tool.WIDTH, tool.HEIGHT)
+    return tool, fake
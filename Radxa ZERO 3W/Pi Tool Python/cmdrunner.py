@@ -0,0 +1,202 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+
+# 命令默认超时（秒），cmd.json中可以为单个命令单独设置
+COMMAND_TIMEOUT = 60
+
+# 同时运行的命令数上限
+MAX_RUNNING = 2
+
+# 每次运行保留的输出行数，以及单行的最大字节数（超出部分作为新的一行）
+OUTPUT_LINES = 200
+LINE_MAX = 1024
+
+# 超时或取消时先发送SIGTERM，等待这么久（秒）仍未退出再发送SIGKILL
+KILL_GRACE = 2
+
+# 等待命令结束时检查取消请求的间隔（秒）
+WAIT_INTERVAL = 0.2
+
+# 运行状态
+RUN_RUNNING = 'running'
+RUN_DONE = 'done'  # 正常退出（返回码可能非0）
+RUN_TIMEOUT = 'timeout'
+RUN_CANCELLED = 'cancelled'
+RUN_ERROR = 'error'  # 无法启动
+
+
+# 固定容量的行环形缓冲区：写满后覆盖最旧的行，内存占用不随输出量增长
+# 行用累计序号定位，total为累计写入的行数，first()为仍保留的最旧一行的序号
+class LineRing:
+    def __init__(self, capacity=OUTPUT_LINES):
+        self.capacity = capacity
+        self.total = 0
+        self._lines = [None] * capacity
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            self._lines[self.total % self.capacity] = line
+            self.total += 1
+
+    def first(self):
+        return max(0, self.total - self.capacity)
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    # 读取从序号start开始的最多count行（已被覆盖的行跳过）
+    def lines(self, start, count):
+        with self._lock:
+            start = max(start, self.first())
+            end = min(start + count, self.total)
+            return [self._lines[i % self.capacity] for i in range(start, end)]
+
+    def __iter__(self):
+        return iter(self.lines(0, self.capacity))
+
+
+# cmd.json中命令的写法：字符串，或 {"cmd": "...", "timeout": 秒}
+def command_spec(value):
+    if isinstance(value, dict) and isinstance(value.get('cmd'), str):
+        return value['cmd'], float(value.get('timeout', COMMAND_TIMEOUT))
+    if isinstance(value, str):
+        return value, COMMAND_TIMEOUT
+    raise ValueError("命令必须是字符串或包含cmd的对象")
+
+
+# 一次命令运行
+class CommandRun:
+    def __init__(self, name, cmd, timeout):
+        self.name = name
+        self.cmd = cmd
+        self.timeout = timeout
+        self.state = RUN_RUNNING
+        self.returncode = None
+        self.error = ""
+        self.output = LineRing(OUTPUT_LINES)  # 合并后的标准输出和标准错误，只保留最后若干行
+        self.started_at = time.monotonic()
+        self.finished_at = None
+        self.proc = None
+        self._cancel = threading.Event()
+
+    # 已运行或运行了多久（秒）
+    def duration(self):
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def running(self):
+        return self.state == RUN_RUNNING
+
+
+# 后台命令执行：每个命令在工作线程中运行，界面只读取运行状态
+# 同一命令运行中不会重复启动，同时运行的命令数有上限
+class CommandRunner:
+    def __init__(self, max_running=MAX_RUNNING):
+        self.max_running = max_running
+        self.runs = {}  # 命令名称 -> 最近一次运行
+        self.version = 0  # 运行状态每次变化加1
+        self.notify = None  # 运行状态变化后的回调（如唤醒主循环）
+        self._lock = threading.Lock()
+
+    # 正在运行的命令数
+    def running(self):
+        return sum(1 for run in self.runs.values() if run.running())
+
+    # 启动命令，已在运行或达到并发上限时返回None
+    def run(self, name, cmd, timeout=COMMAND_TIMEOUT):
+        with self._lock:
+            current = self.runs.get(name)
+            if current is not None and current.running():
+                return None
+            if self.running() >= self.max_running:
+                return None
+            run = CommandRun(name, cmd, timeout)
+            self.runs[name] = run
+            self.version += 1
+        if self.notify is not None:
+            self.notify()
+        threading.Thread(target=self._worker, args=(run,), name='command', daemon=True).start()
+        return run
+
+    # 取消正在运行的命令
+    def cancel(self, name):
+        run = self.runs.get(name)
+        if run is None or not run.running():
+            return False
+        run._cancel.set()
+        return True
+
+    # 结束所有正在运行的命令（退出程序时）
+    def shutdown(self):
+        for run in list(self.runs.values()):
+            if run.running():
+                run._cancel.set()
+                self._kill(run.proc, signal.SIGKILL)
+
+    def _finish(self, run, state, returncode=None, error=""):
+        with self._lock:
+            run.state = state
+            run.returncode = returncode
+            run.error = error
+            run.finished_at = time.monotonic()
+            self.version += 1
+        if self.notify is not None:
+            self.notify()
+
+    # 向命令所在进程组发送信号（shell启动的子进程也会收到）
+    @staticmethod
+    def _kill(proc, sig):
+        if proc is None or proc.poll() is not None:
+            return
+        try:
+            os.killpg(proc.pid, sig)
+        except OSError:
+            pass
+
+    def _stop(self, proc):
+        self._kill(proc, signal.SIGTERM)
+        try:
+            proc.wait(KILL_GRACE)
+        except subprocess.TimeoutExpired:
+            self._kill(proc, signal.SIGKILL)
+            proc.wait()
+
+    # 逐行读取命令输出
+    @staticmethod
+    def _reader(run, stream):
+        for line in iter(lambda: stream.readline(LINE_MAX), b''):
+            run.output.append(line.decode('utf-8', errors='replace').rstrip('\n'))
+        stream.close()
+
+    def _worker(self, run):
+        try:
+            # 新建会话，超时或取消时可以结束整个进程组
+            proc = subprocess.Popen(run.cmd, shell=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, start_new_session=True)
+        except OSError as e:
+            self._finish(run, RUN_ERROR, error=str(e))
+            print(f"执行命令 {run.name} 失败: {e}")
+            return
+        run.proc = proc
+        reader = threading.Thread(target=self._reader, args=(run, proc.stdout), name='command-output', daemon=True)
+        reader.start()
+
+        deadline = run.started_at + run.timeout
+        state = RUN_DONE
+        while proc.poll() is None:
+            if run._cancel.wait(WAIT_INTERVAL):
+                state = RUN_CANCELLED
+                self._stop(proc)
+            elif time.monotonic() >= deadline:
+                state = RUN_TIMEOUT
+                self._stop(proc)
+        reader.join(KILL_GRACE)
+        self._finish(run, state, proc.returncode)
+
+        print(f"执行命令: {run.cmd}，状态: {state}，返回码: {proc.returncode}，耗时: {run.duration():.1f} 秒")
+        if run.output:
+            print("输出:\n" + "\n".join(run.output))
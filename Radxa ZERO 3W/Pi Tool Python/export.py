@@ -0,0 +1,267 @@
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+# 连接的读写超时（秒），慢客户端不会一直占用服务线程
+EXPORT_TIMEOUT = 2
+
+# HTTP只允许监听本机地址，未指定地址时使用127.0.0.1
+LOOPBACK_HOSTS = ('127.0.0.1', '::1', 'localhost')
+
+# 指标名称前缀
+PREFIX = 'pi_tool'
+
+
+# 把快照中的namedtuple、只读字典和元组转换为JSON可以表示的值，NaN转换为null
+def plain(value):
+    if hasattr(value, '_asdict'):
+        return {key: plain(item) for key, item in value._asdict().items()}
+    if hasattr(value, 'items'):
+        return {str(key): plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+# Prometheus标签值转义
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Prometheus格式的数值，整数保持完整精度
+def _value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+# Prometheus文本格式：按指标族逐个添加 (标签, 数值)，没有数值的指标族不输出
+class Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def gauge(self, name, help_text, samples):
+        samples = [(labels, value) for labels, value in samples
+                   if value is not None and not (isinstance(value, float) and math.isnan(value))]
+        if not samples:
+            return
+        name = f'{PREFIX}_{name}'
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} gauge')
+        for labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(item)}"' for key, item in labels.items())
+                self.lines.append(f'{name}{{{label_text}}} {_value(value)}')
+            else:
+                self.lines.append(f'{name} {_value(value)}')
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+# 把指标快照转换为Prometheus文本：系统、温度、文件系统、网络、磁盘和Wi-Fi
+def snapshot_exposition(snapshot):
+    out = Exposition()
+    get = snapshot.get
+
+    out.gauge('boot_time_seconds', 'System boot time in seconds since the epoch.', [({}, get('boot_time'))])
+    out.gauge('cpu_usage_percent', 'Total CPU usage.', [({}, get('cpu_percent'))])
+    out.gauge('cpu_core_usage_percent', 'Per-core CPU usage.',
+              [({'core': i}, value) for i, value in enumerate(get('per_cpu', ()))])
+    out.gauge('cpu_temperature_celsius', 'CPU temperature.', [({}, get('cpu_temp_c'))])
+
+    memory = get('memory')
+    if memory is not None:
+        out.gauge('memory_total_bytes', 'Total physical memory.', [({}, memory.total)])
+        out.gauge('memory_available_bytes', 'Memory available without swapping.', [({}, memory.available)])
+        out.gauge('memory_cached_bytes', 'Page cache.', [({}, memory.cached)])
+        out.gauge('memory_usage_percent', 'Memory usage.', [({}, memory.percent)])
+    swap = get('swap')
+    if swap is not None:
+        out.gauge('swap_total_bytes', 'Total swap.', [({}, swap.total)])
+        out.gauge('swap_used_bytes', 'Used swap.', [({}, swap.used)])
+
+    usage = get('mount_usage', {})
+    mounts = [(mount, usage[mount.mountpoint]) for mount in get('mounts', ()) if mount.mountpoint in usage]
+    labels = [{'mountpoint': mount.mountpoint, 'device': mount.device, 'fstype': mount.fstype} for mount, _ in mounts]
+    out.gauge('filesystem_size_bytes', 'Filesystem size.', [(label, u.total) for label, (_, u) in zip(labels, mounts)])
+    out.gauge('filesystem_free_bytes', 'Filesystem free space.', [(label, u.free) for label, (_, u) in zip(labels, mounts)])
+    out.gauge('filesystem_usage_percent', 'Filesystem usage.', [(label, u.percent) for label, (_, u) in zip(labels, mounts)])
+
+    net = [(name, rates) for name, rates in sorted(get('net_rates', {}).items()) if rates is not None]
+    for field, name, help_text in [
+        ('rx_bytes', 'network_receive_bytes_per_second', 'Received bytes per second.'),
+        ('tx_bytes', 'network_transmit_bytes_per_second', 'Transmitted bytes per second.'),
+        ('rx_packets', 'network_receive_packets_per_second', 'Received packets per second.'),
+        ('tx_packets', 'network_transmit_packets_per_second', 'Transmitted packets per second.'),
+    ]:
+        out.gauge(name, help_text, [({'interface': interface}, rates[field]) for interface, rates in net])
+    out.gauge('network_address_info', 'IPv4 addresses of each interface.',
+              [({'interface': interface, 'address': address}, 1)
+               for interface, addresses in sorted(get('addresses', {}).items()) for address in addresses])
+    gateway = get('gateway')
+    if gateway and gateway != "N/A":
+        out.gauge('network_gateway_info', 'Default gateway.', [({'gateway': gateway}, 1)])
+
+    disks = [(name, rates) for name, rates in sorted(get('disk_rates', {}).items()) if rates is not None]
+    for field, name, help_text, scale in [
+        ('read_bytes', 'disk_read_bytes_per_second', 'Bytes read per second.', 1),
+        ('write_bytes', 'disk_write_bytes_per_second', 'Bytes written per second.', 1),
+        ('read_ops', 'disk_reads_per_second', 'Read operations per second.', 1),
+        ('write_ops', 'disk_writes_per_second', 'Write operations per second.', 1),
+        ('busy_ms', 'disk_busy_ratio', 'Fraction of time the device was busy.', 1000),
+    ]:
+        out.gauge(name, help_text, [({'disk': disk}, rates[field] / scale) for disk, rates in disks])
+
+    wifi = get('wifi')
+    if wifi is not None:
+        out.gauge('wifi_info', 'Connected Wi-Fi network.', [({'essid': wifi['essid']}, 1)])
+        out.gauge('wifi_bit_rate_bits_per_second', 'Wi-Fi bit rate.', [({}, wifi['bit_rate'])])
+        out.gauge('wifi_link_quality_ratio', 'Wi-Fi link quality.',
+                  [({}, wifi['link_quality'] / wifi['link_quality_max'])])
+        out.gauge('wifi_signal_dbm', 'Wi-Fi signal level.', [({}, wifi['signal_level'])])
+
+    own = get('own_process')
+    if own is not None and not get('process_warmup', True):
+        out.gauge('self_cpu_percent', 'CPU usage of this tool (only while the process page is shown).', [({}, own.cpu)])
+    return out.text()
+
+
+# 导出请求：GET /metrics 返回Prometheus文本，GET /metrics.json 返回JSON
+class MetricsHandler(BaseHTTPRequestHandler):
+    timeout = EXPORT_TIMEOUT
+
+    def do_GET(self):
+        path = self.path.partition('?')[0]
+        if path == '/metrics':
+            body, content_type = self.server.exporter.prometheus(), 'text/plain; version=0.0.4; charset=utf-8'
+        elif path == '/metrics.json':
+            body, content_type = self.server.exporter.json(), 'application/json'
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # 不在终端输出访问日志
+    def log_message(self, format, *args):
+        pass
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    # Unix套接字没有客户端地址，BaseHTTPRequestHandler需要一个
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+
+# 指标导出：在后台线程中提供最新的指标快照，只读取快照，不会触发采样，也不会阻塞主循环
+# 同一个快照版本只生成一次输出
+class MetricsExporter:
+    def __init__(self, sampler, instruments=None):
+        self.sampler = sampler
+        self.instruments = instruments  # 启用耗时统计时在/metrics中一起输出
+        self._servers = []
+        self._socket_paths = []
+        self._cache = {}  # 格式 -> (快照版本, 输出)
+        self._lock = threading.Lock()
+
+    def _cached(self, kind, build):
+        version = self.sampler.version
+        with self._lock:
+            cached = self._cache.get(kind)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        body = build(self.sampler.snapshot)
+        with self._lock:
+            self._cache[kind] = (version, body)
+        return body
+
+    def prometheus(self):
+        body = self._cached('prometheus', snapshot_exposition)
+        if self.instruments is not None:
+            body += self.instruments.exposition()
+        return body
+
+    def json(self):
+        return self._cached('json', lambda snapshot: json.dumps(
+            {'time': time.time(), 'metrics': plain(snapshot)}, ensure_ascii=False, default=str))
+
+    def _serve(self, server):
+        server.exporter = self
+        self._servers.append(server)
+        threading.Thread(target=server.serve_forever, name='metrics-export', daemon=True).start()
+
+    # 在Unix套接字上提供HTTP，例如 curl --unix-socket /run/pi-tool-metrics.sock http://localhost/metrics
+    def serve_socket(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        self._serve(_UnixServer(path, MetricsHandler))
+        self._socket_paths.append(path)
+
+    # 在本机地址上提供HTTP
+    def serve_http(self, host, port):
+        if host not in LOOPBACK_HOSTS:
+            raise ValueError(f"指标导出只能监听本机地址: {host}")
+        server_class = _TCPServer
+        if ':' in host:
+            server_class = type('_TCP6Server', (_TCPServer,), {'address_family': socket.AF_INET6})
+        self._serve(server_class((host, port), MetricsHandler))
+
+    def close(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for path in self._socket_paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+# 按配置启用指标导出，未配置时返回None
+# 配置格式：逗号分隔的 socket:<路径> 或 http:[地址:]端口，例如
+#   PI_TOOL_EXPORT=socket:/run/pi-tool-metrics.sock
+#   PI_TOOL_EXPORT=http:127.0.0.1:9101
+def open_exporter(spec, sampler, instruments=None):
+    if not spec:
+        return None
+    exporter = MetricsExporter(sampler, instruments)
+    try:
+        for item in spec.split(','):
+            kind, _, target = item.strip().partition(':')
+            if kind == 'socket' and target:
+                exporter.serve_socket(target)
+            elif kind == 'http' and target:
+                host, _, port = target.rpartition(':')
+                exporter.serve_http(host.strip('[]') or '127.0.0.1', int(port))
+            else:
+                raise ValueError(f"无法识别的指标导出配置: {item}")
+            print(f"指标导出: {item}")
+    except Exception:
+        # 配置错误时关闭已经启动的服务
+        exporter.close()
+        raise
+    return exporter
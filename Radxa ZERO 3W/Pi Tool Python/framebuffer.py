@@ -0,0 +1,259 @@
+import fcntl
+import mmap
+import os
+import struct
+import time
+
+from rgb565 import encode_into, rgb_to_rgb565
+
+# 帧缓冲ioctl命令（linux/fb.h）
+FBIOGET_VSCREENINFO = 0x4600
+FBIOGET_FSCREENINFO = 0x4602
+FBIOPAN_DISPLAY = 0x4606
+
+# fb_var_screeninfo 为160字节，前8个字段依次为
+# xres, yres, xres_virtual, yres_virtual, xoffset, yoffset, bits_per_pixel, grayscale
+VAR_SCREENINFO_SIZE = 160
+VAR_HEAD = struct.Struct('8I')
+
+# fb_fix_screeninfo: id[16], smem_start, smem_len, type, type_aux, visual,
+# xpanstep, ypanstep, ywrapstep, line_length（按本机对齐）
+FIX_HEAD = struct.Struct('16sL4I3HI')
+
+BYTES_PER_PIXEL = 2  # RGB565
+
+
+# 逐行对比前后两帧的原始RGB数据，返回发生变化的行区间 [(起始行, 结束行), ...]
+def damaged_rows(previous, current, row_bytes, height):
+    bands = []
+    start = None
+    for y in range(height):
+        offset = y * row_bytes
+        if previous[offset:offset + row_bytes] != current[offset:offset + row_bytes]:
+            if start is None:
+                start = y
+        elif start is not None:
+            bands.append((start, y))
+            start = None
+    if start is not None:
+        bands.append((start, height))
+    return bands
+
+
+# 合并重叠或相邻的行区间
+def merge_bands(bands):
+    merged = []
+    for top, bottom in sorted(bands):
+        if merged and top <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], bottom))
+        else:
+            merged.append((top, bottom))
+    return merged
+
+
+# 帧缓冲输出：只打开并映射一次/dev/fb0，之后每帧编码到后台缓冲区再一次性提交
+# 驱动支持双倍虚拟高度时，直接编码到不可见的那一页并通过平移切换，避免撕裂
+class FrameBuffer:
+    def __init__(self, path='/dev/fb0', width=240, height=240):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.line_length = width * BYTES_PER_PIXEL
+        self.virtual_height = height
+        self._var_info = None
+
+        self.fd = os.open(path, os.O_RDWR)
+        try:
+            self._probe()
+            self.frame_size = self.line_length * self.height
+            self.pages = 2 if self._var_info and self.virtual_height >= 2 * self.height else 1
+            self.mm = mmap.mmap(self.fd, self.frame_size * self.pages, mmap.MAP_SHARED,
+                                mmap.PROT_READ | mmap.PROT_WRITE)
+        except Exception:
+            os.close(self.fd)
+            raise
+
+        self.back = bytearray(self.frame_size)  # 后台缓冲区
+        self.front_page = 0  # 当前显示的页
+        self._last_raw = None  # 上一帧的原始RGB数据，用于计算变化区域
+        self._last_damage = []  # 上一帧的变化区域（双缓冲时另一页落后一帧）
+
+        # 帧统计
+        self.frames = 0
+        self.skipped = 0  # 与上一帧完全相同而跳过写入的帧数
+        self.bytes_written = 0
+        self._stats_time = time.monotonic()
+        self._stats_frames = 0
+        self._stats_skipped = 0
+        self._stats_bytes = 0
+
+        # 耗时统计回调 observe(阶段, 秒)，为None时不计时
+        self.observe = None
+        self._encode_time = 0.0
+
+    # 读取屏幕参数，普通文件（测试替身）会失败并沿用构造参数
+    def _probe(self):
+        try:
+            var_info = bytearray(fcntl.ioctl(self.fd, FBIOGET_VSCREENINFO, bytes(VAR_SCREENINFO_SIZE)))
+            fix_info = fcntl.ioctl(self.fd, FBIOGET_FSCREENINFO, bytes(VAR_SCREENINFO_SIZE))
+        except OSError:
+            return
+        xres, yres, _, yres_virtual, _, _, bits_per_pixel, _ = VAR_HEAD.unpack_from(var_info)
+        if bits_per_pixel != BYTES_PER_PIXEL * 8:
+            print(f"帧缓冲不是RGB565格式（{bits_per_pixel}bpp），显示可能异常")
+        self.width, self.height = xres, yres
+        self.virtual_height = yres_virtual
+        self.line_length = FIX_HEAD.unpack_from(fix_info)[-1] or xres * BYTES_PER_PIXEL
+        self._var_info = var_info
+
+    # 把图像中指定行区间编码为RGB565写入缓冲区，行宽带填充时按行展开
+    def _encode_rows(self, image, top, bottom, buffer, offset):
+        if (top, bottom) != (0, self.height):
+            image = image.crop((0, top, self.width, bottom))
+        row_bytes = self.width * BYTES_PER_PIXEL
+        if self.line_length == row_bytes:
+            encode_into(image, buffer, offset + top * row_bytes)
+            return
+        data = rgb_to_rgb565(image)
+        for i in range(bottom - top):
+            start = offset + (top + i) * self.line_length
+            buffer[start:start + row_bytes] = data[i * row_bytes:(i + 1) * row_bytes]
+
+    # 编码指定行区间，启用耗时统计时累计编码时间
+    def _encode(self, image, top, bottom, buffer, offset):
+        if self.observe is None:
+            self._encode_rows(image, top, bottom, buffer, offset)
+            return
+        start = time.perf_counter()
+        self._encode_rows(image, top, bottom, buffer, offset)
+        self._encode_time += time.perf_counter() - start
+
+    # 切换显示页，驱动不支持平移时退回单页拷贝
+    def _pan(self, page):
+        var_info = bytearray(self._var_info)
+        struct.pack_into('I', var_info, 5 * 4, page * self.height)  # yoffset
+        try:
+            fcntl.ioctl(self.fd, FBIOPAN_DISPLAY, bytes(var_info))
+        except OSError:
+            self.pages = 1
+            self.front_page = 0
+            return False
+        self.front_page = page
+        return True
+
+    # 计算本帧相对上一帧变化的行区间
+    def _damage(self, image):
+        raw = image.tobytes()
+        if raw == self._last_raw:
+            # 整帧未变化，跳过逐行对比
+            return []
+        if self._last_raw is None:
+            damage = [(0, self.height)]
+        else:
+            damage = damaged_rows(self._last_raw, raw, self.width * 3, self.height)
+        self._last_raw = raw
+        return damage
+
+    # 显示一帧，只编码和写入发生变化的行
+    def show(self, image):
+        show_start = time.perf_counter() if self.observe is not None else 0.0
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        if image.size != (self.width, self.height):
+            image = image.resize((self.width, self.height))
+        damage = self._damage(image)
+        self.frames += 1
+        if not damage:
+            self.skipped += 1
+            return
+
+        if self.pages == 2:
+            # 不可见的那一页落后两帧，需要同时补上上一帧的变化区域
+            page = 1 - self.front_page
+            offset = page * self.frame_size
+            for top, bottom in merge_bands(damage + self._last_damage):
+                self._encode(image, top, bottom, self.mm, offset)
+                self.bytes_written += (bottom - top) * self.line_length
+            if not self._pan(page) and offset:
+                self.mm.move(0, offset, self.frame_size)
+        else:
+            for top, bottom in damage:
+                self._encode(image, top, bottom, self.back, 0)
+                start, end = top * self.line_length, bottom * self.line_length
+                self.mm[start:end] = self.back[start:end]
+                self.bytes_written += end - start
+        self._last_damage = damage
+
+        # 写入时间包含变化区域计算、拷贝和平移
+        if self.observe is not None:
+            self.observe('encode', self._encode_time)
+            self.observe('write', time.perf_counter() - show_start - self._encode_time)
+            self._encode_time = 0.0
+
+    # 直接显示已编码好的RGB565整帧（如缓存的启动图片），下一次show()会整帧重绘
+    def show_rgb565(self, data):
+        row_bytes = self.width * BYTES_PER_PIXEL
+        offset = self.front_page * self.frame_size
+        if self.line_length == row_bytes:
+            self.mm[offset:offset + self.frame_size] = data
+        else:
+            for y in range(self.height):
+                start = offset + y * self.line_length
+                self.mm[start:start + row_bytes] = data[y * row_bytes:(y + 1) * row_bytes]
+        self._last_raw = None
+        self._last_damage = [(0, self.height)]
+        self.frames += 1
+        self.bytes_written += self.frame_size
+
+    # 返回自上次调用以来的帧率、跳过的帧数和每秒写入字节数
+    def stats(self):
+        now = time.monotonic()
+        elapsed = max(now - self._stats_time, 1e-6)
+        result = {
+            'fps': (self.frames - self._stats_frames) / elapsed,
+            'skipped': self.skipped - self._stats_skipped,
+            'bytes_per_sec': (self.bytes_written - self._stats_bytes) / elapsed,
+        }
+        self._stats_time = now
+        self._stats_frames = self.frames
+        self._stats_skipped = self.skipped
+        self._stats_bytes = self.bytes_written
+        return result
+
+    # 读取当前显示的一帧（用于测试与截图）
+    def read_frame(self):
+        offset = self.front_page * self.frame_size
+        return bytes(self.mm[offset:offset + self.frame_size])
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+            os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 基于普通文件的帧缓冲替身，便于在没有ST7789屏幕的环境中测试
+# pages=2时模拟支持双倍虚拟高度的驱动：文件中依次存放两页，平移只记录当前显示的页
+class FileFrameBuffer(FrameBuffer):
+    def __init__(self, path, width=240, height=240, pages=1):
+        self._file_pages = pages
+        with open(path, 'ab') as f:
+            size = width * height * BYTES_PER_PIXEL * pages
+            if f.tell() < size:
+                f.truncate(size)
+        super().__init__(path, width, height)
+
+    def _probe(self):
+        self.virtual_height = self.height * self._file_pages
+        if self._file_pages == 2:
+            self._var_info = bytearray(VAR_SCREENINFO_SIZE)
+
+    def _pan(self, page):
+        self.front_page = page
+        return True
@@ -0,0 +1,147 @@
+import math
+import threading
+from array import array
+
+# 各分辨率的步长（秒）：1秒、1分钟、15分钟
+RESOLUTIONS = (1, 60, 900)
+
+# 每个分辨率保留的点数（与屏幕宽度相同，1像素1个点）
+HISTORY_POINTS = 240
+
+NAN = float('nan')
+
+
+# 固定容量的数值环形缓冲区，使用array存储（每个点4字节），写满后覆盖最旧的点
+# 与LineRing相同，total为累计写入的点数
+class SeriesRing:
+    def __init__(self, capacity=HISTORY_POINTS):
+        self.capacity = capacity
+        self.total = 0
+        self._values = array('f', [NAN]) * capacity
+
+    def append(self, value):
+        self._values[self.total % self.capacity] = value
+        self.total += 1
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    # 最近count个点，从旧到新
+    def last(self, count):
+        count = min(count, len(self))
+        start = self.total - count
+        return [self._values[i % self.capacity] for i in range(start, self.total)]
+
+
+# 一个分辨率：把步长内的采样取平均后写入各指标的环形缓冲区
+class Resolution:
+    def __init__(self, step, capacity):
+        self.step = step
+        self.capacity = capacity
+        self.series = {}  # 指标名称 -> SeriesRing
+        self.epoch = None  # 正在累计的时间段序号
+        self._sums = {}
+        self._counts = {}
+        self._held = {}  # 指标名称 -> (最近一次的值, 有效截止时间)
+
+    def record(self, now, point, hold=0):
+        epoch = int(now // self.step)
+        if self.epoch is None:
+            self.epoch = epoch
+        elif epoch != self.epoch:
+            self._flush(epoch)
+        for name, value in point.items():
+            if name not in self.series:
+                self._add_series(name)
+            self._sums[name] += value
+            self._counts[name] += 1
+            self._held[name] = (value, now + hold)
+
+    # 时间段内没有采样时，采样周期比步长长的指标沿用最近一次的值，其他情况为空点
+    def _held_value(self, name, epoch):
+        value, until = self._held.get(name, (NAN, 0.0))
+        return value if epoch * self.step < until else NAN
+
+    # 新的指标（如第一次采样得到核心数）从当前位置开始，之前的点为空
+    def _add_series(self, name):
+        ring = SeriesRing(self.capacity)
+        others = next(iter(self.series.values()), None)
+        if others is not None:
+            ring.total = others.total
+        self.series[name] = ring
+        self._sums[name] = 0.0
+        self._counts[name] = 0
+
+    # 结束当前时间段；中间没有采样的时间段（如采样线程停顿）写入空点
+    def _flush(self, epoch):
+        gap = min(epoch - self.epoch - 1, self.capacity)
+        for name, ring in self.series.items():
+            count = self._counts[name]
+            ring.append(self._sums[name] / count if count else self._held_value(name, self.epoch))
+            for i in range(gap):
+                ring.append(self._held_value(name, self.epoch + 1 + i))
+            self._sums[name] = 0.0
+            self._counts[name] = 0
+        self.epoch = epoch
+
+    def remove(self, name):
+        if self.series.pop(name, None) is not None:
+            del self._sums[name], self._counts[name]
+            self._held.pop(name, None)
+
+    # 最近count个点，最后一个点为正在累计的时间段的平均值
+    def last(self, name, count):
+        ring = self.series.get(name)
+        if ring is None:
+            return []
+        values = ring.last(count - 1)
+        n = self._counts[name]
+        values.append(self._sums[name] / n if n else self._held_value(name, self.epoch))
+        return values
+
+
+# 指标历史：同时按多个分辨率降采样，每个指标每个分辨率的点数固定，内存占用不随运行时间增长
+class MetricsHistory:
+    def __init__(self, resolutions=RESOLUTIONS, capacity=HISTORY_POINTS):
+        self.resolutions = {step: Resolution(step, capacity) for step in resolutions}
+        self.version = 0  # 每次记录加1
+        self._lock = threading.Lock()
+
+    # 记录一次采样，point为 指标名称 -> 数值，now为time.monotonic()
+    # hold为采样周期：之后hold秒内没有新采样的时间段沿用这次的值
+    def record(self, now, point, hold=0):
+        with self._lock:
+            for resolution in self.resolutions.values():
+                resolution.record(now, point, hold)
+            self.version += 1
+
+    # 指标在某个分辨率下最近count个点（从旧到新，没有数据的点为NaN）
+    def series(self, name, step, count=HISTORY_POINTS):
+        with self._lock:
+            return self.resolutions[step].last(name, count)
+
+    # 删除指标（如已经不存在的网络接口），释放它的环形缓冲区
+    def remove(self, name):
+        with self._lock:
+            for resolution in self.resolutions.values():
+                resolution.remove(name)
+
+    # 已记录的指标名称，按第一次出现的顺序
+    def names(self):
+        with self._lock:
+            return list(next(iter(self.resolutions.values())).series)
+
+
+# 把序列中的有效值缩放到 [0, 1]，low/high为None时按序列中的最小值和最大值缩放
+def normalize(values, low=None, high=None, min_span=1.0):
+    valid = [v for v in values if not math.isnan(v)]
+    if not valid:
+        return [NAN] * len(values)
+    if low is None:
+        low = min(valid)
+    if high is None:
+        high = max(valid)
+    if high - low < min_span:
+        middle = (high + low) / 2
+        low, high = middle - min_span / 2, middle + min_span / 2
+    return [min(1.0, max(0.0, (v - low) / (high - low))) if not math.isnan(v) else NAN for v in values]
@@ -0,0 +1,199 @@
+import bisect
+import os
+import socket
+import threading
+import time
+
+# 主循环各阶段：等待按键、处理按键、后台采样、渲染、RGB565编码、写入帧缓冲
+STAGES = ('sleep', 'input', 'sample', 'render', 'encode', 'write')
+
+# 直方图桶上限（秒）
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# 滚动窗口长度（秒）和分段数
+WINDOW = 60
+SLOTS = 6
+
+# 窗口内输出的分位数
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Prometheus文本文件的写入间隔（秒）
+TEXTFILE_INTERVAL = 15
+
+
+# 滚动直方图：累计计数用于Prometheus直方图，最近WINDOW秒的分段计数用于分位数
+class RollingHistogram:
+    def __init__(self, buckets=BUCKETS, window=WINDOW, slots=SLOTS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.slot_length = window / slots
+        self._epochs = [-1] * slots
+        self._slots = [[0] * (len(buckets) + 1) for _ in range(slots)]
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+        epoch = int(time.monotonic() / self.slot_length)
+        slot = epoch % len(self._slots)
+        if self._epochs[slot] != epoch:
+            self._epochs[slot] = epoch
+            self._slots[slot] = [0] * (len(self.buckets) + 1)
+        self._slots[slot][index] += 1
+
+    # 最近一个窗口内各桶的计数
+    def window(self):
+        oldest = int(time.monotonic() / self.slot_length) - len(self._slots)
+        merged = [0] * (len(self.buckets) + 1)
+        for epoch, counts in zip(self._epochs, self._slots):
+            if epoch > oldest:
+                for i, n in enumerate(counts):
+                    merged[i] += n
+        return merged
+
+    # 窗口内的分位数（所在桶的上限），窗口内没有数据时返回None
+    def quantile(self, q, counts=None):
+        counts = self.window() if counts is None else counts
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+# Prometheus格式的数值
+def _format(value):
+    if value == float('inf'):
+        return '+Inf'
+    return f'{value:.6g}'
+
+
+# 各阶段耗时统计
+class Instruments:
+    def __init__(self, stages=STAGES):
+        self.histograms = {stage: RollingHistogram() for stage in stages}
+        self._running = True
+        self._server = None
+        self._socket_path = None
+
+    # 记录一次阶段耗时（秒）
+    def observe(self, stage, seconds):
+        self.histograms[stage].observe(seconds)
+
+    # 各阶段窗口内的P95（毫秒），用于定期输出
+    def summary(self):
+        result = {}
+        for stage, histogram in self.histograms.items():
+            value = histogram.quantile(0.95)
+            if value is not None:
+                result[stage] = value * 1000
+        return result
+
+    # Prometheus文本格式
+    def exposition(self):
+        lines = [
+            '# HELP pi_tool_stage_seconds Duration of Pi Tool main loop stages.',
+            '# TYPE pi_tool_stage_seconds histogram',
+        ]
+        for stage, histogram in self.histograms.items():
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += n
+                lines.append(f'pi_tool_stage_seconds_bucket{{stage="{stage}",le="{_format(bound)}"}} {cumulative}')
+            lines.append(f'pi_tool_stage_seconds_sum{{stage="{stage}"}} {_format(histogram.sum)}')
+            lines.append(f'pi_tool_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        lines += [
+            f'# HELP pi_tool_stage_window_seconds Stage duration quantiles over the last {WINDOW} s (bucket upper bound).',
+            '# TYPE pi_tool_stage_window_seconds gauge',
+        ]
+        for stage, histogram in self.histograms.items():
+            counts = histogram.window()
+            for q in QUANTILES:
+                value = histogram.quantile(q, counts)
+                if value is not None:
+                    lines.append(f'pi_tool_stage_window_seconds{{stage="{stage}",quantile="{q}"}} {_format(value)}')
+        return '\n'.join(lines) + '\n'
+
+    # 定期把统计写入Prometheus node_exporter的textfile目录（先写临时文件再改名，避免读到一半）
+    def _textfile_worker(self, path, interval):
+        while self._running:
+            try:
+                tmp = f'{path}.{os.getpid()}.tmp'
+                with open(tmp, 'w') as f:
+                    f.write(self.exposition())
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"写入耗时统计失败: {e}")
+            time.sleep(interval)
+
+    # 在Unix套接字上提供统计，每个连接返回一次Prometheus文本
+    def _socket_worker(self, server):
+        while self._running:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    conn.settimeout(1.0)
+                    conn.sendall(self.exposition().encode())
+                except OSError:
+                    pass
+
+    def _spawn(self, target, *args):
+        threading.Thread(target=target, args=args, name='instrument-export', daemon=True).start()
+
+    def export_textfile(self, path, interval=TEXTFILE_INTERVAL):
+        self._spawn(self._textfile_worker, path, interval)
+
+    def export_socket(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(4)
+        self._server = server
+        self._socket_path = path
+        self._spawn(self._socket_worker, server)
+
+    def close(self):
+        self._running = False
+        if self._server is not None:
+            self._server.close()
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+
+
+# 按配置启用耗时统计，未配置时返回None（主循环不做任何统计）
+# 配置格式：逗号分隔的 on（只在帧统计中输出）、textfile:<路径> 或 socket:<路径>，例如
+#   PI_TOOL_INSTRUMENT=socket:/run/pi-tool.sock
+#   PI_TOOL_INSTRUMENT=textfile:/var/lib/node_exporter/textfile_collector/pi_tool.prom
+def open_instruments(spec):
+    if not spec:
+        return None
+    instruments = Instruments()
+    try:
+        for item in spec.split(','):
+            kind, _, path = item.strip().partition(':')
+            if kind == 'textfile' and path:
+                instruments.export_textfile(path)
+            elif kind == 'socket' and path:
+                instruments.export_socket(path)
+            elif kind != 'on':
+                raise ValueError(f"无法识别的耗时统计配置: {item}")
+            print(f"耗时统计: {item}")
+    except Exception:
+        # 配置错误时关闭已经启动的导出
+        instruments.close()
+        raise
+    return instruments
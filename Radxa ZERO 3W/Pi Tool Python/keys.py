@@ -0,0 +1,395 @@
+import errno
+import fcntl
+import glob
+import os
+import select
+import struct
+import time
+from collections import deque, namedtuple
+
+# 按键事件：按键名称、是否按下、时间戳（秒，CLOCK_MONOTONIC）
+KeyEvent = namedtuple('KeyEvent', ['name', 'pressed', 'timestamp'])
+
+# 软件消抖时间（秒）：一次有效跳变之后这段时间内的跳变视为抖动
+DEBOUNCE = 0.02
+
+# 设备树overlay中gpio-keys节点对应的输入设备名称
+EVDEV_NAME = 'buttons_joystick'
+
+# gpio-keys按键码（linux/input-event-codes.h）-> 按键名称
+EVDEV_KEYMAP = {
+    2: "KEY1",     # KEY_1
+    3: "KEY2",     # KEY_2
+    4: "KEY3",     # KEY_3
+    103: "Up",     # KEY_UP
+    108: "Down",   # KEY_DOWN
+    105: "Left",   # KEY_LEFT
+    106: "Right",  # KEY_RIGHT
+    28: "Press",   # KEY_ENTER
+}
+
+# struct input_event: timeval(sec, usec), type, code, value
+INPUT_EVENT = struct.Struct('llHHi')
+EV_KEY = 1
+EVIOCGRAB = 0x40044590
+EVIOCSCLOCKID = 0x400445a0
+CLOCK_MONOTONIC = 1
+
+# evdev设备断开后尝试重新打开的间隔（秒）
+EVDEV_REOPEN_INTERVAL = 1
+
+# 启用radxa-zero3-waveshare13-lcd-hat-keys overlay后gpio-keys驱动会占用全部按键引脚，gpiod申请引脚时返回EBUSY
+GPIO_BUSY_HINT = ("引脚已被占用：radxa-zero3-waveshare13-lcd-hat-keys overlay中的gpio-keys驱动会占用全部按键引脚，"
+                  "请使用evdev按键输入（PI_TOOL_INPUT=evdev），或换用radxa-zero3-waveshare13-lcd-hat overlay")
+
+
+# 基于libgpiod边沿事件的按键输入
+# 启动时一次性申请所有按键引脚（双边沿、上拉），阻塞在事件fd上等待，不再轮询电平
+class GpiodKeys:
+    def __init__(self, buttons, gpiod=None, debounce=DEBOUNCE):
+        if gpiod is None:
+            import gpiod
+        self.gpiod = gpiod
+        self.debounce = debounce
+        self.chips = {}
+        self.lines = {}
+        self.pressed = {}  # 每个按键当前是否处于按下状态
+        self._last_change = {}  # 每个按键上一次有效跳变的时间
+        self._pending = set()  # 消抖窗口内被忽略过跳变、需要重新读取电平的按键
+        self._names = {}  # 事件fd -> 按键名称
+        self._poll = select.poll()
+        self.events = deque()  # 交给界面处理的按键事件队列
+
+        try:
+            for name, (chip_name, pin) in buttons.items():
+                if chip_name not in self.chips:
+                    self.chips[chip_name] = gpiod.Chip(chip_name)
+                line = self.chips[chip_name].get_line(pin)
+                try:
+                    line.request(consumer='pi_tool', type=gpiod.LINE_REQ_EV_BOTH_EDGES,
+                                 flags=gpiod.LINE_REQ_FLAG_BIAS_PULL_UP)
+                except OSError as e:
+                    if e.errno == errno.EBUSY:
+                        raise OSError(errno.EBUSY, f"按键 {name}（{chip_name} {pin}）{GPIO_BUSY_HINT}") from e
+                    raise
+                self.lines[name] = line
+                self.pressed[name] = line.get_value() == 0  # 低电平为按下
+                self._last_change[name] = 0.0
+                fd = line.event_get_fd()
+                self._names[fd] = name
+                self._poll.register(fd, select.POLLIN | select.POLLPRI)
+        except Exception:
+            self.close()
+            raise
+
+    # 同时等待其他fd（如主循环的Wakeup）：fd可读时read_events()立即返回，fd由调用者读取
+    def watch(self, fd):
+        self._poll.register(fd, select.POLLIN)
+
+    # 记录一次电平跳变，消抖后转换为按键事件
+    def _edge(self, name, pressed, timestamp):
+        if timestamp - self._last_change[name] < self.debounce:
+            self._pending.add(name)
+            return
+        self._last_change[name] = timestamp
+        if pressed != self.pressed[name]:
+            self.pressed[name] = pressed
+            self.events.append(KeyEvent(name, pressed, timestamp))
+
+    # 消抖窗口结束后重新读取电平，补上窗口内被忽略的最终状态
+    def _settle(self):
+        now = time.monotonic()
+        for name in list(self._pending):
+            if now - self._last_change[name] >= self.debounce:
+                self._pending.discard(name)
+                pressed = self.lines[name].get_value() == 0
+                if pressed != self.pressed[name]:
+                    self._last_change[name] = now
+                    self.pressed[name] = pressed
+                    self.events.append(KeyEvent(name, pressed, now))
+
+    # 读取所有就绪的事件fd，返回watch()的fd是否可读
+    def _read(self, ready):
+        rising = self.gpiod.LineEvent.RISING_EDGE
+        woken = False
+        for fd, _ in ready:
+            name = self._names.get(fd)
+            if name is None:
+                woken = True
+                continue
+            event = self.lines[name].event_read()
+            self._edge(name, event.type != rising, event.sec + event.nsec / 1e9)
+        return woken
+
+    # 等待按键事件，最多阻塞timeout秒（watch()的fd可读时提前返回），返回期间产生的所有事件
+    def read_events(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self.events:
+            wait = deadline - time.monotonic()
+            if self._pending:
+                wait = min(wait, self.debounce)
+            ready = self._poll.poll(max(0, wait) * 1000)
+            woken = self._read(ready)
+            # 一次唤醒可能有多个事件，全部读完（watch()的fd不在这里读取，需要排除）
+            while ready:
+                ready = [item for item in self._poll.poll(0) if item[0] in self._names]
+                self._read(ready)
+            self._settle()
+            if woken or time.monotonic() >= deadline:
+                break
+        events = list(self.events)
+        self.events.clear()
+        return events
+
+    def close(self):
+        for line in self.lines.values():
+            line.release()
+        self.lines = {}
+        for chip in self.chips.values():
+            chip.close()
+        self.chips = {}
+
+
+# 基于evdev的按键输入：读取内核gpio-keys驱动生成的/dev/input/event*
+# 消抖由驱动完成，事件由中断产生，进程只在有按键时被唤醒
+# 驱动被解绑或重新绑定时设备节点失效（ENODEV、POLLERR/POLLHUP），之后按设备名称定期尝试重新打开
+class EvdevKeys:
+    def __init__(self, path, keymap=EVDEV_KEYMAP, name=EVDEV_NAME):
+        self.keymap = keymap
+        self.name = name
+        self.pressed = {key: False for key in keymap.values()}
+        self.fd = None
+        self._poll = select.poll()
+        self._reopen_at = 0.0  # 设备断开后下一次尝试重新打开的时间
+        self._open(path)
+
+    def _open(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+
+        # 使用单调时钟作为事件时间戳（参数为指向int的指针），不支持时改用读取事件时的time.monotonic()
+        self.monotonic = True
+        try:
+            fcntl.ioctl(self.fd, EVIOCSCLOCKID, struct.pack('i', CLOCK_MONOTONIC))
+        except OSError as e:
+            print(f"无法把输入事件时钟设置为CLOCK_MONOTONIC，改用读取时间作为时间戳: {e}")
+            self.monotonic = False
+
+        # 独占设备，避免按键同时被控制台当作键盘输入（参数按值传递）
+        try:
+            fcntl.ioctl(self.fd, EVIOCGRAB, 1)
+        except OSError as e:
+            print(f"无法独占输入设备 {path}，按键可能同时被控制台或其他程序接收: {e}")
+
+        self._poll.register(self.fd, select.POLLIN | select.POLLERR | select.POLLHUP)
+        self._partial = b''
+
+    # 设备已断开：关闭旧的fd，所有按键视为松开
+    def _lost(self, reason):
+        print(f"输入设备 {self.path} 已断开，等待重新连接: {reason}")
+        self._poll.unregister(self.fd)
+        os.close(self.fd)
+        self.fd = None
+        self._reopen_at = 0.0
+        for key in self.pressed:
+            self.pressed[key] = False
+
+    # 按设备名称重新查找并打开输入设备
+    def _reopen(self):
+        now = time.monotonic()
+        if now < self._reopen_at:
+            return
+        self._reopen_at = now + EVDEV_REOPEN_INTERVAL
+        path = find_evdev(self.name)
+        if path is None:
+            return
+        try:
+            self._open(path)
+        except OSError as e:
+            print(f"无法重新打开输入设备 {path}: {e}")
+            return
+        print(f"输入设备已重新连接: {path}")
+
+    # 同时等待其他fd（如主循环的Wakeup）：fd可读时read_events()立即返回，fd由调用者读取
+    def watch(self, fd):
+        self._poll.register(fd, select.POLLIN)
+
+    # 读取当前所有可读的数据并解析为按键事件
+    def _read(self):
+        events = []
+        now = time.monotonic()
+        while True:
+            try:
+                data = os.read(self.fd, INPUT_EVENT.size * 64)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno != errno.ENODEV:
+                    raise
+                self._lost(e)
+                break
+            if not data:
+                break
+            data = self._partial + data
+            usable = len(data) - len(data) % INPUT_EVENT.size
+            self._partial = data[usable:]
+            for sec, usec, type, code, value in INPUT_EVENT.iter_unpack(data[:usable]):
+                # value: 1按下 0松开 2自动重复（忽略）
+                if type != EV_KEY or code not in self.keymap or value == 2:
+                    continue
+                name = self.keymap[code]
+                self.pressed[name] = value == 1
+                events.append(KeyEvent(name, value == 1, sec + usec / 1e6 if self.monotonic else now))
+        return events
+
+    # 等待按键事件，最多阻塞timeout秒（watch()的fd可读时提前返回）
+    def read_events(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.fd is None:
+                self._reopen()
+            wait = deadline - time.monotonic()
+            if self.fd is None:
+                wait = min(wait, max(0.0, self._reopen_at - time.monotonic()))
+            ready = self._poll.poll(max(0.0, wait) * 1000)
+            events = []
+            woken = False
+            for fd, revents in ready:
+                if fd != self.fd:
+                    woken = True
+                    continue
+                if revents & select.POLLIN:
+                    events = self._read()
+                if self.fd is not None and revents & (select.POLLERR | select.POLLHUP):
+                    self._lost("POLLERR/POLLHUP")
+            if events or woken:
+                return events
+            if time.monotonic() >= deadline:
+                return []
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+# 查找gpio-keys对应的输入设备节点
+def find_evdev(name=EVDEV_NAME):
+    for path in sorted(glob.glob('/sys/class/input/event*/device/name')):
+        try:
+            with open(path, 'r') as f:
+                if f.read().strip() == name:
+                    return os.path.join('/dev/input', path.split('/')[4])
+        except IOError:
+            continue
+    return None
+
+
+# 按配置打开按键输入：evdev、gpiod，或auto（优先evdev，找不到设备时使用gpiod）
+# gpiod不可用时说明原因（未安装python3-libgpiod，或引脚已被gpio-keys驱动占用）
+def open_keys(buttons, backend='auto'):
+    path = find_evdev()
+    if backend in ('auto', 'evdev'):
+        if path is not None:
+            print(f"按键输入: evdev {path}")
+            return EvdevKeys(path)
+        if backend == 'evdev':
+            raise IOError(f"未找到输入设备 {EVDEV_NAME}，请检查设备树overlay是否已启用")
+    print("按键输入: gpiod")
+    try:
+        return GpiodKeys(buttons)
+    except ImportError as e:
+        raise IOError(f"无法使用gpiod按键输入：未安装python3-libgpiod（{e}）") from e
+    except OSError as e:
+        if path is not None and e.errno == errno.EBUSY:
+            raise IOError(f"无法使用gpiod按键输入：{e}（已找到gpio-keys输入设备 {path}）") from e
+        raise IOError(f"无法使用gpiod按键输入：{e}") from e
+
+
+# 模拟的libgpiod事件（v1接口）
+class FakeLineEvent:
+    RISING_EDGE = 1
+    FALLING_EDGE = 2
+
+    def __init__(self, type, timestamp):
+        self.type = type
+        self.sec = int(timestamp)
+        self.nsec = int((timestamp - self.sec) * 1e9)
+
+
+# 模拟的GPIO引脚：用管道模拟事件fd，默认上拉为高电平
+class FakeLine:
+    def __init__(self, chip, offset):
+        self.chip = chip
+        self.offset = offset
+        self.value = 1
+        self._events = deque()
+        self._read_fd, self._write_fd = os.pipe()
+
+    def request(self, consumer, type, flags=0):
+        self.consumer = consumer
+
+    def get_value(self):
+        return self.value
+
+    def event_get_fd(self):
+        return self._read_fd
+
+    def event_read(self):
+        os.read(self._read_fd, 1)
+        return self._events.popleft()
+
+    # 模拟外部电平变化（按下为低电平）
+    def drive(self, value, timestamp=None):
+        if value == self.value:
+            return
+        self.value = value
+        edge = FakeLineEvent.RISING_EDGE if value else FakeLineEvent.FALLING_EDGE
+        self._events.append(FakeLineEvent(edge, time.monotonic() if timestamp is None else timestamp))
+        os.write(self._write_fd, b'\0')
+
+    def release(self):
+        pass
+
+
+# 模拟的GPIO芯片
+class FakeChip:
+    def __init__(self, name):
+        self.name = name
+        self.lines = {}
+
+    def get_line(self, offset):
+        if offset not in self.lines:
+            self.lines[offset] = FakeLine(self, offset)
+        return self.lines[offset]
+
+    def close(self):
+        pass
+
+
+# 模拟的gpiod模块，传给GpiodKeys即可在没有开发板的环境中测试按键输入
+class FakeGpiod:
+    LINE_REQ_DIR_IN = 2
+    LINE_REQ_EV_BOTH_EDGES = 5
+    LINE_REQ_FLAG_BIAS_PULL_UP = 32
+    LineEvent = FakeLineEvent
+
+    def __init__(self, buttons=None):
+        self.chips = {}
+        self.buttons = buttons or {}
+
+    def Chip(self, name):
+        if name not in self.chips:
+            self.chips[name] = FakeChip(name)
+        return self.chips[name]
+
+    def line(self, name):
+        chip_name, pin = self.buttons[name]
+        return self.Chip(chip_name).get_line(pin)
+
+    # 模拟按下/松开某个按键
+    def press(self, name, timestamp=None):
+        self.line(name).drive(0, timestamp)
+
+    def release(self, name, timestamp=None):
+        self.line(name).drive(1, timestamp)
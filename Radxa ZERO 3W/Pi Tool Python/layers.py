@@ -0,0 +1,147 @@
+import math
+from collections import OrderedDict
+
+from PIL import Image, ImageDraw
+
+# 文字缓存默认容量（条目数）
+TEXT_CACHE_SIZE = 256
+
+
+# 页面静态背景缓存
+# 边框、网格线等静态内容每个页面和布局只绘制一次，之后每帧复制一份再绘制动态文字
+class BackgroundCache:
+    def __init__(self):
+        self._layers = {}
+        self.hits = 0
+        self.misses = 0
+
+    # 返回key对应的缓存背景本身（只读），缓存中没有时调用builder绘制
+    def layer(self, key, builder):
+        layer = self._layers.get(key)
+        if layer is None:
+            self.misses += 1
+            layer = builder()
+            self._layers[key] = layer
+        else:
+            self.hits += 1
+        return layer
+
+    # 返回key对应背景的副本
+    def get(self, key, builder):
+        return self.layer(key, builder).copy()
+
+    # 清空缓存（如布局或字体变化后）
+    def clear(self):
+        self._layers.clear()
+
+
+# 有容量上限的LRU缓存，带命中/未命中计数
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        try:
+            value = self._items[key]
+        except KeyError:
+            self.misses += 1
+            value = factory()
+            self._items[key] = value
+            if len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        else:
+            self.hits += 1
+            self._items.move_to_end(key)
+        return value
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        self._items.clear()
+
+
+# 字体在缓存键中的标识：TrueType字体使用文件路径和字号
+def _font_key(font):
+    return getattr(font, 'path', None) or id(font), getattr(font, 'size', None)
+
+
+def _truncate(text, font, max_width):
+    while text and font.getlength(text + "…") > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+# 文字尺寸和光栅化结果缓存
+# 相同文字不再重复调用FreeType测量和光栅化，绘制时直接把缓存的文字精灵贴到页面上
+class TextCache:
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.metrics = LRUCache(maxsize)  # (文字, 字体, 字号) -> (bbox, 宽度)
+        self.sprites = LRUCache(maxsize)  # (文字, 字体, 字号, 颜色, 起点小数部分) -> (精灵, 偏移)
+        self.fits = LRUCache(maxsize)  # (文字, 宽度, 字体, 字号) -> 截断后的文字
+
+    def _measure(self, text, font):
+        return self.metrics.get((text,) + _font_key(font), lambda: (font.getbbox(text), font.getlength(text)))
+
+    # 与font.getbbox(text)相同
+    def getbbox(self, text, font):
+        return self._measure(text, font)[0]
+
+    # 与font.getlength(text)相同
+    def getlength(self, text, font):
+        return self._measure(text, font)[1]
+
+    # 截断超出宽度的文字并加上省略号，结果按文字和宽度缓存（长文字逐字截断需要测量很多次）
+    def fit(self, text, font, max_width):
+        if self.getlength(text, font) <= max_width:
+            return text
+        return self.fits.get((text, max_width) + _font_key(font), lambda: _truncate(text, font, max_width))
+
+    # 光栅化文字：透明通道为字形遮罩，颜色通道为文字颜色
+    # FreeType按起点的小数部分加上每个字的位置（含字距调整）逐字取整，同一段文字在不同小数起点的光栅化结果
+    # 不只是整体平移，所以按起点小数部分分别光栅化。返回精灵和精灵左上角相对起点整数部分的偏移
+    def _rasterize(self, text, font, fill, start):
+        left, top, right, bottom = self.getbbox(text, font)
+        origin = (max(-left, 0), max(-top, 0))
+        mask = Image.new('L', (origin[0] + max(right, 0) + 1, origin[1] + max(bottom, 0) + 1), 0)
+        ImageDraw.Draw(mask).text((origin[0] + start[0], origin[1] + start[1]), text, font=font, fill=255)
+        box = mask.getbbox()
+        if box is None:
+            return None, (0, 0)
+        mask = mask.crop(box)
+        sprite = Image.new('RGBA', mask.size, tuple(fill) + (0,))
+        sprite.putalpha(mask)
+        return sprite, (box[0] - origin[0], box[1] - origin[1])
+
+    # 与draw.text(xy, text, font=font, fill=fill)效果相同
+    def draw(self, image, xy, text, font, fill):
+        if not text:
+            return
+        x, y = math.floor(xy[0]), math.floor(xy[1])
+        start = (xy[0] - x, xy[1] - y)
+        # 负的小数坐标Pillow按int()向零取整，起点小数部分为负，精灵无法复现，直接绘制（只在文字超出左上边界时出现）
+        if start != (0, 0) and min(xy) < 0:
+            ImageDraw.Draw(image).text(xy, text, font=font, fill=tuple(fill))
+            return
+        sprite, (left, top) = self.sprites.get((text,) + _font_key(font) + (tuple(fill), start),
+                                               lambda: self._rasterize(text, font, fill, start))
+        if sprite is not None:
+            image.paste(sprite, (x + left, y + top), sprite)
+
+    # 命中/未命中统计，用于调整缓存容量
+    def stats(self):
+        return {
+            'metrics_hits': self.metrics.hits,
+            'metrics_misses': self.metrics.misses,
+            'sprites_hits': self.sprites.hits,
+            'sprites_misses': self.sprites.misses,
+            'size': len(self.sprites),
+        }
+
+    def clear(self):
+        self.metrics.clear()
+        self.sprites.clear()
+        self.fits.clear()
@@ -0,0 +1,158 @@
+import array
+import fcntl
+import re
+import socket
+import struct
+
+# ioctl命令（linux/sockios.h、linux/wireless.h）
+SIOCGIFADDR = 0x8915
+SIOCGIWESSID = 0x8B1B
+SIOCGIWRATE = 0x8B21
+
+IW_ESSID_MAX_SIZE = 32
+IWREQ_SIZE = 32  # sizeof(struct iwreq)
+
+# cfg80211驱动通过无线扩展上报的链路质量上限，与iwconfig显示的分母一致
+LINK_QUALITY_MAX = 70
+
+RTF_GATEWAY = 0x2
+
+# iwconfig/iwlist 把不可打印字节转义为 \xNN
+SSID_ESCAPE = re.compile(r'\\x([0-9A-Fa-f]{2})')
+
+
+# 将16进制的UTF-8编码转换为中文
+def hex_to_chinese(hex_str):
+    try:
+        # 移除可能的引号
+        hex_str = hex_str.strip('"')
+        # 将字符串转换为字节
+        bytes_obj = bytes.fromhex(hex_str)
+        # 解码为UTF-8字符串
+        chinese_str = bytes_obj.decode('utf-8')
+        return chinese_str
+    except (ValueError, UnicodeDecodeError):
+        return hex_str
+
+
+# 还原SSID中的 \xNN 转义（代替 echo -e）
+def decode_ssid_escapes(essid):
+    if '\\x' not in essid:
+        return essid
+    data = bytearray()
+    pos = 0
+    for match in SSID_ESCAPE.finditer(essid):
+        data += essid[pos:match.start()].encode('utf-8')
+        data.append(int(match.group(1), 16))
+        pos = match.end()
+    data += essid[pos:].encode('utf-8')
+    return data.decode('utf-8', errors='replace')
+
+
+# 解码SSID原始字节，全部由16进制字符组成时尝试按16进制UTF-8转换为中文
+def decode_ssid(raw):
+    essid = raw.decode('utf-8', errors='replace')
+    if essid and all(c in '0123456789abcdefABCDEF' for c in essid):
+        essid = hex_to_chinese(essid)
+    return essid
+
+
+# 获取网络接口IP地址
+def get_ip_address(ifname):
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            return socket.inet_ntoa(fcntl.ioctl(
+                s.fileno(),
+                SIOCGIFADDR,
+                struct.pack('256s', bytes(ifname[:15], 'utf-8'))
+            )[20:24])
+    except:
+        return "N/A"
+
+
+# 获取网关IP地址：读取/proc/net/route中跃点数最小的默认路由
+def get_gateway():
+    try:
+        best = None
+        with open('/proc/net/route', 'r') as f:
+            next(f)  # 跳过表头
+            for line in f:
+                fields = line.split()
+                if fields[1] != '00000000' or not int(fields[3], 16) & RTF_GATEWAY:
+                    continue
+                metric = int(fields[6])
+                if best is None or metric < best[0]:
+                    best = (metric, fields[2])
+        if best is None:
+            return "N/A"
+        return socket.inet_ntoa(struct.pack('<L', int(best[1], 16)))
+    except:
+        return "N/A"
+
+
+# 通过无线扩展ioctl读取ESSID
+def _get_essid(sock, ifname):
+    buf = array.array('B', bytes(IW_ESSID_MAX_SIZE + 1))
+    address, length = buf.buffer_info()
+    request = struct.pack('16sPHH', ifname.encode(), address, length, 0).ljust(IWREQ_SIZE, b'\0')
+    result = fcntl.ioctl(sock.fileno(), SIOCGIWESSID, request)
+    size = struct.unpack_from('16sPHH', result)[2]
+    return buf.tobytes()[:size].rstrip(b'\0')
+
+
+# 通过无线扩展ioctl读取比特率（bit/s）
+def _get_bit_rate(sock, ifname):
+    request = struct.pack('16siBBH', ifname.encode(), 0, 0, 0, 0).ljust(IWREQ_SIZE, b'\0')
+    result = fcntl.ioctl(sock.fileno(), SIOCGIWRATE, request)
+    return struct.unpack_from('16siBBH', result)[1]
+
+
+# 从/proc/net/wireless读取链路质量和信号强度
+def _get_link_stats(ifname):
+    with open('/proc/net/wireless', 'r') as f:
+        for line in f:
+            name, _, stats = line.partition(':')
+            if name.strip() == ifname:
+                fields = stats.split()
+                return int(float(fields[1])), int(float(fields[2]))
+    raise IOError(f"{ifname} 不是无线接口")
+
+
+# 读取无线网络信息的数值：ESSID、比特率（bit/s）、链路质量和信号强度（dBm），不是无线接口时返回None
+def read_wireless_stats(ifname='wlan0'):
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            essid = decode_ssid(_get_essid(sock, ifname))
+            bit_rate = _get_bit_rate(sock, ifname)
+        link_quality, signal_level = _get_link_stats(ifname)
+        return {
+            'essid': essid,
+            'bit_rate': bit_rate,
+            'link_quality': link_quality,
+            'link_quality_max': LINK_QUALITY_MAX,
+            'signal_level': signal_level,
+        }
+    except:
+        return None
+
+
+# 把无线网络信息的数值格式化为显示用的文字，stats为read_wireless_stats()的结果
+def format_wireless(stats):
+    if stats is None:
+        return {
+            'essid': "N/A",
+            'bit_rate': "N/A",
+            'link_quality': "N/A",
+            'signal_level': "N/A"
+        }
+    return {
+        'essid': stats['essid'] or "N/A",
+        'bit_rate': f"{stats['bit_rate'] / 1e6:g} Mb/s",
+        'link_quality': f"{stats['link_quality']}/{LINK_QUALITY_MAX}",
+        'signal_level': f"{stats['signal_level']} dBm"
+    }
+
+
+# 获取无线网络信息
+def get_wireless_info(ifname='wlan0'):
+    return format_wireless(read_wireless_stats(ifname))
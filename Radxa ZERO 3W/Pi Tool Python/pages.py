@@ -0,0 +1,144 @@
+import os
+import time
+
+# 刷新策略
+REFRESH_INTERVAL = 'interval'  # 按固定周期重绘（如时钟、系统状态）
+REFRESH_ON_INPUT = 'input'  # 只在按键后重绘
+REFRESH_ON_CHANGE = 'change'  # 页面数据指纹变化时重绘
+
+# 数据变化时没有通知的页面（如命令输出）定时检查数据指纹的间隔（秒），只计算指纹，不重绘
+CHANGE_POLL_INTERVAL = 0.25
+
+# 对齐到整秒时额外等待的时间（秒），保证唤醒时已经跨过秒边界
+ALIGN_SLACK = 0.005
+
+
+# 页面：渲染函数、按键处理函数和刷新策略
+# interval：周期重绘间隔（秒），align为True时对齐到墙上时钟的整数倍（时钟页按整秒跳动）
+# fingerprint：返回页面数据指纹的函数，按键或后台数据变化通知（Wakeup）之后检查，指纹变化时重绘，可以和interval同时使用
+# poll：另外定时检查指纹的间隔（秒），None表示只在按键或收到通知时检查
+class Page:
+    def __init__(self, name, render, handle_input=None, refresh=REFRESH_ON_INPUT, interval=None, align=False,
+                 fingerprint=None, poll=None):
+        if refresh == REFRESH_INTERVAL and not interval:
+            raise ValueError(f"页面 {name} 使用周期刷新，必须指定interval")
+        if refresh == REFRESH_ON_CHANGE and fingerprint is None:
+            raise ValueError(f"页面 {name} 使用数据变化刷新，必须指定fingerprint")
+        self.name = name
+        self.render = render
+        self.handle_input = handle_input
+        self.refresh = refresh
+        self.interval = interval
+        self.align = align
+        self.fingerprint = fingerprint
+        self.poll = poll
+        self.frames = 0  # 已渲染的帧数
+
+
+# 跨线程唤醒主循环：后台线程（采样、扫描、连接、命令）数据变化时写入管道，
+# 主循环等待按键时同时等待管道可读，不需要定时轮询
+class Wakeup:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+
+    def fileno(self):
+        return self.read_fd
+
+    # 可以在任意线程中调用；管道已满说明主循环还没有处理之前的通知，忽略即可
+    def set(self):
+        try:
+            os.write(self.write_fd, b'\0')
+        except BlockingIOError:
+            pass
+
+    # 读空管道，返回上次清除之后是否收到过通知
+    def clear(self):
+        woken = False
+        while True:
+            try:
+                data = os.read(self.read_fd, 4096)
+            except BlockingIOError:
+                return woken
+            if not data:
+                return woken
+            woken = True
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+# 页面刷新调度：计算主循环最多可以休眠多久，并判断当前页面是否需要重绘
+# 按键事件和后台数据变化通知会提前唤醒主循环，其余时间只在页面需要新的一帧或需要定时检查数据时唤醒
+class PageScheduler:
+    def __init__(self):
+        self.page = None  # 屏幕上正在显示的页面
+        self.next_frame = 0.0  # 周期重绘的下一次时间（time.monotonic()）
+        self.next_poll = 0.0  # 下一次定时检查数据指纹的时间
+        self.last_fingerprint = None
+        self.input = False  # 上一帧之后是否有按键
+        self.changed = False  # 上一帧之后是否收到后台数据变化通知
+        self.dirty = False  # 当前页面是否必须重绘（如主循环中更新的连接状态）
+        self.skipped = 0  # 数据指纹未变化而跳过的重绘次数
+        self._fingerprint = None
+
+    # 通知调度器有按键事件
+    def notify_input(self):
+        self.input = True
+
+    # 通知调度器后台数据有变化，页面的数据指纹需要重新检查
+    def notify_change(self):
+        self.changed = True
+
+    # 要求下一次重绘当前页面
+    def invalidate(self):
+        self.dirty = True
+
+    # 距离页面下一次需要检查的时间（秒），None表示只等待按键
+    def timeout(self, page, now):
+        if page is not self.page:
+            return 0.0
+        deadlines = []
+        if page.interval:
+            deadlines.append(self.next_frame)
+        if page.fingerprint is not None and page.poll:
+            deadlines.append(self.next_poll)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now)
+
+    # 当前页面是否需要重绘，同时清除按键和通知标记
+    def due(self, page, now):
+        key_pressed, changed, dirty = self.input, self.changed, self.dirty
+        self.input = self.changed = self.dirty = False
+        if page is not self.page or dirty or (page.interval and now >= self.next_frame):
+            if page.fingerprint is not None:
+                self._fingerprint = page.fingerprint()
+            return True
+        if page.fingerprint is not None:
+            polled = page.poll is not None and now >= self.next_poll
+            if not (key_pressed or changed or polled):
+                return False
+            if page.poll:
+                self.next_poll = now + page.poll
+            fingerprint = page.fingerprint()
+            if fingerprint == self.last_fingerprint:
+                self.skipped += 1
+                return False
+            self._fingerprint = fingerprint
+            return True
+        return key_pressed and page.refresh == REFRESH_ON_INPUT
+
+    # 记录页面已重绘，安排下一次周期重绘
+    def rendered(self, page, now):
+        page.frames += 1
+        self.page = page
+        self.last_fingerprint = self._fingerprint
+        self._fingerprint = None
+        if page.poll:
+            self.next_poll = now + page.poll
+        if page.interval:
+            if page.align:
+                self.next_frame = time.monotonic() + page.interval - time.time() % page.interval + ALIGN_SLACK
+            else:
+                self.next_frame = now + page.interval
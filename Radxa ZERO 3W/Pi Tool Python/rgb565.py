@@ -0,0 +1,98 @@
+from PIL import Image, ImageChops
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# RGB565 帧编码
+# 根据fbset的输出使用正确的位掩码，格式: rgba 5/11,6/5,5/0,0/0
+# 每个像素两个字节，低字节在前，高字节在后（小端）
+
+# 高字节 = R的高5位 | G的高3位，低字节 = G的中间3位 | B的高5位
+# 四张查找表交给Pillow的point()在C层完成逐像素运算
+_LUT_R_HIGH = [v & 0xF8 for v in range(256)]
+_LUT_G_HIGH = [v >> 5 for v in range(256)]
+_LUT_G_LOW = [(v << 3) & 0xE0 for v in range(256)]
+_LUT_B_LOW = [v >> 3 for v in range(256)]
+
+
+# 统一转换为RGB模式（RGBA直接丢弃透明通道，与原逐像素实现一致）
+def _as_rgb(image):
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return image
+
+
+# 纯Python实现（原逐像素循环），作为没有NumPy时的兜底和对比基准
+def rgb_to_rgb565_python(image):
+    result = bytearray()
+    for pixel in image.getdata():
+        # 处理不同模式的图像数据
+        if len(pixel) == 4:  # RGBA 模式
+            r, g, b, _ = pixel
+        else:  # RGB 模式
+            r, g, b = pixel
+
+        # 确保RGB值在有效范围内
+        r = min(max(r, 0), 255)
+        g = min(max(g, 0), 255)
+        b = min(max(b, 0), 255)
+
+        red = (r >> 3) & 0x1F
+        green = (g >> 2) & 0x3F
+        blue = (b >> 3) & 0x1F
+
+        # 组合成16位RGB565值
+        rgb565 = (red << 11) | (green << 5) | blue
+
+        # 确保字节序正确（低字节在前，高字节在后）
+        result.append(rgb565 & 0xFF)
+        result.append((rgb565 >> 8) & 0xFF)
+    return result
+
+
+# Pillow实现：用查找表拆出高低字节两个通道，再按LA模式交织输出
+def rgb_to_rgb565_pillow(image):
+    r, g, b = _as_rgb(image).split()
+    # 两部分的位互不重叠，相加即按位或，不会溢出
+    high = ImageChops.add(r.point(_LUT_R_HIGH), g.point(_LUT_G_HIGH))
+    low = ImageChops.add(g.point(_LUT_G_LOW), b.point(_LUT_B_LOW))
+    return bytearray(Image.merge('LA', (low, high)).tobytes())
+
+
+# NumPy实现：整帧向量化计算
+def rgb_to_rgb565_numpy(image):
+    pixels = np.asarray(_as_rgb(image), dtype=np.uint16)
+    rgb565 = ((pixels[..., 0] & 0xF8) << 8) | ((pixels[..., 1] & 0xFC) << 3) | (pixels[..., 2] >> 3)
+    return bytearray(rgb565.astype('<u2').tobytes())
+
+
+# 可用的编码实现，按速度从快到慢排列
+ENCODERS = {}
+if np is not None:
+    ENCODERS['numpy'] = rgb_to_rgb565_numpy
+ENCODERS['pillow'] = rgb_to_rgb565_pillow
+ENCODERS['python'] = rgb_to_rgb565_python
+
+# 默认使用最快的实现
+ENCODER = next(iter(ENCODERS))
+
+
+# 将图像转换为RGB565格式，确保字节序正确
+def rgb_to_rgb565(image):
+    return ENCODERS[ENCODER](image)
+
+
+# 直接编码到目标缓冲区（如帧缓冲的后台缓冲区或mmap映射），省去一次中间拷贝
+def encode_into(image, buffer, offset=0):
+    if ENCODER == 'numpy':
+        pixels = np.asarray(_as_rgb(image), dtype=np.uint16)
+        height, width = pixels.shape[:2]
+        out = np.frombuffer(buffer, dtype='<u2', count=width * height, offset=offset).reshape(height, width)
+        np.left_shift(pixels[..., 0] & 0xF8, 8, out=out)
+        out |= (pixels[..., 1] & 0xFC) << 3
+        out |= pixels[..., 2] >> 3
+    else:
+        data = rgb_to_rgb565(image)
+        buffer[offset:offset + len(data)] = data
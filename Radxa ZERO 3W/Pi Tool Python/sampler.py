@@ -0,0 +1,418 @@
+import heapq
+import os
+import select
+import socket
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import psutil
+
+from history import HISTORY_POINTS, MetricsHistory
+from netinfo import get_gateway, read_wireless_stats
+
+# 各组指标的默认采样周期（秒），0表示只在启动时采样一次，None表示暂停（由set_period()开启）
+PERIODS = {
+    'static': 0,     # 系统版本、开机时间
+    'cpu': 1.0,      # CPU总占用和每个核心的占用
+    'temp': 2.0,     # CPU温度
+    'memory': 2.0,   # 内存和交换分区
+    'disk': 30.0,    # 根分区占用
+    'net': 1.0,      # 各网络接口的流量计数器
+    'mounts': 5.0,   # 各挂载点的占用
+    'diskio': 1.0,   # 各块设备的读写计数器
+    'procs': None,   # 进程表（CPU和内存占用最多的进程），只在进程页显示时采样
+    'netinfo': 5.0,  # Wi-Fi链路、各接口IPv4地址和网关
+}
+
+# 采样Wi-Fi链路信息的无线接口
+WIRELESS_INTERFACE = 'wlan0'
+
+# 进程页显示的进程数
+PROCESS_TOP = 7
+
+# 进程表超过这么久（秒）没有采样时重新开始统计CPU占用
+PROCESS_STALE = 10
+
+# 网络接口流量：速率名称 -> psutil计数器字段
+NET_FIELDS = {
+    'rx_bytes': 'bytes_recv',
+    'tx_bytes': 'bytes_sent',
+    'rx_packets': 'packets_recv',
+    'tx_packets': 'packets_sent',
+}
+
+
+# 读取CPU温度（摄氏度），无法读取时返回None
+def read_cpu_temp():
+    try:
+        with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
+            return float(f.read()) / 1000
+    except:
+        return None
+
+
+# 获取CPU温度
+def get_cpu_temp(temp=None):
+    if temp is None:
+        temp = read_cpu_temp()
+    if temp is None:
+        return "N/A"
+    return f"{temp:.1f}°C"
+
+
+# 获取系统版本信息
+def get_system_info():
+    try:
+        with open('/etc/issue', 'r') as f:
+            system_info = f.read().strip()
+        return system_info.replace(r'\n', '').replace(r'\l', '')
+    except:
+        return "Debian GNU/Linux 11"
+
+
+def sample_static():
+    return {
+        'system_info': get_system_info(),
+        'boot_time': psutil.boot_time(),
+    }
+
+
+# 使用interval=None，按两次采样之间的CPU时间计算占用率，不会阻塞
+def sample_cpu():
+    return {
+        'cpu_percent': psutil.cpu_percent(interval=None),
+        'per_cpu': tuple(psutil.cpu_percent(interval=None, percpu=True)),
+    }
+
+
+def sample_temp():
+    temp = read_cpu_temp()
+    return {'cpu_temp': get_cpu_temp(temp), 'cpu_temp_c': temp}
+
+
+def sample_memory():
+    return {
+        'memory': psutil.virtual_memory(),
+        'swap': psutil.swap_memory(),
+    }
+
+
+def sample_disk():
+    return {'disk': psutil.disk_usage('/')}
+
+
+def sample_netinfo():
+    addresses = {}
+    for name, addrs in psutil.net_if_addrs().items():
+        addresses[name] = tuple(addr.address for addr in addrs if addr.family == socket.AF_INET)
+    return {
+        'wifi': read_wireless_stats(WIRELESS_INTERFACE),
+        'addresses': addresses,
+        'gateway': get_gateway(),
+    }
+
+
+# 块设备读写：速率名称 -> psutil计数器字段，busy_ms为每秒设备忙碌的毫秒数（除以10即利用率）
+DISK_FIELDS = {
+    'read_bytes': 'read_bytes',
+    'write_bytes': 'write_bytes',
+    'read_ops': 'read_count',
+    'write_ops': 'write_count',
+    'busy_ms': 'busy_time',
+}
+
+# 挂载点：设备、挂载路径、文件系统类型，disk为内核中的块设备名称（与disk_io_counters的键相同）
+Mount = namedtuple('Mount', 'device mountpoint fstype disk')
+
+# 进程：CPU占用为单个核心的百分比（与top相同，多线程进程可以超过100%），rss为常驻内存字节数
+ProcessInfo = namedtuple('ProcessInfo', 'pid name cpu rss')
+
+# 挂载变化时内核会通知打开的mountinfo文件（POLLPRI）
+MOUNTINFO_PATH = '/proc/self/mountinfo'
+
+
+# 计数器速率：用两次采样之间计数器的差值除以时间间隔，得到每个设备每秒的增量
+# 读取计数器只是一次/proc读取，速率在采样线程中计算，页面只读取结果
+# graph中的速率按1秒分辨率记录历史，设备消失时删除，设备增减不会使内存持续增长
+class CounterRates:
+    def __init__(self, key, read, fields, graph=(), capacity=HISTORY_POINTS):
+        self.key = key
+        self.read = read
+        self.fields = fields
+        self.graph = graph
+        self.history = MetricsHistory((1,), capacity)  # 序列名称为 设备:速率名称
+        self._last = {}
+        self._last_at = None
+
+    def __call__(self):
+        counters = self.read()
+        now = time.monotonic()
+        rates = {}
+        point = {}
+        for name, counter in counters.items():
+            last = self._last.get(name)
+            if last is None:
+                rates[name] = None  # 第一次出现，下一次采样才有速率
+                continue
+            elapsed = now - self._last_at
+            # 计数器变小说明设备被重建，这一次的速率按0计算
+            rates[name] = {rate: max(0, getattr(counter, field) - getattr(last, field)) / elapsed
+                           for rate, field in self.fields.items()}
+            for rate in self.graph:
+                point[f'{name}:{rate}'] = rates[name][rate]
+        for name in self._last.keys() - counters.keys():
+            for rate in self.graph:
+                self.history.remove(f'{name}:{rate}')
+        self.history.record(now, point)
+        self._last = counters
+        self._last_at = now
+        return {self.key: rates}
+
+
+def read_net_counters():
+    return psutil.net_io_counters(pernic=True)
+
+
+def read_disk_counters():
+    return psutil.disk_io_counters(perdisk=True) or {}
+
+
+# 挂载路径所在的块设备名称：通过设备号在/sys/dev/block中查找（/dev/root等别名也能找到）
+def block_device_name(mount):
+    try:
+        dev = os.stat(mount.mountpoint).st_dev
+        return os.path.basename(os.readlink(f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}'))
+    except OSError:
+        return os.path.basename(os.path.realpath(mount.device))
+
+
+# 读取真实的挂载点（不含proc、tmpfs等虚拟文件系统和loop设备），根目录在最前
+def read_mounts():
+    mounts = {}
+    for part in psutil.disk_partitions(all=False):
+        if part.device.startswith('/dev/loop') or part.mountpoint in mounts:
+            continue
+        mount = Mount(part.device, part.mountpoint, part.fstype, None)
+        mounts[part.mountpoint] = mount._replace(disk=block_device_name(mount))
+    return tuple(sorted(mounts.values(), key=lambda mount: (mount.mountpoint != '/', mount.mountpoint)))
+
+
+# 挂载点占用：挂载列表只在mountinfo报告挂载变化时重新读取，每次采样只对各挂载点调用statvfs
+class MountTable:
+    def __init__(self, path=MOUNTINFO_PATH):
+        self.mounts = None
+        self._file = None
+        self._poll = None
+        try:
+            self._file = open(path, 'rb')
+            self._poll = select.poll()
+            self._poll.register(self._file, select.POLLPRI)
+        except OSError as e:
+            # 无法监视挂载变化时每次采样都重新读取
+            print(f"无法监视挂载变化: {e}")
+            self._poll = None
+
+    # 挂载列表是否需要重新读取（不阻塞）
+    def changed(self):
+        if self.mounts is None or self._poll is None:
+            return True
+        return bool(self._poll.poll(0))
+
+    def __call__(self):
+        if self.changed():
+            self.mounts = read_mounts()
+        usage = {}
+        for mount in self.mounts:
+            try:
+                usage[mount.mountpoint] = psutil.disk_usage(mount.mountpoint)
+            except OSError:
+                pass
+        return {'mounts': self.mounts, 'mount_usage': usage}
+
+
+# 进程表：缓存psutil.Process对象，每次采样只加入新进程、移除已退出的进程
+# CPU占用由psutil按本次和上次采样之间的CPU时间差计算，不需要interval等待
+# 每个进程在oneshot中读取一次/proc/<pid>/stat和statm
+class ProcessTable:
+    def __init__(self, top=PROCESS_TOP):
+        self.top = top
+        self.processes = {}  # pid -> (psutil.Process, 启动时间)
+        self.version = 0  # 每次采样加1
+        self._pid = os.getpid()
+        self._sampled_at = float('-inf')
+
+    # 更新一个进程，返回ProcessInfo，无法读取时返回None
+    def _update(self, pid):
+        entry = self.processes.get(pid)
+        try:
+            if entry is not None:
+                process, created = entry
+                with process.oneshot():
+                    if process.create_time() == created:
+                        return ProcessInfo(pid, process.name(), process.cpu_percent(None), process.memory_info().rss)
+            # 新进程，或PID已被新进程重用：记录起始CPU时间，下一次采样才有占用率
+            process = psutil.Process(pid)
+            with process.oneshot():
+                process.cpu_percent(None)
+                self.processes[pid] = (process, process.create_time())
+                return ProcessInfo(pid, process.name(), 0.0, process.memory_info().rss)
+        except (psutil.NoSuchProcess, psutil.ZombieProcess):
+            self.processes.pop(pid, None)
+        except psutil.AccessDenied:
+            pass
+        return None
+
+    def __call__(self):
+        # 暂停采样较久后，CPU时间差跨越整个暂停期间，重新开始统计
+        now = time.monotonic()
+        warmup = now - self._sampled_at > PROCESS_STALE
+        if warmup:
+            self.processes.clear()
+        self._sampled_at = now
+
+        pids = set(psutil.pids())
+        for pid in self.processes.keys() - pids:
+            del self.processes[pid]
+        rows = []
+        own = None
+        for pid in pids:
+            row = self._update(pid)
+            if row is not None:
+                rows.append(row)
+                if pid == self._pid:
+                    own = row
+        self.version += 1
+        return {
+            'top_cpu': tuple(heapq.nlargest(self.top, rows, key=lambda row: row.cpu)),
+            'top_rss': tuple(heapq.nlargest(self.top, rows, key=lambda row: row.rss)),
+            'process_count': len(rows),
+            'process_warmup': warmup,  # 本次采样没有CPU占用率
+            'own_process': own,
+        }
+
+
+# 从一组采样结果中取出需要记录历史的数值：CPU总占用、每个核心占用、温度、内存和交换分区占用
+def history_point(values):
+    point = {}
+    if 'cpu_percent' in values:
+        point['cpu'] = values['cpu_percent']
+        for i, percent in enumerate(values['per_cpu']):
+            point[f'cpu{i}'] = percent
+    if values.get('cpu_temp_c') is not None:
+        point['temp'] = values['cpu_temp_c']
+    if 'memory' in values:
+        point['ram'] = values['memory'].percent
+        point['swap'] = values['swap'].percent
+    return point
+
+
+# 后台指标采样线程
+# 各组指标按各自的周期采样，合并后发布为只读快照，页面渲染时只读取最新快照
+class MetricsSampler(threading.Thread):
+    def __init__(self, periods=None):
+        super().__init__(name='metrics-sampler', daemon=True)
+        self.groups = {}  # 名称 -> [周期, 采样函数, 下次采样时间]
+        self.snapshot = MappingProxyType({})
+        self.version = 0  # 每次发布新快照加1
+        self._values = {}
+        self._keys = {}  # 组名称 -> 这一组发布的指标名称
+        self._lock = threading.Lock()
+        self._running = True
+        self._wakeup = threading.Event()
+        self.observe = None  # 耗时统计回调 observe(阶段, 秒)
+        self.notify = None  # 发布新快照后的回调（如唤醒主循环）
+        self.history = MetricsHistory()  # 每次采样后记录指标历史
+        self.net = CounterRates('net_rates', read_net_counters, NET_FIELDS, graph=('rx_bytes', 'tx_bytes'))
+        self.disk = CounterRates('disk_rates', read_disk_counters, DISK_FIELDS)
+        self.mounts = MountTable()
+        self.processes = ProcessTable()
+
+        periods = dict(PERIODS, **(periods or {}))
+        self.add_group('static', sample_static, periods['static'])
+        self.add_group('cpu', sample_cpu, periods['cpu'])
+        self.add_group('temp', sample_temp, periods['temp'])
+        self.add_group('memory', sample_memory, periods['memory'])
+        self.add_group('disk', sample_disk, periods['disk'])
+        self.add_group('net', self.net, periods['net'])
+        self.add_group('mounts', self.mounts, periods['mounts'])
+        self.add_group('diskio', self.disk, periods['diskio'])
+        self.add_group('procs', self.processes, periods['procs'])
+        self.add_group('netinfo', sample_netinfo, periods['netinfo'])
+
+    # 注册一组指标，运行中注册的组会立即采样（暂停的组除外）
+    def add_group(self, name, func, period):
+        with self._lock:
+            self.groups[name] = [period, func, 0.0 if period is not None else float('inf')]
+        self._wakeup.set()
+
+    # 修改一组指标的采样周期，None表示暂停；周期变化时立即采样一次
+    # 暂停时从快照中删除这一组的指标，导出和页面不会一直使用暂停前的旧值
+    def set_period(self, name, period):
+        with self._lock:
+            group = self.groups[name]
+            if group[0] == period:
+                return
+            group[0] = period
+            group[2] = 0.0 if period is not None else float('inf')
+            if period is None and self._keys.get(name):
+                for key in self._keys.pop(name):
+                    self._values.pop(key, None)
+                self.snapshot = MappingProxyType(dict(self._values))
+                self.version += 1
+                if self.notify is not None:
+                    self.notify()
+        self._wakeup.set()
+
+    # 采样一组指标并发布新快照
+    def sample(self, name):
+        func = self.groups[name][1]
+        start = time.perf_counter()
+        try:
+            values = func()
+        except Exception as e:
+            print(f"采样指标 {name} 失败: {e}")
+            values = {}
+        if self.observe is not None:
+            self.observe('sample', time.perf_counter() - start)
+        with self._lock:
+            # 采样期间周期可能被set_period()修改，按最新的周期计算下次采样时间；已暂停的组不再发布
+            period = self.groups[name][0]
+            self.groups[name][2] = time.monotonic() + period if period else float('inf')
+            if period is None:
+                return
+            self._keys.setdefault(name, set()).update(values)
+            self._values.update(values)
+            self.snapshot = MappingProxyType(dict(self._values))
+            self.version += 1
+        # 只记录这一组新采样的历史指标，其他组的旧值不重复计入平均值，也不会让趋势页重绘；
+        # 采样周期内的其他时间段沿用这次的值
+        point = history_point(values)
+        if point:
+            self.history.record(time.monotonic(), point, period or 0)
+        if self.notify is not None:
+            self.notify()
+
+    # 启动前先同步采样一次（暂停的组除外），保证第一帧就有数据
+    def start(self):
+        for name, (period, _, _) in list(self.groups.items()):
+            if period is not None:
+                self.sample(name)
+        super().start()
+
+    def run(self):
+        while self._running:
+            # 先清除唤醒标记再采样和计算下次唤醒时间，采样期间set_period()/add_group()的唤醒不会丢失
+            self._wakeup.clear()
+            now = time.monotonic()
+            for name, (_, _, due) in list(self.groups.items()):
+                if due <= now:
+                    self.sample(name)
+            with self._lock:
+                next_due = min(due for _, _, due in self.groups.values())
+            self._wakeup.wait(min(max(0.0, next_due - time.monotonic()), 60.0))
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
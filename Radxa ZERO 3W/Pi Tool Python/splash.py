@@ -0,0 +1,38 @@
+import os
+
+from PIL import Image
+
+from rgb565 import rgb_to_rgb565
+
+
+# 启动图片缓存文件：与PNG放在同一目录，文件名带分辨率
+def splash_cache_path(png_path, width, height):
+    base, _ = os.path.splitext(png_path)
+    return f'{base}.{width}x{height}.rgb565'
+
+
+# 读取启动图片的RGB565数据
+# 缓存文件的修改时间与PNG相同且大小正确时直接使用，否则重新缩放、编码并更新缓存
+def load_splash(png_path, width, height):
+    cache_path = splash_cache_path(png_path, width, height)
+    mtime = os.stat(png_path).st_mtime_ns
+    size = width * height * 2
+    try:
+        stat = os.stat(cache_path)
+        if stat.st_mtime_ns == mtime and stat.st_size == size:
+            with open(cache_path, 'rb') as f:
+                return f.read()
+    except OSError:
+        pass
+
+    image = Image.open(png_path).resize((width, height), Image.LANCZOS).convert('RGB')
+    data = rgb_to_rgb565(image)
+    try:
+        tmp = f'{cache_path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.utime(tmp, ns=(mtime, mtime))
+        os.replace(tmp, cache_path)
+    except OSError as e:
+        print(f"无法写入启动图片缓存: {e}")
+    return data
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 允许从任意目录运行 pytest
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
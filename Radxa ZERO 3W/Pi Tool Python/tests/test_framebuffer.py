@@ -0,0 +1,70 @@
+from PIL import Image, ImageDraw
+
+from framebuffer import BYTES_PER_PIXEL, FileFrameBuffer
+from rgb565 import rgb_to_rgb565
+
+WIDTH, HEIGHT = 32, 24
+ROW_BYTES = WIDTH * BYTES_PER_PIXEL
+
+
+def frame(color, band=None, band_color=(255, 255, 255)):
+    image = Image.new('RGB', (WIDTH, HEIGHT), color)
+    if band is not None:
+        ImageDraw.Draw(image).rectangle((0, band[0], WIDTH - 1, band[1] - 1), fill=band_color)
+    return image
+
+
+def test_first_frame_is_written_in_full(tmp_path):
+    with FileFrameBuffer(str(tmp_path / 'fb'), WIDTH, HEIGHT) as fb:
+        image = frame((10, 200, 30))
+        fb.show(image)
+        assert fb.read_frame() == bytes(rgb_to_rgb565(image))
+        assert fb.bytes_written == HEIGHT * ROW_BYTES
+
+
+# 只写入变化的行：未变化的行保持原样（用标记值检查没有被重写）
+def test_only_damaged_rows_are_written(tmp_path):
+    with FileFrameBuffer(str(tmp_path / 'fb'), WIDTH, HEIGHT) as fb:
+        fb.show(frame((0, 0, 0)))
+        marker = b'\xaa' * ROW_BYTES
+        fb.mm[20 * ROW_BYTES:21 * ROW_BYTES] = marker
+        written = fb.bytes_written
+
+        image = frame((0, 0, 0), band=(5, 8))
+        fb.show(image)
+        data = fb.read_frame()
+        assert fb.bytes_written - written == 3 * ROW_BYTES
+        assert data[5 * ROW_BYTES:8 * ROW_BYTES] == bytes(rgb_to_rgb565(image))[5 * ROW_BYTES:8 * ROW_BYTES]
+        assert data[20 * ROW_BYTES:21 * ROW_BYTES] == marker
+
+
+def test_unchanged_frame_is_skipped(tmp_path):
+    with FileFrameBuffer(str(tmp_path / 'fb'), WIDTH, HEIGHT) as fb:
+        fb.show(frame((1, 2, 3)))
+        written = fb.bytes_written
+        fb.show(frame((1, 2, 3)))
+        assert fb.skipped == 1
+        assert fb.bytes_written == written
+
+
+# 双缓冲：每帧写入不可见的那一页后切换，另一页需要补上上一帧的变化
+def test_double_buffer_alternates_pages(tmp_path):
+    with FileFrameBuffer(str(tmp_path / 'fb'), WIDTH, HEIGHT, pages=2) as fb:
+        assert fb.pages == 2
+        frames = [frame((0, 0, 0)), frame((0, 0, 0), band=(2, 4)), frame((0, 0, 0), band=(10, 12)),
+                  frame((0, 0, 0), band=(10, 12), band_color=(255, 0, 0))]
+        shown = []
+        for image in frames:
+            fb.show(image)
+            shown.append(fb.front_page)
+            assert fb.read_frame() == bytes(rgb_to_rgb565(image))
+        assert shown == [1, 0, 1, 0]
+
+
+def test_show_rgb565_forces_full_redraw(tmp_path):
+    with FileFrameBuffer(str(tmp_path / 'fb'), WIDTH, HEIGHT) as fb:
+        image = frame((50, 60, 70))
+        fb.show(image)
+        fb.show_rgb565(bytes(HEIGHT * ROW_BYTES))
+        fb.show(image)
+        assert fb.read_frame() == bytes(rgb_to_rgb565(image))
@@ -0,0 +1,140 @@
+import errno
+import os
+import time
+
+import keys as keys_module
+from keys import DEBOUNCE, EV_KEY, INPUT_EVENT, EvdevKeys, FakeGpiod, GpiodKeys
+
+BUTTONS = {
+    "KEY1": ("gpiochip3", 5),
+    "Right": ("gpiochip1", 4),
+}
+
+
+def open_keys():
+    fake = FakeGpiod(BUTTONS)
+    return GpiodKeys(BUTTONS, gpiod=fake), fake
+
+
+# 读取事件直到消抖窗口结束，返回 (按键名称, 是否按下) 列表
+def settled_events(keys):
+    events = []
+    deadline = time.monotonic() + DEBOUNCE * 3
+    while time.monotonic() < deadline:
+        events += keys.read_events(DEBOUNCE)
+    return [(event.name, event.pressed) for event in events]
+
+
+def test_press_and_release():
+    keys, fake = open_keys()
+    now = time.monotonic()
+    fake.press("KEY1", now)
+    fake.release("KEY1", now + DEBOUNCE * 2)
+    assert settled_events(keys) == [("KEY1", True), ("KEY1", False)]
+    assert keys.pressed == {"KEY1": False, "Right": False}
+
+
+# 消抖窗口内的抖动不产生事件，最终仍为按下状态
+def test_bounce_inside_window_is_rejected():
+    keys, fake = open_keys()
+    now = time.monotonic()
+    fake.press("KEY1", now)
+    fake.release("KEY1", now + DEBOUNCE / 4)
+    fake.press("KEY1", now + DEBOUNCE / 2)
+    assert settled_events(keys) == [("KEY1", True)]
+    assert keys.pressed["KEY1"]
+
+
+# 比消抖窗口还短的点按：松开的跳变被忽略，窗口结束后重新读取电平补上松开事件
+def test_short_tap_yields_press_and_release():
+    keys, fake = open_keys()
+    now = time.monotonic()
+    fake.press("KEY1", now)
+    fake.release("KEY1", now + DEBOUNCE / 4)
+    assert settled_events(keys) == [("KEY1", True), ("KEY1", False)]
+    assert not keys.pressed["KEY1"]
+
+
+# 窗口结束后按引脚当前电平补事件，而不是按窗口内最后一次跳变
+def test_settle_rereads_line_level():
+    keys, fake = open_keys()
+    now = time.monotonic()
+    fake.press("KEY1", now)
+    fake.release("KEY1", now + DEBOUNCE / 4)
+    fake.line("KEY1").value = 0  # 跳变丢失，电平已经回到按下
+    assert settled_events(keys) == [("KEY1", True)]
+    assert keys.pressed["KEY1"]
+
+
+# 各按键分别消抖
+def test_keys_debounce_independently():
+    keys, fake = open_keys()
+    now = time.monotonic()
+    fake.press("KEY1", now)
+    fake.press("Right", now + DEBOUNCE / 4)
+    assert sorted(settled_events(keys)) == [("KEY1", True), ("Right", True)]
+
+
+def test_read_events_times_out_without_input():
+    keys, _ = open_keys()
+    start = time.monotonic()
+    assert keys.read_events(0.05) == []
+    assert time.monotonic() - start >= 0.04
+
+
+# 用管道模拟evdev设备节点：写入端写入input_event，关闭写入端相当于设备被解绑（POLLHUP）
+class FakeEvdev:
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.path = f'/proc/self/fd/{self.read_fd}'
+
+    def key(self, code, value):
+        os.write(self.write_fd, INPUT_EVENT.pack(0, 0, EV_KEY, code, value))
+
+    def unplug(self):
+        os.close(self.write_fd)
+
+
+def test_evdev_reads_key_events():
+    device = FakeEvdev()
+    keys = EvdevKeys(device.path)
+    device.key(2, 1)
+    device.key(2, 2)  # 自动重复，忽略
+    device.key(2, 0)
+    assert [(event.name, event.pressed) for event in keys.read_events(0.1)] == [("KEY1", True), ("KEY1", False)]
+    keys.close()
+
+
+# 设备断开后不抛出异常，按名称重新找到设备后继续读取
+def test_evdev_reopens_after_hangup(monkeypatch):
+    monkeypatch.setattr(keys_module, 'EVDEV_REOPEN_INTERVAL', 0.01)
+    device = FakeEvdev()
+    keys = EvdevKeys(device.path)
+    device.unplug()
+    assert keys.read_events(0.05) == []
+    assert keys.fd is None
+
+    replacement = FakeEvdev()
+    monkeypatch.setattr(keys_module, 'find_evdev', lambda name: replacement.path)
+    replacement.key(3, 1)
+    assert [(event.name, event.pressed) for event in keys.read_events(0.5)] == [("KEY2", True)]
+    assert keys.path == replacement.path
+    keys.close()
+
+
+def test_evdev_enodev_is_treated_as_unplugged(monkeypatch):
+    device = FakeEvdev()
+    keys = EvdevKeys(device.path)
+    monkeypatch.setattr(keys_module, 'find_evdev', lambda name: None)
+    read = os.read
+
+    def unbound(fd, size):
+        if fd == keys.fd:
+            raise OSError(errno.ENODEV, os.strerror(errno.ENODEV))
+        return read(fd, size)
+
+    monkeypatch.setattr(os, 'read', unbound)
+    device.key(2, 1)
+    assert keys.read_events(0.05) == []
+    assert keys.fd is None
+    assert not any(keys.pressed.values())
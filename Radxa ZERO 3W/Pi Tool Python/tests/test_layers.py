@@ -0,0 +1,60 @@
+import os
+
+import pytest
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from layers import TextCache
+
+# tool.py使用的字体和注释中的系统字体，都没有时跳过
+FONTS = [
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'DejaVuSansYuanTi-Regular.ttf'),
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+]
+# 含字距调整的文字，逐字取整时不同小数起点的光栅化结果不同
+TEXTS = ['AVATAR To Wa', 'CPU 42.5°C', '温度 Température']
+WHITE = (255, 255, 255)
+
+
+@pytest.fixture(params=FONTS, ids=os.path.basename)
+def font_path(request):
+    if not os.path.exists(request.param):
+        pytest.skip(f'没有字体文件 {request.param}')
+    return request.param
+
+
+def assert_same_as_draw_text(cache, xy, text, font, fill=WHITE):
+    expected = Image.new('RGB', (220, 40), (10, 20, 30))
+    ImageDraw.Draw(expected).text(xy, text, font=font, fill=fill)
+    actual = Image.new('RGB', (220, 40), (10, 20, 30))
+    cache.draw(actual, xy, text, font, fill)
+    assert ImageChops.difference(expected, actual).getbbox() is None, (xy, text)
+
+
+# 小数坐标（包括正好0.5）与draw.text逐像素相同
+@pytest.mark.parametrize('size', [11, 16, 18])
+def test_draw_matches_draw_text_at_fractional_offsets(font_path, size):
+    font = ImageFont.truetype(font_path, size)
+    cache = TextCache()
+    for text in TEXTS:
+        for i in range(17):
+            for y in (3, 3.25, 3.5, 3.75):
+                assert_same_as_draw_text(cache, (5 + i / 8, y), text, font)
+
+
+# 超出左上边界的坐标（负的小数坐标直接绘制）
+def test_draw_matches_draw_text_past_top_left(font_path):
+    font = ImageFont.truetype(font_path, 18)
+    cache = TextCache()
+    for xy in [(-3, -2), (-2.5, 4), (4, -2.5), (-0.25, -0.75), (0.5, -1)]:
+        assert_same_as_draw_text(cache, xy, 'AVATAR To Wa', font)
+
+
+# 同一位置重复绘制命中精灵缓存
+def test_sprite_is_cached_per_position(font_path):
+    font = ImageFont.truetype(font_path, 18)
+    cache = TextCache()
+    image = Image.new('RGB', (220, 40))
+    for _ in range(3):
+        cache.draw(image, (10.5, 4), 'To Wa', font, WHITE)
+    assert cache.sprites.misses == 1
+    assert cache.sprites.hits == 2
@@ -0,0 +1,113 @@
+import time
+
+from keys import FakeGpiod, GpiodKeys
+from pages import REFRESH_INTERVAL, REFRESH_ON_CHANGE, REFRESH_ON_INPUT, Page, PageScheduler, Wakeup
+
+
+def render():
+    return None
+
+
+# 记录指纹被计算的次数
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def shown(scheduler, page, now=0.0):
+    assert scheduler.due(page, now)
+    scheduler.rendered(page, now)
+
+
+def test_input_page_waits_only_for_keys():
+    page = Page('password', render, refresh=REFRESH_ON_INPUT)
+    scheduler = PageScheduler()
+    shown(scheduler, page)
+    assert scheduler.timeout(page, 1.0) is None
+    scheduler.notify_change()
+    assert not scheduler.due(page, 100.0)
+    scheduler.notify_input()
+    assert scheduler.due(page, 100.0)
+
+
+def test_invalidate_forces_redraw():
+    page = Page('password', render, refresh=REFRESH_ON_INPUT)
+    scheduler = PageScheduler()
+    shown(scheduler, page)
+    scheduler.invalidate()
+    assert scheduler.due(page, 1.0)
+    scheduler.rendered(page, 1.0)
+    assert not scheduler.due(page, 2.0)
+
+
+# 没有通知时不计算指纹，也不定时唤醒
+def test_change_page_checks_fingerprint_only_when_notified():
+    fingerprint = Counter()
+    page = Page('trend', render, refresh=REFRESH_ON_CHANGE, fingerprint=fingerprint)
+    scheduler = PageScheduler()
+    shown(scheduler, page)
+    calls = fingerprint.calls
+    assert scheduler.timeout(page, 1.0) is None
+    assert not scheduler.due(page, 100.0)
+    assert fingerprint.calls == calls
+
+    scheduler.notify_change()
+    assert not scheduler.due(page, 100.0)
+    assert scheduler.skipped == 1
+
+    fingerprint.value = 1
+    scheduler.notify_change()
+    assert scheduler.due(page, 100.0)
+
+
+def test_poll_page_checks_fingerprint_on_schedule():
+    fingerprint = Counter()
+    page = Page('output', render, refresh=REFRESH_ON_CHANGE, fingerprint=fingerprint, poll=0.25)
+    scheduler = PageScheduler()
+    shown(scheduler, page, 10.0)
+    assert abs(scheduler.timeout(page, 10.1) - 0.15) < 1e-9
+    fingerprint.value = 1
+    assert not scheduler.due(page, 10.1)
+    assert scheduler.due(page, 10.3)
+
+
+def test_interval_page():
+    page = Page('system', render, refresh=REFRESH_INTERVAL, interval=1)
+    scheduler = PageScheduler()
+    shown(scheduler, page, 5.0)
+    assert scheduler.timeout(page, 5.5) == 0.5
+    assert not scheduler.due(page, 5.5)
+    assert scheduler.due(page, 6.0)
+
+
+def test_wakeup_coalesces_notifications():
+    wakeup = Wakeup()
+    try:
+        assert not wakeup.clear()
+        for _ in range(3):
+            wakeup.set()
+        assert wakeup.clear()
+        assert not wakeup.clear()
+    finally:
+        wakeup.close()
+
+
+# 等待按键时收到通知立即返回，不读取通知
+def test_keys_return_early_on_wakeup():
+    buttons = {"KEY1": ("gpiochip3", 5)}
+    keys = GpiodKeys(buttons, gpiod=FakeGpiod(buttons))
+    wakeup = Wakeup()
+    try:
+        keys.watch(wakeup.fileno())
+        wakeup.set()
+        start = time.monotonic()
+        assert keys.read_events(5.0) == []
+        assert time.monotonic() - start < 1.0
+        assert wakeup.clear()
+    finally:
+        wakeup.close()
@@ -0,0 +1,77 @@
+import pytest
+from PIL import Image
+
+import rgb565
+from rgb565 import ENCODERS, encode_into, rgb_to_rgb565_python
+
+WIDTH, HEIGHT = 24, 10
+
+
+def gradient():
+    image = Image.new('RGB', (WIDTH, HEIGHT))
+    image.putdata([(x * 255 // (WIDTH - 1), y * 255 // (HEIGHT - 1), (x * 11 + y * 7) % 256)
+                   for y in range(HEIGHT) for x in range(WIDTH)])
+    return image
+
+
+def with_alpha():
+    image = gradient().convert('RGBA')
+    image.putalpha(Image.linear_gradient('L').resize((WIDTH, HEIGHT)))
+    return image
+
+
+IMAGES = {
+    'black': Image.new('RGB', (WIDTH, HEIGHT), (0, 0, 0)),
+    'white': Image.new('RGB', (WIDTH, HEIGHT), (255, 255, 255)),
+    'red': Image.new('RGB', (WIDTH, HEIGHT), (255, 0, 0)),
+    'green': Image.new('RGB', (WIDTH, HEIGHT), (0, 255, 0)),
+    'blue': Image.new('RGB', (WIDTH, HEIGHT), (0, 0, 255)),
+    'gradient': gradient(),
+    'rgba': with_alpha(),
+}
+
+
+@pytest.fixture(params=list(ENCODERS))
+def encoder(request, monkeypatch):
+    monkeypatch.setattr(rgb565, 'ENCODER', request.param)
+    return request.param
+
+
+def test_known_values():
+    assert bytes(rgb_to_rgb565_python(IMAGES['red']))[:2] == b'\x00\xf8'
+    assert bytes(rgb_to_rgb565_python(IMAGES['green']))[:2] == b'\xe0\x07'
+    assert bytes(rgb_to_rgb565_python(IMAGES['blue']))[:2] == b'\x1f\x00'
+    assert bytes(rgb_to_rgb565_python(IMAGES['white']))[:2] == b'\xff\xff'
+
+
+# 所有编码实现的输出与纯Python实现逐字节相同（RGBA丢弃透明通道）
+@pytest.mark.parametrize('name', list(IMAGES))
+def test_encoders_match(encoder, name):
+    image = IMAGES[name]
+    expected = bytes(rgb_to_rgb565_python(image))
+    assert len(expected) == WIDTH * HEIGHT * 2
+    assert bytes(ENCODERS[encoder](image)) == expected
+    assert bytes(rgb565.rgb_to_rgb565(image)) == expected
+
+
+# 编码到缓冲区的指定偏移，前后的内容保持不变
+@pytest.mark.parametrize('offset', [0, 2, WIDTH * 2 * 3])
+def test_encode_into_offset(encoder, offset):
+    image = IMAGES['gradient']
+    expected = bytes(rgb_to_rgb565_python(image))
+    buffer = bytearray(b'\x55' * (offset + len(expected) + 8))
+    encode_into(image, buffer, offset)
+    assert buffer[:offset] == b'\x55' * offset
+    assert buffer[offset:offset + len(expected)] == expected
+    assert buffer[offset + len(expected):] == b'\x55' * 8
+
+
+# 只编码部分行（帧缓冲的变化区域）时写到对应行的位置
+def test_encode_into_band(encoder):
+    image = IMAGES['gradient']
+    row_bytes = WIDTH * 2
+    buffer = bytearray(len(rgb_to_rgb565_python(image)))
+    encode_into(image.crop((0, 3, WIDTH, 6)), buffer, 3 * row_bytes)
+    expected = bytes(rgb_to_rgb565_python(image))
+    assert buffer[3 * row_bytes:6 * row_bytes] == expected[3 * row_bytes:6 * row_bytes]
+    assert buffer[:3 * row_bytes] == bytes(3 * row_bytes)
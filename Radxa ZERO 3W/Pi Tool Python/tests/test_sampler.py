@@ -0,0 +1,29 @@
+import threading
+import time
+
+from sampler import MetricsSampler
+
+
+# 采样期间恢复暂停的组：唤醒不能被采样线程清除掉，恢复的组要立即采样
+def test_set_period_during_sampling_is_not_lost():
+    sampler = MetricsSampler({name: None for name in MetricsSampler().groups})
+    sampling = threading.Event()
+    resume = threading.Event()
+    sampled = threading.Event()
+
+    def slow():
+        sampling.set()
+        resume.wait(1.0)
+        return {'slow': True}
+
+    sampler.add_group('slow', slow, 60.0)
+    sampler.add_group('fast', lambda: sampled.set() or {'fast': True}, None)
+    sampler.start()
+    try:
+        assert sampling.wait(1.0)
+        sampler.set_period('fast', 60.0)
+        resume.set()
+        assert sampled.wait(2.0)
+    finally:
+        sampler.stop()
+
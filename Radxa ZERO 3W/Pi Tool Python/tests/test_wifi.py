@@ -0,0 +1,78 @@
+import os
+import stat
+import time
+
+from wifi import CONNECT_CONNECTED, WifiConnector, parse_scan
+
+
+def cell(number, ssid, signal_line):
+    return f'''          Cell {number:02d} - Address: 00:11:22:33:44:{number:02X}
+                    Channel:6
+                    {signal_line}
+                    Encryption key:on
+                    ESSID:"{ssid}"
+                    IE: IEEE 802.11i/WPA2 Version 1
+'''
+
+
+def test_dbm_signal():
+    networks = parse_scan(cell(1, 'Weak', 'Quality=30/70  Signal level=-80 dBm') +
+                          cell(2, 'Strong', 'Quality=60/70  Signal level=-45 dBm'))
+    assert [(n.ssid, n.signal) for n in networks] == [('Strong', -45), ('Weak', -80)]
+
+
+# 相对信号强度换算为dBm，与其他驱动的dBm结果一起排序
+def test_relative_signal_is_converted_to_dbm():
+    networks = parse_scan(cell(1, 'Relative', 'Quality=70/100  Signal level=70/100') +
+                          cell(2, 'Dbm', 'Quality=60/70  Signal level=-60 dBm') +
+                          cell(3, 'Full', 'Quality=100/100  Signal level=100/100'))
+    assert [(n.ssid, n.signal) for n in networks] == [('Full', -50), ('Dbm', -60), ('Relative', -65)]
+
+
+# 没有Signal level时用Quality换算
+def test_quality_only():
+    networks = parse_scan(cell(1, 'Quality', 'Quality=35/70') + cell(2, 'None', 'Encryption key:on'))
+    assert [(n.ssid, n.signal) for n in networks] == [('Quality', -75), ('None', -100)]
+
+
+# 同名Wi-Fi保留信号最强的一个
+def test_duplicate_ssid_keeps_strongest():
+    networks = parse_scan(cell(1, 'Mesh', 'Signal level=-70 dBm') + cell(2, 'Mesh', 'Signal level=80/100'))
+    assert len(networks) == 1
+    assert networks[0].signal == -60
+    assert networks[0].bssid == '00:11:22:33:44:02'
+
+
+# 用脚本代替nmcli，记录命令行参数和标准输入
+def fake_nmcli(tmp_path, monkeypatch):
+    script = tmp_path / 'nmcli'
+    script.write_text(f"""#!/bin/sh
+case "$*" in *connect*) echo "$@" > {tmp_path}/argv; cat > {tmp_path}/stdin ;; esac
+""")
+    script.chmod(script.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+def connect(connector, ssid, password):
+    assert connector.connect(ssid, password)
+    deadline = time.monotonic() + 5
+    while connector.busy() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return connector.state
+
+
+# 密码不出现在nmcli的命令行参数中，通过标准输入传递
+def test_password_is_passed_on_stdin(tmp_path, monkeypatch):
+    fake_nmcli(tmp_path, monkeypatch)
+    assert connect(WifiConnector(timeout=5), 'Radxa-Lab', 's3cret pass') == CONNECT_CONNECTED
+    argv = (tmp_path / 'argv').read_text()
+    assert 's3cret' not in argv
+    assert argv.split()[0] == '--ask'
+    assert (tmp_path / 'stdin').read_text() == 's3cret pass\n'
+
+
+def test_open_network_is_not_asked(tmp_path, monkeypatch):
+    fake_nmcli(tmp_path, monkeypatch)
+    assert connect(WifiConnector(timeout=5), 'Guest', '') == CONNECT_CONNECTED
+    assert '--ask' not in (tmp_path / 'argv').read_text()
+    assert (tmp_path / 'stdin').read_text() == ''
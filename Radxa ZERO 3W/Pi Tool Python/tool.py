@@ -1,29 +1,89 @@
+import time
+
+# 进程启动时间，用于统计首帧时间和可交互时间
+STARTED_AT = time.monotonic()
+
 from PIL import Image, ImageDraw, ImageFont
+import math
 import os
-import time
-import psutil
-import socket
-import fcntl
-import struct
-import subprocess
-import gpiod
 import signal
-import binascii
-
-# 设置字体
-try:
-    # font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
-    font_path = "DejaVuSansYuanTi-Regular.ttf"
-    font = ImageFont.truetype(font_path, size=18)  # 调整字体大小为18
-except IOError:
-    print("字体文件未找到，使用默认字体。")
-    font = ImageFont.load_default()
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from cmdrunner import (RUN_CANCELLED, RUN_DONE, RUN_RUNNING, RUN_TIMEOUT, CommandRunner,
+                       command_spec)
+from framebuffer import FrameBuffer
+from history import RESOLUTIONS, normalize
+from export import open_exporter
+from instrument import open_instruments
+from keys import open_keys
+from layers import BackgroundCache, TextCache
+from netinfo import format_wireless
+from pages import CHANGE_POLL_INTERVAL, REFRESH_INTERVAL, REFRESH_ON_CHANGE, REFRESH_ON_INPUT, Page, PageScheduler, Wakeup
+from sampler import MetricsSampler
+from splash import load_splash
+from wifi import (CONNECT_ASSOCIATING, CONNECT_CANCELLED, CONNECT_CONNECTED, CONNECT_DHCP,
+                  CONNECT_FAILED, CONNECT_IDLE, WifiConnector, WifiScanner)
+
+# 字体在启动图片显示期间由load_font()加载
+# font_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+font_path = "DejaVuSansYuanTi-Regular.ttf"
+font = None
 
 # 设置屏幕大小
 WIDTH, HEIGHT = 240, 240
 ROWS = 8
 ROW_HEIGHT = HEIGHT // ROWS
 
+# 检查cmd.json是否被修改的间隔（秒）
+COMMANDS_CHECK_INTERVAL = 1
+
+# 便捷命令页定时检查的间隔（秒）：运行中命令的运行时间每秒更新，重新加载的cmd.json也在这时显示
+COMMAND_TICK = 1
+
+# 设备状态页刷新间隔（秒），对齐到整秒，运行时间逐秒跳动
+SYSTEM_REFRESH = 1
+
+# 帧统计输出间隔（秒）
+STATS_INTERVAL = 60
+
+# 趋势页：左侧显示指标名称和数值，右侧为折线图的起始横坐标
+TREND_GRAPH_LEFT = 100
+
+# 流量页：折线图占用的行（从第几行开始到最后一行），接收和发送的颜色
+TRAFFIC_GRAPH_ROW = 5
+TRAFFIC_RX_COLOR = (0, 255, 0)
+TRAFFIC_TX_COLOR = (255, 165, 0)
+
+# 流量页折线图纵轴的最小上限（字节/秒），空闲接口不会把噪声放大到满幅
+TRAFFIC_MIN_SCALE = 1024
+
+# 存储页：每个挂载点占用的行数（路径和占用、读、写），占用条颜色，占用超过这个百分比时显示为红色
+STORAGE_MOUNT_ROWS = 3
+STORAGE_USAGE_COLOR = (90, 30, 60)
+STORAGE_FULL_PERCENT = 90
+
+# 进程页刷新间隔（秒），只在进程页显示时采样进程表
+PROCESS_REFRESH = 2
+
+# 进程页中本工具所在行的颜色
+PROCESS_OWN_COLOR = (255, 105, 180)
+
+# 趋势页各指标的显示名称、颜色和纵轴范围（None表示按最近的数据自动缩放）
+TREND_SERIES = {
+    'cpu': ("CPU", (0, 255, 0), 0, 100),
+    'temp': ("温度", (255, 165, 0), None, None),
+    'ram': ("RAM", (0, 191, 255), 0, 100),
+    'swap': ("Swap", (255, 105, 180), 0, 100),
+}
+TREND_CORE_COLOR = (0, 200, 0)
+
+# 趋势页自动缩放时纵轴的最小跨度（温度，摄氏度）
+TREND_MIN_SPAN = 5.0
+
+# 各分辨率在标题中的名称
+TREND_STEP_LABELS = {1: "1秒", 60: "1分钟", 900: "15分钟"}
+
 # 按钮配置 (简化版，根据实际情况修改)
 buttons = {
     "Left": ("gpiochip3", 11),     # 左按键
@@ -32,9 +92,22 @@ buttons = {
     "Up": ("gpiochip3", 12),       # 上按键
     "KEY1": ("gpiochip3", 5),      # 输入按键
     "KEY2": ("gpiochip3", 6),      # 退出按键
-    "KEY3": ("gpiochip3", 7)       # 刷新按键
+    "KEY3": ("gpiochip3", 7),      # 刷新按键
+    "Press": ("gpiochip3", 19)     # 摇杆按下（与KEY1相同，作为确认键）
 }
 
+# 按键输入后端：auto（优先使用设备树gpio-keys的evdev设备）、evdev、gpiod
+INPUT_BACKEND = os.environ.get('PI_TOOL_INPUT', 'auto')
+
+# 启动图片最短显示时间（秒），默认初始化完成后立即进入主界面
+SPLASH_MIN_TIME = float(os.environ.get('PI_TOOL_SPLASH_MIN', '0'))
+
+# 主循环各阶段耗时统计，未设置时关闭，格式见instrument.py，例如 socket:/run/pi-tool.sock
+INSTRUMENT = os.environ.get('PI_TOOL_INSTRUMENT', '')
+
+# 在本机导出最新的指标快照（JSON和Prometheus），未设置时关闭，格式见export.py，例如 http:127.0.0.1:9101
+EXPORT = os.environ.get('PI_TOOL_EXPORT', '')
+
 # 定义软键盘布局
 keyboard_layout = [
     ["0", "1", "2", "3", "4", "5", "6", "7"],
@@ -48,10 +121,33 @@ keyboard_layout = [
     ["#", "$", "%", "^", "&", "*", "(", ")"]
 ]
 
-# GPIO初始化
-chips = {}
-lines = {}
-prev_values = {}  # 用于存储每个按钮的前一个状态
+# 按键输入，在main()中初始化
+keys = None
+
+# 指标采样周期（秒），如 {'cpu': 1.0, 'disk': 30.0}，未列出的组使用sampler.PERIODS中的默认值
+SAMPLE_PERIODS = {}
+
+# 后台Wi-Fi扫描和连接
+wifi_scanner = WifiScanner('wlan0')
+wifi_connector = WifiConnector('wlan0')
+
+# Wi-Fi连接状态在密码输入页第一行显示的文字
+CONNECT_STATUS_TEXT = {
+    CONNECT_ASSOCIATING: "正在连接...",
+    CONNECT_DHCP: "正在获取IP...",
+    CONNECT_CONNECTED: "连接成功",
+    CONNECT_FAILED: "连接失败",
+    CONNECT_CANCELLED: "已取消",
+}
+
+# 连接结束后显示结果的时间（秒），之后自动跳转
+CONNECT_RESULT_HOLD = 2
+
+# 后台指标采样，页面只读取最新快照
+sampler = MetricsSampler(SAMPLE_PERIODS)
+
+# 后台线程（采样、Wi-Fi扫描和连接、命令）数据变化时唤醒主循环
+wakeup = Wakeup()
 
 # 当前页面索引 (0:设备状态页, 1:网络信息页, 2:Wi-Fi列表页)
 current_page = 0
@@ -63,6 +159,7 @@ start_wifi_index = 0  # 用于滚动显示Wi-Fi列表
 wifi_list_scanned = False  # 标志是否已经扫描过Wi-Fi列表
 current_wifi_name = ""  # 当前连接的Wi-Fi名称
 current_wifi_password = ""  # 当前输入的密码
+password_ssid = ""  # 密码输入页要连接的Wi-Fi，进入时记录，不受之后扫描结果更新的影响
 selected_key_row = 0  # 当前选中的软键盘行索引
 selected_key_col = 0  # 当前选中的软键盘列索引
 start_key_row = 0  # 软键盘滚动显示的起始行
@@ -70,6 +167,15 @@ selected_cmd_index = 0
 start_cmd_index = 0
 cmd_list = []
 cmd_dict = {}
+cmd_error = ""  # 最近一次加载cmd.json失败的原因，加载成功时为空
+cmd_file_stamp = None  # 已加载的cmd.json的修改时间、大小和inode
+cmd_checked_at = 0.0  # 上次检查cmd.json的时间
+wifi_list = []  # 扫描到的Wi-Fi列表（WifiNetwork记录，按信号强度排序）
+wifi_list_version = -1  # 已同步的扫描结果版本
+connection_status = ""  # Wi-Fi连接状态
+fb = None  # 帧缓冲输出，在main()中打开
+instruments = None  # 耗时统计，在main()中按INSTRUMENT启用
+exporter = None  # 指标导出，在main()中按EXPORT启用
 
 # 关闭光标闪烁
 try:
@@ -78,183 +184,50 @@ try:
 except IOError:
     print("无法关闭光标闪烁，请检查权限或路径是否正确。")
 
+# 便携命令在后台运行
+command_runner = CommandRunner()
+
+# 命令输出页：查看的命令名称、第一行显示的输出行序号、是否跟随最新输出
+output_command = None
+output_top = 0
+output_follow = True
+
+# 趋势页：当前分辨率（RESOLUTIONS中的索引）和第一行显示的指标序号
+trend_resolution = 0
+trend_top = 0
+
+# 流量页：当前显示的网络接口名称
+traffic_interface = None
+
+# 存储页：第一个显示的挂载点序号
+storage_top = 0
+
+# 进程页：排序方式（'cpu' 或 'rss'）
+process_sort = 'cpu'
+
+# 页面静态背景缓存
+backgrounds = BackgroundCache()
+
+# 密码输入页上一次渲染的画面和状态，用于局部重绘
+keyboard_view = None
+
+# 文字尺寸和光栅化结果缓存
+text_cache = TextCache()
+
 # 获取当前脚本所在目录
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
-# 将16进制的UTF-8编码转换为中文
-def hex_to_chinese(hex_str):
-    try:
-        # 移除可能的引号
-        hex_str = hex_str.strip('"')
-        # 将字符串转换为字节
-        bytes_obj = bytes.fromhex(hex_str)
-        # 解码为UTF-8字符串
-        chinese_str = bytes_obj.decode('utf-8')
-        return chinese_str
-    except (ValueError, UnicodeDecodeError):
-        return hex_str
-
-# 获取网络接口IP地址
-def get_ip_address(ifname):
-    try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        return socket.inet_ntoa(fcntl.ioctl(
-            s.fileno(),
-            0x8915,  # SIOCGIFADDR
-            struct.pack('256s', bytes(ifname[:15], 'utf-8'))
-        )[20:24])
-    except:
-        return "N/A"
-
-# 获取网关IP地址
-def get_gateway():
-    try:
-        result = subprocess.run(['ip', 'route'], stdout=subprocess.PIPE)
-        routes = result.stdout.decode().split('\n')
-        for route in routes:
-            if 'default' in route:
-                gateway = route.split()[2]
-                return gateway
-        return "N/A"
-    except:
-        return "N/A"
-
-# 获取无线网络信息
-def get_wireless_info():
-    try:
-        output = subprocess.check_output(['iwconfig', 'wlan0'])
-        output = output.decode('utf-8', errors='replace')  # 处理中文转义问题
-        
-        # 获取 ESSID
-        essid_start = output.find('ESSID:"') + 7
-        essid_end = output.find('"', essid_start)
-        essid = output[essid_start:essid_end]
-        
-        # 使用echo -e处理转义字符
-        try:
-            decoded_essid = subprocess.check_output(['echo', '-e', essid])
-            decoded_essid = decoded_essid.decode('utf-8').strip()
-        except:
-            decoded_essid = essid
-        
-        # 尝试将ESSID从16进制转换为中文
-        if all(c in '0123456789abcdefABCDEF' for c in decoded_essid):
-            decoded_essid = hex_to_chinese(decoded_essid)
-        
-        # 获取 Bit Rate
-        bit_rate_start = output.find('Bit Rate=') + 9
-        bit_rate_end = output.find(' ', bit_rate_start)
-        bit_rate = output[bit_rate_start:bit_rate_end] + ' Mb/s'
-        
-        # 获取 Link Quality
-        link_quality_start = output.find('Link Quality=') + 13
-        link_quality_end = output.find(' ', link_quality_start)
-        link_quality = output[link_quality_start:link_quality_end]
-        
-        # 获取 Signal level
-        signal_level_start = output.find('Signal level=') + 13
-        signal_level_end = output.find(' ', signal_level_start)
-        signal_level = output[signal_level_start:signal_level_end] + ' dBm'
-        
-        return {
-            'essid': decoded_essid,
-            'bit_rate': bit_rate,
-            'link_quality': link_quality,
-            'signal_level': signal_level
-        }
-    except:
-        return {
-            'essid': "N/A",
-            'bit_rate': "N/A",
-            'link_quality': "N/A",
-            'signal_level': "N/A"
-        }
-
-# 连接Wi-Fi函数
-def connect_wifi(ssid, password):
-    try:
-        # 这里是一个简单的示例，实际连接Wi-Fi的代码可能需要根据你的系统进行调整
-        # 例如，可以使用`nmcli`命令来连接Wi-Fi
-        # nmcli device wifi connect <SSID> password <密码>
-        # 请根据你的系统环境修改此部分代码
-        command = f"nmcli device wifi connect '{ssid}' password '{password}'"
-        result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        return result.returncode == 0
-    except:
-        return False
-
-# 扫描周围Wi-Fi
-def scan_wifi():
+# 加载字体
+def load_font():
+    global font
     try:
-        output = subprocess.check_output(['iwlist', 'wlan0', 'scan'])
-        output = output.decode('utf-8', errors='replace')  # 处理中文转义问题
-        
-        # 解析Wi-Fi列表
-        wifi_entries = output.split('Cell ')
-        wifi_names = []
-        
-        for entry in wifi_entries:
-            if 'ESSID:' in entry:
-                essid_start = entry.find('ESSID:"') + 7
-                essid_end = entry.find('"', essid_start)
-                essid = entry[essid_start:essid_end]
-                
-                # 如果ESSID为空，跳过此Wi-Fi
-                if not essid:
-                    continue
-                
-                # 使用echo -e处理转义字符
-                try:
-                    decoded_essid = subprocess.check_output(['echo', '-e', essid])
-                    decoded_essid = decoded_essid.decode('utf-8').strip()
-                except:
-                    decoded_essid = essid
-                
-                wifi_names.append(decoded_essid)
-        
-        # 过滤掉重复和当前连接的Wi-Fi
-        unique_wifi_names = list(set(wifi_names))
-        if current_wifi_name in unique_wifi_names:
-            unique_wifi_names.remove(current_wifi_name)
-        
-        return unique_wifi_names
-    except:
-        return []
-
-# 将图像转换为RGB565格式，确保字节序正确
-def rgb_to_rgb565(image):
-    result = bytearray()
-    for pixel in image.getdata():
-        # 处理不同模式的图像数据
-        if len(pixel) == 4:  # RGBA 模式
-            r, g, b, _ = pixel
-        else:  # RGB 模式
-            r, g, b = pixel
-        
-        # 确保RGB值在有效范围内
-        r = min(max(r, 0), 255)
-        g = min(max(g, 0), 255)
-        b = min(max(b, 0), 255)
-        
-        # 根据fbset的输出使用正确的位掩码
-        # 格式: rgba 5/11,6/5,5/0,0/0
-        red = (r >> 3) & 0x1F
-        green = (g >> 2) & 0x3F
-        blue = (b >> 3) & 0x1F
-        
-        # 组合成16位RGB565值，并确保字节序正确
-        rgb565 = (red << 11) | (green << 5) | blue
-        
-        # 确保字节序正确（低字节在前，高字节在后）
-        result.append(rgb565 & 0xFF)
-        result.append((rgb565 >> 8) & 0xFF)
-    return result
-
-# 更新设备状态页
-def update_system_display():
-    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))  # 黑色背景
-    draw = ImageDraw.Draw(image)
+        font = ImageFont.truetype(font_path, size=18)  # 调整字体大小为18
+    except IOError:
+        print("字体文件未找到，使用默认字体。")
+        font = ImageFont.load_default()
 
+# 绘制页面通用背景：深粉色边框和水平网格线
+def draw_page_chrome(draw):
     # 绘制深粉色边框
     draw.rectangle([(0, 0), (WIDTH-1, HEIGHT-1)], outline=(255, 105, 180), width=1)
 
@@ -263,215 +236,253 @@ def update_system_display():
         y = i * ROW_HEIGHT
         draw.line([(0, y), (WIDTH, y)], fill=(255, 105, 180), width=1)
 
+# 列表类页面背景（网络信息页、Wi-Fi列表页、便携命令页）
+def build_list_background():
+    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))  # 黑色背景
+    draw_page_chrome(ImageDraw.Draw(image))
+    return image
+
+# 设备状态页背景：通用背景加上各行的垂直分隔线
+def build_system_background():
+    image = build_list_background()
+    draw = ImageDraw.Draw(image)
+    # 每行的列数：系统信息、运行时间、CPU/温度、核心占用、RAM、内存标签、内存使用、磁盘
+    columns = [1, 4, 2, 4, 2, 3, 3, 2]
+    for row, count in enumerate(columns):
+        for i in range(1, count):
+            x = WIDTH // count * i
+            draw.line([(x, ROW_HEIGHT*row), (x, ROW_HEIGHT*(row+1))], fill=(255, 105, 180), width=1)
+    return image
+
+# 密码输入页背景：通用背景加上软键盘的垂直网格线
+def build_keyboard_background():
+    image = build_list_background()
+    draw = ImageDraw.Draw(image)
+
+    # 绘制垂直网格线（深粉色）从第二行开始
+    for i in range(1, 9):  # 8列
+        x = i * (WIDTH // 8)
+        for j in range(1, ROWS):  # 从第二行开始
+            y_start = j * ROW_HEIGHT
+            y_end = (j + 1) * ROW_HEIGHT
+            draw.line([(x, y_start), (x, y_end)], fill=(255, 105, 180), width=1)
+    return image
+
+# 趋势页背景：通用背景加上指标名称和折线图之间的垂直分隔线
+def build_trend_background():
+    image = build_list_background()
+    draw = ImageDraw.Draw(image)
+    x = TREND_GRAPH_LEFT - 4
+    draw.line([(x, ROW_HEIGHT), (x, HEIGHT)], fill=(255, 105, 180), width=1)
+    return image
+
+# 流量页背景：折线图区域没有水平网格线
+def build_traffic_background():
+    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([(0, 0), (WIDTH-1, HEIGHT-1)], outline=(255, 105, 180), width=1)
+    for i in range(1, TRAFFIC_GRAPH_ROW + 1):
+        y = i * ROW_HEIGHT
+        draw.line([(0, y), (WIDTH, y)], fill=(255, 105, 180), width=1)
+    return image
+
+PAGE_BACKGROUNDS = {
+    'list': build_list_background,
+    'system': build_system_background,
+    'keyboard': build_keyboard_background,
+    'trend': build_trend_background,
+    'traffic': build_traffic_background,
+}
+
+# 获取页面背景的副本，每个页面和布局只绘制一次
+def page_background(name):
+    return backgrounds.get((name, WIDTH, HEIGHT, ROWS), PAGE_BACKGROUNDS[name])
+
+# 获取缓存的页面背景本身（只读），用于局部恢复背景
+def page_layer(name):
+    return backgrounds.layer((name, WIDTH, HEIGHT, ROWS), PAGE_BACKGROUNDS[name])
+
+# 更新设备状态页
+def update_system_display():
+    image = page_background('system')
+    draw = ImageDraw.Draw(image)
+
+    # 读取最新的指标快照
+    snapshot = sampler.snapshot
+
     # 第一行 - 系统信息
-    try:
-        with open('/etc/issue', 'r') as f:
-            system_info = f.read().strip()
-        system_info = system_info.replace(r'\n', '').replace(r'\l', '')
-    except:
-        system_info = "Debian GNU/Linux 11"
-    bbox = font.getbbox(system_info)
+    system_info = snapshot['system_info']
+    bbox = text_cache.getbbox(system_info, font)
     text_width = bbox[2] - bbox[0]
     text_height = bbox[3] - bbox[1]
     x = (WIDTH - text_width) // 2
     y = (ROW_HEIGHT - text_height) // 2
-    draw.text((x, y), system_info, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (x, y), system_info, font, (255, 255, 255))
 
     # 第二行 - 运行时间
-    uptime = time.time() - psutil.boot_time()
+    uptime = time.time() - snapshot['boot_time']
     days = int(uptime // 86400)
     hours = int((uptime % 86400) // 3600)
     minutes = int((uptime % 3600) // 60)
     seconds = int(uptime % 60)
-    for i in range(1, 4):
-        x = WIDTH // 4 * i
-        draw.line([(x, ROW_HEIGHT*1), (x, ROW_HEIGHT*2)], fill=(255, 105, 180), width=1)
     y_center = ROW_HEIGHT*1 + (ROW_HEIGHT - text_height) // 2
     time_segments = [f"{days}D", f"{hours}H", f"{minutes}M", f"{seconds}S"]
     for i in range(4):
         segment = time_segments[i]
-        segment_bbox = font.getbbox(segment)
+        segment_bbox = text_cache.getbbox(segment, font)
         segment_width = segment_bbox[2] - segment_bbox[0]
         x_pos = WIDTH // 8 * (2 * i + 1) - segment_width // 2
-        draw.text((x_pos, y_center), segment, font=font, fill=(255, 255, 255))
+        text_cache.draw(image, (x_pos, y_center), segment, font, (255, 255, 255))
 
     # 第三行 - CPU使用率和温度
-    cpu_usage = psutil.cpu_percent(interval=0.1)
-    cpu_temp = get_cpu_temp()
-    x = WIDTH // 2
-    draw.line([(x, ROW_HEIGHT*2), (x, ROW_HEIGHT*3)], fill=(255, 105, 180), width=1)
+    cpu_usage = snapshot['cpu_percent']
+    cpu_temp = snapshot['cpu_temp']
     y_center = ROW_HEIGHT*2 + (ROW_HEIGHT - text_height) // 2
     cpu_text = f"CPU {cpu_usage}%"
     temp_text = f"Temp {cpu_temp}"
-    cpu_bbox = font.getbbox(cpu_text)
-    temp_bbox = font.getbbox(temp_text)
+    cpu_bbox = text_cache.getbbox(cpu_text, font)
+    temp_bbox = text_cache.getbbox(temp_text, font)
     cpu_text_width = cpu_bbox[2] - cpu_bbox[0]
     temp_text_width = temp_bbox[2] - temp_bbox[0]
-    draw.text((WIDTH//4 - cpu_text_width//2, y_center), cpu_text, font=font, fill=(255, 255, 255))
-    draw.text((3*WIDTH//4 - temp_text_width//2, y_center), temp_text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH//4 - cpu_text_width//2, y_center), cpu_text, font, (255, 255, 255))
+    text_cache.draw(image, (3*WIDTH//4 - temp_text_width//2, y_center), temp_text, font, (255, 255, 255))
 
     # 第四行 - 每个核心的使用率
-    per_cpu_usage = psutil.cpu_percent(percpu=True)
+    per_cpu_usage = list(snapshot['per_cpu'])
     if len(per_cpu_usage) < 4:
         per_cpu_usage.extend([0.0] * (4 - len(per_cpu_usage)))
-    for i in range(1, 4):
-        x = WIDTH // 4 * i
-        draw.line([(x, ROW_HEIGHT*3), (x, ROW_HEIGHT*4)], fill=(255, 105, 180), width=1)
     y_center = ROW_HEIGHT*3 + (ROW_HEIGHT - text_height) // 2
     for i in range(4):
         core_text = f"{per_cpu_usage[i]:.0f}%"
-        core_bbox = font.getbbox(core_text)
+        core_bbox = text_cache.getbbox(core_text, font)
         core_text_width = core_bbox[2] - core_bbox[0]
-        draw.text((WIDTH//8*(2*i + 1) - core_text_width//2, y_center), core_text, font=font, fill=(255, 255, 255))
+        text_cache.draw(image, (WIDTH//8*(2*i + 1) - core_text_width//2, y_center), core_text, font, (255, 255, 255))
 
     # 第五行 - RAM占用
-    ram_usage = psutil.virtual_memory().percent
-    free_memory = psutil.virtual_memory().free / 1024**2  # MB
-    x = WIDTH // 2
-    draw.line([(x, ROW_HEIGHT*4), (x, ROW_HEIGHT*5)], fill=(255, 105, 180), width=1)
+    memory_info = snapshot['memory']
+    ram_usage = memory_info.percent
+    free_memory = memory_info.free / 1024**2  # MB
     y_center = ROW_HEIGHT*4 + (ROW_HEIGHT - text_height) // 2
     ram_text = f"RAM {ram_usage}%"
     free_text = f"Free {free_memory:.0f}M"
-    ram_bbox = font.getbbox(ram_text)
-    free_bbox = font.getbbox(free_text)
+    ram_bbox = text_cache.getbbox(ram_text, font)
+    free_bbox = text_cache.getbbox(free_text, font)
     ram_text_width = ram_bbox[2] - ram_bbox[0]
     free_text_width = free_bbox[2] - free_bbox[0]
-    draw.text((WIDTH//4 - ram_text_width//2, y_center), ram_text, font=font, fill=(255, 255, 255))
-    draw.text((3*WIDTH//4 - free_text_width//2, y_center), free_text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH//4 - ram_text_width//2, y_center), ram_text, font, (255, 255, 255))
+    text_cache.draw(image, (3*WIDTH//4 - free_text_width//2, y_center), free_text, font, (255, 255, 255))
 
     # 第六行 - 内存类型标签
     labels = ["Mem", "Cache", "Swap"]
-    for i in range(1, 3):
-        x = WIDTH // 3 * i
-        draw.line([(x, ROW_HEIGHT*5), (x, ROW_HEIGHT*6)], fill=(255, 105, 180), width=1)
     y_center = ROW_HEIGHT*5 + (ROW_HEIGHT - text_height) // 2
     for i in range(3):
-        label_bbox = font.getbbox(labels[i])
+        label_bbox = text_cache.getbbox(labels[i], font)
         label_text_width = label_bbox[2] - label_bbox[0]
-        draw.text((WIDTH//6*(2*i + 1) - label_text_width//2, y_center), labels[i], font=font, fill=(255, 255, 255))
+        text_cache.draw(image, (WIDTH//6*(2*i + 1) - label_text_width//2, y_center), labels[i], font, (255, 255, 255))
 
     # 第七行 - 内存使用情况
-    memory_info = psutil.virtual_memory()
-    swap_memory = psutil.swap_memory().used / 1024**2  # MB
+    swap_memory = snapshot['swap'].used / 1024**2  # MB
     mem_used = (memory_info.total - memory_info.available) / 1024**2  # MB
     cache_memory = memory_info.cached / 1024**2  # MB
-    for i in range(1, 3):
-        x = WIDTH // 3 * i
-        draw.line([(x, ROW_HEIGHT*6), (x, ROW_HEIGHT*7)], fill=(255, 105, 180), width=1)
     y_center = ROW_HEIGHT*6 + (ROW_HEIGHT - text_height) // 2
     mem_text = f"{mem_used:.0f}M"
     cache_text = f"{cache_memory:.0f}M"
     swap_text = f"{swap_memory:.0f}M"
-    mem_bbox = font.getbbox(mem_text)
-    cache_bbox = font.getbbox(cache_text)
-    swap_bbox = font.getbbox(swap_text)
+    mem_bbox = text_cache.getbbox(mem_text, font)
+    cache_bbox = text_cache.getbbox(cache_text, font)
+    swap_bbox = text_cache.getbbox(swap_text, font)
     mem_text_width = mem_bbox[2] - mem_bbox[0]
     cache_text_width = cache_bbox[2] - cache_bbox[0]
     swap_text_width = swap_bbox[2] - swap_bbox[0]
-    draw.text((WIDTH//6 - mem_text_width//2, y_center), mem_text, font=font, fill=(255, 255, 255))
-    draw.text((WIDTH//6*3 - cache_text_width//2, y_center), cache_text, font=font, fill=(255, 255, 255))
-    draw.text((WIDTH//6*5 - swap_text_width//2, y_center), swap_text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH//6 - mem_text_width//2, y_center), mem_text, font, (255, 255, 255))
+    text_cache.draw(image, (WIDTH//6*3 - cache_text_width//2, y_center), cache_text, font, (255, 255, 255))
+    text_cache.draw(image, (WIDTH//6*5 - swap_text_width//2, y_center), swap_text, font, (255, 255, 255))
 
     # 第八行 - 磁盘使用情况
-    disk_usage = psutil.disk_usage('/').percent
-    disk_free = psutil.disk_usage('/').free / 1024**3  # GB
-    x = WIDTH // 2
-    draw.line([(x, ROW_HEIGHT*7), (x, ROW_HEIGHT*8)], fill=(255, 105, 180), width=1)
+    disk_usage = snapshot['disk'].percent
+    disk_free = snapshot['disk'].free / 1024**3  # GB
     y_center = ROW_HEIGHT*7 + (ROW_HEIGHT - text_height) // 2
     disk_text = f"Disk {disk_usage}%"
     free_text = f"Free {disk_free:.1f}G"
-    disk_bbox = font.getbbox(disk_text)
-    free_bbox = font.getbbox(free_text)
+    disk_bbox = text_cache.getbbox(disk_text, font)
+    free_bbox = text_cache.getbbox(free_text, font)
     disk_text_width = disk_bbox[2] - disk_bbox[0]
     free_text_width = free_bbox[2] - free_bbox[0]
-    draw.text((WIDTH//4 - disk_text_width//2, y_center), disk_text, font=font, fill=(255, 255, 255))
-    draw.text((3*WIDTH//4 - free_text_width//2, y_center), free_text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH//4 - disk_text_width//2, y_center), disk_text, font, (255, 255, 255))
+    text_cache.draw(image, (3*WIDTH//4 - free_text_width//2, y_center), free_text, font, (255, 255, 255))
 
     return image
 
 # 更新网络信息页
 def update_network_display():
-    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))  # 黑色背景
+    image = page_background('list')
     draw = ImageDraw.Draw(image)
 
-    # 绘制深粉色边框
-    draw.rectangle([(0, 0), (WIDTH-1, HEIGHT-1)], outline=(255, 105, 180), width=1)
-
-    # 绘制水平网格线（深粉色）
-    for i in range(1, ROWS):
-        y = i * ROW_HEIGHT
-        draw.line([(0, y), (WIDTH, y)], fill=(255, 105, 180), width=1)
-
-    # 获取无线网络信息
-    wireless_info = get_wireless_info()
+    # 无线网络信息、IPv4地址和网关来自后台采样的快照
+    snapshot = sampler.snapshot
+    wireless_info = format_wireless(snapshot.get('wifi'))
 
     # 第一行 - wlan0
     text = "wlan0"
     y_center = ROW_HEIGHT // 2
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     # 第二行 - wlan0的IPv4地址
-    ip_address = get_ip_address('wlan0')
+    ip_address = interface_address(snapshot, 'wlan0')
     y_center = 2 * ROW_HEIGHT - ROW_HEIGHT // 2
-    draw.text((WIDTH // 2 - font.getlength(ip_address) // 2, y_center - font.size // 2), ip_address, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(ip_address, font) // 2, y_center - font.size // 2), ip_address, font, (255, 255, 255))
 
     # 第三行 - gateway
     text = "gateway"
     y_center = 3 * ROW_HEIGHT - ROW_HEIGHT // 2
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     # 第四行 - 网关IP地址
-    gateway = get_gateway()
+    gateway = snapshot.get('gateway', "N/A")
     y_center = 4 * ROW_HEIGHT - ROW_HEIGHT // 2
-    draw.text((WIDTH // 2 - font.getlength(gateway) // 2, y_center - font.size // 2), gateway, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(gateway, font) // 2, y_center - font.size // 2), gateway, font, (255, 255, 255))
 
     # 第五行 - ESSID
     essid = wireless_info['essid']
     y_center = 5 * ROW_HEIGHT - ROW_HEIGHT // 2
     text = f"ESSID: {essid}"
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     # 第六行 - Bit Rate
     bit_rate = wireless_info['bit_rate']
     y_center = 6 * ROW_HEIGHT - ROW_HEIGHT // 2
     text = f"Bit Rate: {bit_rate}"
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     # 第七行 - Link Quality
     link_quality = wireless_info['link_quality']
     y_center = 7 * ROW_HEIGHT - ROW_HEIGHT // 2
     text = f"Link Quality: {link_quality}"
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     # 第八行 - Signal level
     signal_level = wireless_info['signal_level']
     y_center = 8 * ROW_HEIGHT - ROW_HEIGHT // 2
     text = f"Signal level: {signal_level}"
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     return image
 
 # 更新Wi-Fi列表页
 def update_wifi_list_display():
-    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))  # 黑色背景
+    image = page_background('list')
     draw = ImageDraw.Draw(image)
 
-    # 绘制深粉色边框
-    draw.rectangle([(0, 0), (WIDTH-1, HEIGHT-1)], outline=(255, 105, 180), width=1)
-
-    # 绘制水平网格线（深粉色）
-    for i in range(1, ROWS):
-        y = i * ROW_HEIGHT
-        draw.line([(0, y), (WIDTH, y)], fill=(255, 105, 180), width=1)
-
-    # 获取当前连接的Wi-Fi名称，并解码
-    wireless_info = get_wireless_info()  # 获取无线网络信息
-    current_wifi_name = wireless_info['essid']  # 使用get_wireless_info()获取的ESSID，该函数内部已经处理了echo -e和解码逻辑
+    # 当前连接的Wi-Fi名称（快照中的ESSID已经处理了转义和解码）
+    current_wifi_name = format_wireless(sampler.snapshot.get('wifi'))['essid']
 
-    # 第一行 - 当前连接的Wi-Fi
-    text = f"Connected: {current_wifi_name}"
+    # 第一行 - 当前连接的Wi-Fi，扫描中显示扫描状态
+    if wifi_scanner.scanning:
+        text = "Scanning..."
+    else:
+        text = f"Connected: {current_wifi_name}"
     y_center = ROW_HEIGHT // 2
-    draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
 
     # 如果还没有扫描Wi-Fi列表，显示提示信息
     global wifi_list, wifi_list_scanned, selected_wifi_index, start_wifi_index
@@ -480,8 +491,13 @@ def update_wifi_list_display():
         for i in range(1, 8):
             y_center = (i + 1) * ROW_HEIGHT - ROW_HEIGHT // 2
             if i == 1:
-                text = "Press KEY3 to scan Wi-Fi"
-                draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+                if wifi_scanner.scanning:
+                    text = "Scanning Wi-Fi..."
+                elif wifi_scanner.error:
+                    text = "Scan failed, press KEY3"
+                else:
+                    text = "Press KEY3 to scan Wi-Fi"
+                text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
             else:
                 # 其他行保持空白
                 pass
@@ -501,59 +517,303 @@ def update_wifi_list_display():
         start_wifi_index = max(0, end_wifi_index - max_displayed_wifi)
 
     # 显示周围的Wi-Fi列表
-    for i, wifi in enumerate(wifi_list[start_wifi_index:end_wifi_index]):
+    for i, network in enumerate(wifi_list[start_wifi_index:end_wifi_index]):
+        wifi = network.ssid
         if i == selected_wifi_index - start_wifi_index:
             # 选中的Wi-Fi，背景为白色，文字为黑色
             draw.rectangle([(0, (i+2)*ROW_HEIGHT - ROW_HEIGHT), (WIDTH, (i+2)*ROW_HEIGHT)], fill=(255, 255, 255))
-            draw.text((WIDTH // 2 - font.getlength(wifi) // 2, (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2), wifi, font=font, fill=(0, 0, 0))
+            text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(wifi, font) // 2, (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2), wifi, font, (0, 0, 0))
         else:
             # 未选中的Wi-Fi，背景为黑色，文字为白色
-            draw.text((WIDTH // 2 - font.getlength(wifi) // 2, (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2), wifi, font=font, fill=(255, 255, 255))
+            text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(wifi, font) // 2, (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2), wifi, font, (255, 255, 255))
 
     return image
 
-# Wi-Fi密码输入页显示
-def update_password_input_display():
-    global start_key_row  # 声明全局变量
-    
-    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))  # 黑色背景
+# 趋势页显示的指标：总体指标在前，每个核心在后
+def trend_names():
+    names = sampler.history.names()
+    return [name for name in TREND_SERIES if name in names] + \
+        [name for name in names if name not in TREND_SERIES]
+
+# 在 [left, right] x [top, bottom] 区域内绘制折线图，最新的点在最右侧，NaN处断开
+def draw_sparkline(draw, values, left, top, right, bottom, color, low=None, high=None):
+    scaled = normalize(values, low, high, TREND_MIN_SPAN)
+    x0 = right - len(scaled) + 1
+    segment = []
+    for i, value in enumerate(scaled + [float('nan')]):
+        if not math.isnan(value):
+            segment.append((x0 + i, bottom - round(value * (bottom - top))))
+            continue
+        if len(segment) > 1:
+            draw.line(segment, fill=color, width=1)
+        elif segment:
+            draw.point(segment, fill=color)
+        segment = []
+
+# 更新趋势页：第一行为分辨率，下面7行每行一个指标的当前值和折线图
+def update_trend_display():
+    global trend_top
+    image = page_background('trend')
     draw = ImageDraw.Draw(image)
 
-    # 绘制深粉色边框
-    draw.rectangle([(0, 0), (WIDTH-1, HEIGHT-1)], outline=(255, 105, 180), width=1)
+    step = RESOLUTIONS[trend_resolution]
+    title = f"趋势 每点{TREND_STEP_LABELS.get(step, f'{step}秒')}"
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(title, font) // 2, ROW_HEIGHT // 2 - font.size // 2), title, font, (255, 255, 255))
 
-    # 绘制水平网格线（深粉色）
-    for i in range(1, ROWS):
-        y = i * ROW_HEIGHT
-        draw.line([(0, y), (WIDTH, y)], fill=(255, 105, 180), width=1)
+    names = trend_names()
+    trend_top = max(0, min(trend_top, len(names) - (ROWS - 1)))
+    width = WIDTH - 4 - TREND_GRAPH_LEFT + 1
+    for i, name in enumerate(names[trend_top:trend_top + ROWS - 1]):
+        if name in TREND_SERIES:
+            label, color, low, high = TREND_SERIES[name]
+        else:
+            label, color, low, high = f"C{name[3:]}", TREND_CORE_COLOR, 0, 100
+        values = sampler.history.series(name, step, width)
+        current = values[-1] if values else float('nan')
+        if math.isnan(current):
+            text = f"{label} -"
+        elif name == 'temp':
+            text = f"{label} {current:.0f}°"
+        else:
+            text = f"{label} {current:.0f}%"
+        row_top = (i + 1) * ROW_HEIGHT
+        text_cache.draw(image, (4, row_top + ROW_HEIGHT // 2 - font.size // 2), fit_text(text, TREND_GRAPH_LEFT - 10), font, (255, 255, 255))
+        draw_sparkline(draw, values, TREND_GRAPH_LEFT, row_top + 4, WIDTH - 4, row_top + ROW_HEIGHT - 4, color, low, high)
 
-    # 绘制垂直网格线（深粉色）从第二行开始
-    for i in range(1, 9):  # 8列
-        x = i * (WIDTH // 8)
-        for j in range(1, ROWS):  # 从第二行开始
-            y_start = j * ROW_HEIGHT
-            y_end = (j + 1) * ROW_HEIGHT
-            draw.line([(x, y_start), (x, y_end)], fill=(255, 105, 180), width=1)
+    return image
+
+# 流量页显示的网络接口：按名称排序，回环接口放在最后
+def traffic_interfaces():
+    rates = sampler.snapshot.get('net_rates', {})
+    return sorted(rates, key=lambda name: (name == 'lo', name))
+
+# 字节数的简短表示
+def format_size(value):
+    for unit in ("B", "K", "M", "G"):
+        if value < 1000:
+            return f"{value:.0f}{unit}" if unit == "B" or value >= 100 else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}T"
+
+# 每秒字节数的简短表示
+def format_rate(value):
+    return f"{format_size(value)}/s"
+
+# 更新流量页：一页显示一个网络接口的地址、收发速率和最近的速率折线图
+def update_traffic_display():
+    global traffic_interface
+    image = page_background('traffic')
+    draw = ImageDraw.Draw(image)
+
+    interfaces = traffic_interfaces()
+    if not interfaces:
+        text = "没有网络接口"
+        text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, ROW_HEIGHT // 2 - font.size // 2), text, font, (255, 255, 255))
+        return image
+    if traffic_interface not in interfaces:
+        traffic_interface = interfaces[0]
+    name = traffic_interface
+
+    # 第一行 - 接口名称和序号
+    title = fit_text(f"{name} ({interfaces.index(name) + 1}/{len(interfaces)})", WIDTH - 4)
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(title, font) // 2, ROW_HEIGHT // 2 - font.size // 2), title, font, (255, 255, 255))
+
+    # 第二行 - IPv4地址
+    address = interface_address(sampler.snapshot, name)
+    y = ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(address, font) // 2, y), address, font, (255, 255, 255))
+
+    # 第三、四行 - 接收和发送速率（字节/秒、包/秒）
+    rates = sampler.snapshot['net_rates'].get(name)
+    for row, (label, direction, color) in enumerate([("RX", "rx", TRAFFIC_RX_COLOR), ("TX", "tx", TRAFFIC_TX_COLOR)], start=2):
+        y = row * ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+        if rates is None:
+            left, right = f"{label} -", ""
+        else:
+            left = f"{label} {format_rate(rates[f'{direction}_bytes'])}"
+            right = f"{rates[f'{direction}_packets']:.0f}p/s"
+        text_cache.draw(image, (6, y), left, font, color)
+        text_cache.draw(image, (WIDTH - 6 - text_cache.getlength(right, font), y), right, font, color)
+
+    # 第五行 - 折线图的时间范围和纵轴上限
+    top = TRAFFIC_GRAPH_ROW * ROW_HEIGHT + 3
+    left, right, bottom = 3, WIDTH - 4, HEIGHT - 4
+    history = sampler.net.history
+    rx = history.series(f'{name}:rx_bytes', 1, right - left + 1)
+    tx = history.series(f'{name}:tx_bytes', 1, right - left + 1)
+    peak = max([v for v in rx + tx if not math.isnan(v)], default=0)
+    scale = max(peak, TRAFFIC_MIN_SCALE)
+    text = f"{right - left + 1}秒 峰值 {format_rate(peak)}"
+    y = 4 * ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y), text, font, (255, 255, 255))
+
+    # 第六到八行 - 接收和发送速率折线图（同一纵轴）
+    draw_sparkline(draw, rx, left, top, right, bottom, TRAFFIC_RX_COLOR, 0, scale)
+    draw_sparkline(draw, tx, left, top, right, bottom, TRAFFIC_TX_COLOR, 0, scale)
+
+    return image
+
+# 更新存储页：每个挂载点显示路径和占用，以及所在块设备的读写速率、IOPS和利用率
+def update_storage_display():
+    global storage_top
+    image = page_background('list')
+    draw = ImageDraw.Draw(image)
+
+    snapshot = sampler.snapshot
+    mounts = snapshot.get('mounts', ())
+    usage = snapshot.get('mount_usage', {})
+    rates = snapshot.get('disk_rates', {})
+    per_page = (ROWS - 1) // STORAGE_MOUNT_ROWS
+    storage_top = max(0, min(storage_top, len(mounts) - per_page))
+
+    # 第一行 - 页面标题和挂载点数量
+    if mounts:
+        title = f"存储 ({storage_top + 1}-{min(storage_top + per_page, len(mounts))}/{len(mounts)})"
+    else:
+        title = "存储 (没有挂载点)"
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(title, font) // 2, ROW_HEIGHT // 2 - font.size // 2), title, font, (255, 255, 255))
+
+    for i, mount in enumerate(mounts[storage_top:storage_top + per_page]):
+        row = 1 + i * STORAGE_MOUNT_ROWS
+
+        # 挂载路径和占用，背景为占用条
+        disk_usage = usage.get(mount.mountpoint)
+        color = (255, 255, 255)
+        if disk_usage is None:
+            right = "-"
+        else:
+            fill_width = round((WIDTH - 3) * disk_usage.percent / 100)
+            if fill_width > 0:
+                draw.rectangle([(1, row * ROW_HEIGHT + 1), (fill_width, (row + 1) * ROW_HEIGHT - 1)], fill=STORAGE_USAGE_COLOR)
+            right = f"{disk_usage.percent:.0f}% 剩{format_size(disk_usage.free)}"
+            if disk_usage.percent >= STORAGE_FULL_PERCENT:
+                color = (255, 0, 0)
+        y = row * ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+        right_width = text_cache.getlength(right, font)
+        text_cache.draw(image, (6, y), fit_text(mount.mountpoint, WIDTH - right_width - 16), font, (255, 255, 255))
+        text_cache.draw(image, (WIDTH - 6 - right_width, y), right, font, color)
+
+        # 读、写速率和每秒操作数，右侧为设备利用率和设备名称
+        disk_rates = rates.get(mount.disk)
+        for j, (label, direction) in enumerate([("R", "read"), ("W", "write")]):
+            y = (row + 1 + j) * ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+            if disk_rates is None:
+                left = f"{label} -"
+                right = mount.disk if j else ""
+            else:
+                left = f"{label} {format_rate(disk_rates[f'{direction}_bytes'])} {disk_rates[f'{direction}_ops']:.0f}/s"
+                right = mount.disk if j else f"忙{min(100, disk_rates['busy_ms'] / 10):.0f}%"
+            right = fit_text(right, WIDTH // 3)
+            right_width = text_cache.getlength(right, font)
+            text_cache.draw(image, (6, y), fit_text(left, WIDTH - right_width - 16), font, (255, 255, 255))
+            text_cache.draw(image, (WIDTH - 6 - right_width, y), right, font, (255, 255, 255))
 
-    # 第一行 - 密码显示区或连接状态区
+    return image
+
+# 更新进程页：第一行为排序方式和本工具的CPU占用，下面7行为占用最多的进程
+def update_process_display():
+    image = page_background('list')
+
+    snapshot = sampler.snapshot
+    by_cpu = process_sort == 'cpu'
+    warmup = snapshot.get('process_warmup', True)
+    own = snapshot.get('own_process')
+
+    # 第一行 - 排序方式（左）和本工具的CPU占用（右）
+    y = ROW_HEIGHT // 2 - font.size // 2
+    title = "按CPU" if by_cpu else "按内存"
+    own_text = "本工具 -" if own is None or warmup else f"本工具 {own.cpu:.1f}%"
+    text_cache.draw(image, (6, y), title, font, (255, 255, 255))
+    text_cache.draw(image, (WIDTH - 6 - text_cache.getlength(own_text, font), y), own_text, font, PROCESS_OWN_COLOR)
+
+    if 'top_cpu' not in snapshot or (by_cpu and warmup):
+        text = "正在统计..."
+        y = ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+        text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y), text, font, (255, 255, 255))
+        return image
+
+    # 进程名称靠左，CPU占用或常驻内存靠右
+    for i, process in enumerate(snapshot['top_cpu' if by_cpu else 'top_rss']):
+        y = (i + 1) * ROW_HEIGHT + ROW_HEIGHT // 2 - font.size // 2
+        value = f"{process.cpu:.1f}%" if by_cpu else format_size(process.rss)
+        color = PROCESS_OWN_COLOR if own is not None and process.pid == own.pid else (255, 255, 255)
+        value_width = text_cache.getlength(value, font)
+        text_cache.draw(image, (6, y), fit_text(process.name, WIDTH - value_width - 16), font, color)
+        text_cache.draw(image, (WIDTH - 6 - value_width, y), value, font, color)
+
+    return image
+
+# 快照中接口的第一个IPv4地址，没有地址时为N/A
+def interface_address(snapshot, name):
+    addresses = snapshot.get('addresses', {}).get(name)
+    return addresses[0] if addresses else "N/A"
+
+# 截断超出宽度的文字
+def fit_text(text, max_width):
+    return text_cache.fit(text, font, max_width)
+
+# 密码输入页第一行的内容：连接状态或密码，以及文字颜色
+def password_header():
     if connection_status:
         # 显示连接状态
-        text = connection_status
-        text_color = (0, 255, 0) if connection_status == "连接成功" else (255, 0, 0)  # 绿色或红色
+        text = fit_text(connection_status, WIDTH - 4)
+        if wifi_connector.busy():
+            text_color = (255, 255, 0)  # 黄色
+        else:
+            text_color = (0, 255, 0) if wifi_connector.state == CONNECT_CONNECTED else (255, 0, 0)  # 绿色或红色
     else:
         # 显示密码
         text = current_wifi_password
         text_color = (255, 255, 255)  # 白色
+    return text, text_color
+
+# 绘制密码输入页第一行
+def draw_password_header(image, header):
+    text, text_color = header
 
     # 计算文本位置
-    text_width = font.getlength(text)
+    text_width = text_cache.getlength(text, font)
     text_height = font.size
     x = (WIDTH - text_width) // 2
     y = (ROW_HEIGHT - text_height) // 2
 
-    draw.text((x, y), text, font=font, fill=text_color)
+    text_cache.draw(image, (x, y), text, font, text_color)
+
+# 软键盘中一个键的区域（包含边线）
+def key_box(row_idx, col_idx):
+    x = col_idx * (WIDTH // 8)
+    y = (row_idx - start_key_row + 1) * ROW_HEIGHT  # 调整行索引
+    return x, y, x + WIDTH // 8, y + ROW_HEIGHT
+
+# 绘制软键盘中的一个键
+def draw_key(image, draw, row_idx, col_idx):
+    key = keyboard_layout[row_idx][col_idx]
+    x, y, right, bottom = key_box(row_idx, col_idx)
+
+    # 计算文本的起始位置，确保其居中显示
+    key_text_width = text_cache.getlength(key, font)
+    key_text_height = font.size
+    key_text_x = x + (WIDTH // 8 - key_text_width) // 2
+    key_text_y = y + (ROW_HEIGHT - key_text_height) // 2
+
+    # 是否选中当前键
+    if row_idx == selected_key_row and col_idx == selected_key_col:
+        # 选中的键，背景为白色，文字为黑色
+        draw.rectangle([(x, y), (right, bottom)], fill=(255, 255, 255))
+        text_cache.draw(image, (key_text_x, key_text_y), key, font, (0, 0, 0))
+    else:
+        # 未选中的键，背景为黑色，文字为白色
+        text_cache.draw(image, (key_text_x, key_text_y), key, font, (255, 255, 255))
+
+# Wi-Fi密码输入页显示
+# 保留上一次渲染的画面：光标移动时只恢复原来的键并绘制新选中的键，第一行内容变化时只重绘第一行，
+# 只有软键盘滚动时才整页重绘
+def update_password_input_display():
+    global start_key_row, keyboard_view  # 声明全局变量
+
+    header = password_header()
 
-    # 绘制软键盘
+    # 计算软键盘显示范围
     max_displayed_rows = ROWS - 1  # 最多显示7行软键盘（从第二行开始）
     if len(keyboard_layout) > max_displayed_rows:
         # 检查是否需要滚动
@@ -567,57 +827,105 @@ def update_password_input_display():
         end_key_row = len(keyboard_layout)
         start_key_row = max(0, end_key_row - max_displayed_rows)
 
-    for row_idx in range(start_key_row, end_key_row):
-        for col_idx, key in enumerate(keyboard_layout[row_idx]):
-            x = col_idx * (WIDTH // 8)
-            y = (row_idx - start_key_row + 1) * ROW_HEIGHT  # 调整行索引
-
-            # 计算文本的起始位置，确保其居中显示
-            key_text_width = font.getlength(key)
-            key_text_height = font.size
-            key_text_x = x + (WIDTH // 8 - key_text_width) // 2
-            key_text_y = y + (ROW_HEIGHT - key_text_height) // 2
-
-            # 是否选中当前键
-            if row_idx == selected_key_row and col_idx == selected_key_col:
-                # 选中的键，背景为白色，文字为黑色
-                draw.rectangle([(x, y), (x + WIDTH // 8, y + ROW_HEIGHT)], fill=(255, 255, 255))
-                draw.text((key_text_x, key_text_y), key, font=font, fill=(0, 0, 0))
-            else:
-                # 未选中的键，背景为黑色，文字为白色
-                draw.text((key_text_x, key_text_y), key, font=font, fill=(255, 255, 255))
+    cursor = (selected_key_row, selected_key_col)
+    if keyboard_view is not None and keyboard_view['start_key_row'] == start_key_row:
+        image = keyboard_view['image']
+        draw = ImageDraw.Draw(image)
+        background = page_layer('keyboard')
+
+        # 第一行内容变化时恢复背景后重绘
+        if header != keyboard_view['header']:
+            image.paste(background.crop((0, 0, WIDTH, ROW_HEIGHT)), (0, 0))
+            draw_password_header(image, header)
+
+        # 光标移动时恢复原来选中的键，再绘制新选中的键
+        if cursor != keyboard_view['cursor']:
+            row_idx, col_idx = keyboard_view['cursor']
+            x, y, right, bottom = key_box(row_idx, col_idx)
+            image.paste(background.crop((x, y, right + 1, bottom + 1)), (x, y))
+            draw_key(image, draw, row_idx, col_idx)
+            draw_key(image, draw, selected_key_row, selected_key_col)
+    else:
+        image = page_background('keyboard')
+        draw = ImageDraw.Draw(image)
 
+        # 第一行 - 密码显示区或连接状态区
+        draw_password_header(image, header)
+
+        # 绘制软键盘
+        for row_idx in range(start_key_row, end_key_row):
+            for col_idx in range(len(keyboard_layout[row_idx])):
+                draw_key(image, draw, row_idx, col_idx)
+
+    keyboard_view = {'image': image, 'start_key_row': start_key_row, 'header': header, 'cursor': cursor}
     return image
 
+# cmd.json的路径
+def commands_path():
+    return os.path.join(current_dir, 'cmd.json')
+
+# cmd.json的修改时间、大小和inode，文件不存在时返回None
+def commands_stamp():
+    try:
+        stat = os.stat(commands_path())
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
 # 加载便携命令
+# 文件无效时保留上一次成功加载的命令并记录错误；加载成功后整体替换命令列表，尽量保持原来选中的命令
 def load_commands():
-    global cmd_list, cmd_dict
+    global cmd_list, cmd_dict, cmd_error, cmd_file_stamp, selected_cmd_index, start_cmd_index
+    cmd_file_stamp = commands_stamp()
     try:
         import json
-        with open(os.path.join(current_dir, 'cmd.json'), 'r') as f:
-            cmd_dict = json.load(f)
-        cmd_list = list(cmd_dict.keys())
+        with open(commands_path(), 'r') as f:
+            commands = json.load(f)
+        if not isinstance(commands, dict):
+            raise ValueError("cmd.json的内容必须是对象")
+        for name, value in commands.items():
+            try:
+                command_spec(value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{name}: {e}")
     except Exception as e:
         print(f"加载命令文件失败: {e}")
-        cmd_dict = {}
-        cmd_list = []
+        cmd_error = str(e)
+        return False
+
+    selected = cmd_list[selected_cmd_index] if selected_cmd_index < len(cmd_list) else None
+    cmd_dict, cmd_list = commands, list(commands)
+    cmd_error = ""
+    if selected in cmd_list:
+        selected_cmd_index = cmd_list.index(selected)
+    else:
+        selected_cmd_index = min(selected_cmd_index, max(len(cmd_list) - 1, 0))
+    start_cmd_index = min(start_cmd_index, selected_cmd_index)
+    return True
+
+# cmd.json被修改后重新加载（最多每COMMANDS_CHECK_INTERVAL秒检查一次）
+def sync_commands():
+    global cmd_checked_at
+    now = time.monotonic()
+    if now - cmd_checked_at < COMMANDS_CHECK_INTERVAL:
+        return
+    cmd_checked_at = now
+    if commands_stamp() != cmd_file_stamp:
+        if load_commands():
+            print(f"命令文件已重新加载: {cmd_list}")
 
 # 更新便携命令页显示
 def update_command_display():
     global start_cmd_index  # 关键修复
-    image = Image.new('RGB', (WIDTH, HEIGHT), color=(0, 0, 0))  # 黑色背景
+    image = page_background('list')
     draw = ImageDraw.Draw(image)
 
-    # 绘制深粉色边框
-    draw.rectangle([(0, 0), (WIDTH-1, HEIGHT-1)], outline=(255, 105, 180), width=1)
-
-    # 绘制水平网格线（深粉色）
-    for i in range(1, ROWS):
-        y = i * ROW_HEIGHT
-        draw.line([(0, y), (WIDTH, y)], fill=(255, 105, 180), width=1)
-
-    # 第一行 - 页面标题
-    draw.text((WIDTH // 2 - font.getlength("便携命令") // 2, ROW_HEIGHT // 2 - font.size // 2), "便携命令", font=font, fill=(255, 255, 255))
+    # 第一行 - 页面标题，cmd.json无效时显示错误（红色）
+    if cmd_error:
+        text = fit_text(f"cmd.json: {cmd_error}", WIDTH - 4)
+        text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, ROW_HEIGHT // 2 - font.size // 2), text, font, (255, 0, 0))
+    else:
+        text_cache.draw(image, (WIDTH // 2 - text_cache.getlength("便携命令", font) // 2, ROW_HEIGHT // 2 - font.size // 2), "便携命令", font, (255, 255, 255))
 
     # 如果还没有加载命令，显示提示信息
     if not cmd_list:
@@ -625,7 +933,7 @@ def update_command_display():
             y_center = (i + 1) * ROW_HEIGHT - ROW_HEIGHT // 2
             if i == 1:
                 text = "未加载命令文件"
-                draw.text((WIDTH // 2 - font.getlength(text) // 2, y_center - font.size // 2), text, font=font, fill=(255, 255, 255))
+                text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(text, font) // 2, y_center - font.size // 2), text, font, (255, 255, 255))
         return image
 
     # 计算当前显示的命令范围
@@ -643,136 +951,278 @@ def update_command_display():
 
     # 显示周围的命令列表
     for i, cmd in enumerate(cmd_list[start_cmd_index:end_cmd_index]):
-        if i == selected_cmd_index - start_cmd_index:
+        selected = i == selected_cmd_index - start_cmd_index
+        text_color = (0, 0, 0) if selected else (255, 255, 255)
+        y = (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2
+        if selected:
             # 选中的命令，背景为白色，文字为黑色
             draw.rectangle([(0, (i+2)*ROW_HEIGHT - ROW_HEIGHT), (WIDTH, (i+2)*ROW_HEIGHT)], fill=(255, 255, 255))
-            draw.text((WIDTH // 2 - font.getlength(cmd) // 2, (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2), cmd, font=font, fill=(0, 0, 0))
-        else:
-            # 未选中的命令，背景为黑色，文字为白色
-            draw.text((WIDTH // 2 - font.getlength(cmd) // 2, (i+2)*ROW_HEIGHT - ROW_HEIGHT // 2 - font.size // 2), cmd, font=font, fill=(255, 255, 255))
+
+        status, status_color = command_status(cmd)
+        if not status:
+            # 没有运行过的命令居中显示
+            text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(cmd, font) // 2, y), cmd, font, text_color)
+            continue
+
+        # 运行过的命令：名称靠左，运行状态靠右
+        status_width = text_cache.getlength(status, font)
+        name = fit_text(cmd, WIDTH - status_width - 16)
+        text_cache.draw(image, (6, y), name, font, text_color)
+        text_cache.draw(image, (WIDTH - 6 - status_width, y), status, font, text_color if selected else status_color)
+
+    return image
+
+# 命令输出页每页显示的行数
+OUTPUT_ROWS = ROWS - 1
+
+# 命令输出页：第一行为命令名称和运行状态，下面7行滚动显示输出
+def update_output_display():
+    global output_top
+    image = page_background('list')
+
+    run = command_runner.runs.get(output_command)
+    status, status_color = command_status(output_command, elapsed=False)
+    header = fit_text(f"{output_command} {status}", WIDTH - 4)
+    text_cache.draw(image, (WIDTH // 2 - text_cache.getlength(header, font) // 2, ROW_HEIGHT // 2 - font.size // 2), header, font, status_color)
+
+    if run is None:
+        return image
+
+    # 跟随模式显示最新的输出，否则保持滚动位置（已被覆盖的行跳过）
+    ring = run.output
+    if output_follow:
+        output_top = max(ring.first(), ring.total - OUTPUT_ROWS)
+    output_top = max(output_top, ring.first())
+    lines = ring.lines(output_top, OUTPUT_ROWS)
+    if not lines and not run.running():
+        lines = ["(无输出)"]
+    for i, line in enumerate(lines):
+        text = fit_text(line.expandtabs(4), WIDTH - 8)
+        y_center = (i + 2) * ROW_HEIGHT - ROW_HEIGHT // 2
+        text_cache.draw(image, (4, y_center - font.size // 2), text, font, (255, 255, 255))
 
     return image
 
+# 命令最近一次运行的状态文字和颜色，没有运行过时返回空字符串
+# elapsed为False时运行中不显示已运行时间（避免每秒重绘）
+def command_status(name, elapsed=True):
+    run = command_runner.runs.get(name)
+    if run is None:
+        return "", (255, 255, 255)
+    if run.state == RUN_RUNNING:
+        return f"运行中 {run.duration():.0f}s" if elapsed else "运行中", (255, 255, 0)  # 黄色
+    if run.state == RUN_DONE:
+        color = (0, 255, 0) if run.returncode == 0 else (255, 0, 0)  # 绿色或红色
+        return f"退出{run.returncode} {run.duration():.1f}s", color
+    if run.state == RUN_TIMEOUT:
+        return "超时", (255, 0, 0)
+    if run.state == RUN_CANCELLED:
+        return "已取消", (255, 0, 0)
+    return "启动失败", (255, 0, 0)
+
 # 显示启动图片
 def show_splash_image():
     try:
-        # 加载并显示图片
+        # 读取缓存的RGB565启动图片（PNG更新后自动重新生成），直接写入帧缓冲设备
         splash_path = os.path.join(current_dir, 'meimo.png')
-        splash_image = Image.open(splash_path)
-        
-        # 确保图片大小与屏幕匹配
-        splash_image = splash_image.resize((WIDTH, HEIGHT), Image.LANCZOS)
-        
-        # 将图片转换为RGB565格式
-        byte_data = rgb_to_rgb565(splash_image)
-        
-        # 写入帧缓冲设备
-        with open('/dev/fb0', 'wb') as fb:
-            fb.write(byte_data)
-        
-        # 显示图片5秒
-        time.sleep(5)
+        fb.show_rgb565(load_splash(splash_path, fb.width, fb.height))
     except Exception as e:
         print(f"无法显示启动图片：{e}")
 
-# 获取CPU温度
-def get_cpu_temp():
-    try:
-        with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-            temp = f.read()
-            return f"{float(temp)/1000:.1f}°C"
-    except:
-        return "N/A"
-
-# 按键处理函数
-def handle_button_press():
-    global current_page, selected_wifi_index, start_wifi_index, wifi_list, current_wifi_name, wifi_list_scanned, current_wifi_password, selected_key_row, selected_key_col, start_key_row, connection_status
-    
-    current_values = {}
-    
-    for name, (chip_name, pin) in buttons.items():
-        if chip_name not in chips:
-            chips[chip_name] = gpiod.Chip(chip_name)
-        line = chips[chip_name].get_line(pin)
-        if name not in lines:
-            line.request(consumer='button_test', type=gpiod.LINE_REQ_DIR_IN)
-            lines[name] = line
-        current_values[name] = line.get_value()
-    
-    # 检测左右按键按下事件
-    if current_values.get("Left", 1) == 0 and prev_values.get("Left", 1) == 1:
-        if current_page > 0 and current_page != 102:
-            current_page -= 1
-            print("左键按下，切换到页面", current_page)
-    elif current_values.get("Right", 1) == 0 and prev_values.get("Right", 1) == 1:
-        if current_page < 3 and current_page != 102:
-            current_page += 1
-            print("右键按下，切换到页面", current_page)
-    
-    # 检测上/下按键按下事件（在Wi-Fi列表页有效）
-    if current_page == 2:  # Wi-Fi列表页
-        if current_values.get("Down", 1) == 0 and prev_values.get("Down", 1) == 1:
-            if len(wifi_list) > 0:
-                selected_wifi_index = min(selected_wifi_index + 1, len(wifi_list) - 1)
-                print("下键按下，选中的Wi-Fi索引:", selected_wifi_index)
-        elif current_values.get("Up", 1) == 0 and prev_values.get("Up", 1) == 1:
-            if len(wifi_list) > 0:
-                selected_wifi_index = max(selected_wifi_index - 1, 0)
-                print("上键按下，选中的Wi-Fi索引:", selected_wifi_index)
-    
-    # 检测KEY3按下事件（刷新Wi-Fi列表或连接Wi-Fi）
-    if current_values.get("KEY3", 1) == 0 and prev_values.get("KEY3", 1) == 1:
-        if current_page == 2:  # 刷新Wi-Fi列表
-            print("KEY3按下，开始刷新Wi-Fi列表")  # 调试信息
-            temp_wifi_list = scan_wifi()  # 使用临时变量存储扫描结果
-            if temp_wifi_list:  # 检查是否成功扫描到Wi-Fi
-                current_wireless_info = get_wireless_info()
-                current_wifi_name = current_wireless_info['essid']
-                wifi_list = temp_wifi_list
-                wifi_list_scanned = True
-                # 重置Wi-Fi列表页状态
-                start_wifi_index = 0
-                selected_wifi_index = 0
-                print("Wi-Fi列表已更新:", wifi_list)  # 调试信息
-            else:
-                print("未扫描到Wi-Fi列表")  # 调试信息
-        elif current_page == 102:  # 连接Wi-Fi
-            print("KEY3按下，开始连接Wi-Fi")
-            connection_result = connect_wifi(wifi_list[selected_wifi_index], current_wifi_password)
-            if connection_result:
-                connection_status = "连接成功"
-            else:
-                connection_status = "连接失败"
-            # 2秒后自动跳转
-            time.sleep(2)
-            if connection_status == "连接成功":
-                current_page = 1  # 跳转到网络信息页
-            else:
-                current_page = 2  # 跳转到Wi-Fi列表页
-            # 清空密码和连接状态
-            current_wifi_password = ""
-            selected_key_row = 0
-            selected_key_col = 0
-            start_key_row = 0
-            connection_status = ""
-    
-    # 检测KEY1按下事件（进入密码输入页或输入密码字符）
-    if current_values.get("KEY1", 1) == 0 and prev_values.get("KEY1", 1) == 1:
-        if current_page == 2:  # 从Wi-Fi列表页进入密码输入页
-            current_page = 102
-            current_wifi_password = ""
-            selected_key_row = 0
-            selected_key_col = 0
-            start_key_row = 0
-            connection_status = ""  # 重置连接状态
-            print("KEY1按下，进入密码输入页")
-        elif current_page == 102:  # 在密码输入页输入字符
-            selected_char = keyboard_layout[selected_key_row][selected_key_col]
-            current_wifi_password += selected_char
-            print(f"KEY1按下，输入字符: {selected_char}, 当前密码: {current_wifi_password}")
-    
-    # 检测KEY2按下事件（退出密码输入页）
-    if current_values.get("KEY2", 1) == 0 and prev_values.get("KEY2", 1) == 1 and current_page == 102:
+# 启动初始化：显示启动图片期间并行加载字体、按键和命令，并完成第一次指标采样
+def initialize():
+    global keys
+    for source in (sampler, wifi_scanner, wifi_connector, command_runner):
+        source.notify = wakeup.set
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix='init') as pool:
+        tasks = [
+            pool.submit(load_font),
+            pool.submit(load_commands),
+            pool.submit(sampler.start),
+        ]
+        keys_task = pool.submit(open_keys, buttons, INPUT_BACKEND)
+        for task in tasks:
+            task.result()
+        keys = keys_task.result()
+    keys.watch(wakeup.fileno())
+
+# 同步后台扫描到的Wi-Fi列表，尽量保持原来选中的Wi-Fi
+def sync_wifi_list():
+    global wifi_list, wifi_list_version, wifi_list_scanned, selected_wifi_index, start_wifi_index
+    if current_page == 2:
+        wifi_scanner.refresh_if_stale()
+    if wifi_scanner.version == wifi_list_version:
+        return
+    wifi_list_version = wifi_scanner.version
+    if wifi_scanner.networks is wifi_list:
+        return
+    selected = wifi_list[selected_wifi_index].ssid if selected_wifi_index < len(wifi_list) else None
+    wifi_list = wifi_scanner.networks
+    wifi_list_scanned = wifi_scanner.scanned_at is not None
+    ssids = [network.ssid for network in wifi_list]
+    if selected in ssids:
+        selected_wifi_index = ssids.index(selected)
+    else:
+        selected_wifi_index = 0
+        start_wifi_index = 0
+
+# 进程表只在进程页显示时采样
+def sync_process_sampling():
+    sampler.set_period('procs', PROCESS_REFRESH if current_page == 7 else None)
+
+# 连接结果显示到期前的剩余时间（秒），没有等待跳转的连接结果时为None
+def connection_timeout(now):
+    finished_at = wifi_connector.finished_at
+    if finished_at is None or current_page != 102:
+        return None
+    return max(0.0, finished_at + CONNECT_RESULT_HOLD - now)
+
+# 同步后台Wi-Fi连接状态，连接结束后显示结果一段时间再跳转
+def update_connection():
+    global current_page, current_wifi_password, selected_key_row, selected_key_col, start_key_row, connection_status
+    state = wifi_connector.state
+    if state == CONNECT_IDLE:
+        return
+    if current_page != 102:
+        # 已经离开密码输入页（如按KEY2取消）
+        if not wifi_connector.busy():
+            wifi_connector.reset()
+        connection_status = ""
+        return
+
+    connection_status = CONNECT_STATUS_TEXT[state]
+    if state == CONNECT_FAILED and wifi_connector.reason:
+        connection_status += f": {wifi_connector.reason}"
+
+    finished_at = wifi_connector.finished_at
+    if finished_at is not None and time.monotonic() - finished_at >= CONNECT_RESULT_HOLD:
+        if state == CONNECT_CONNECTED:
+            current_page = 1  # 跳转到网络信息页
+        else:
+            print(f"连接Wi-Fi失败: {wifi_connector.reason}")
+            current_page = 2  # 跳转到Wi-Fi列表页
+        # 清空密码和连接状态
+        current_wifi_password = ""
+        selected_key_row = 0
+        selected_key_col = 0
+        start_key_row = 0
+        connection_status = ""
+        wifi_connector.reset()
+
+# 页面数据指纹：指纹不变时跳过重绘、编码和写入
+def network_fingerprint():
+    snapshot = sampler.snapshot
+    return (snapshot.get('wifi'), snapshot.get('addresses', {}).get('wlan0'), snapshot.get('gateway'))
+
+def wifi_list_fingerprint():
+    wifi = sampler.snapshot.get('wifi')
+    return (wifi_scanner.version, selected_wifi_index, wifi and wifi['essid'])
+
+def command_fingerprint():
+    # 有命令运行时每秒更新运行时间
+    tick = int(time.monotonic()) if command_runner.running() else None
+    return (tuple(cmd_list), cmd_error, selected_cmd_index, command_runner.version, tick)
+
+def trend_fingerprint():
+    return (trend_resolution, trend_top, sampler.history.version)
+
+def traffic_fingerprint():
+    return (traffic_interface, sampler.net.history.version)
+
+def storage_fingerprint():
+    # 读写速率每秒更新，挂载点占用的变化在下一次速率更新时一起显示
+    return (storage_top, sampler.disk.history.version)
+
+def process_fingerprint():
+    return (process_sort, sampler.processes.version)
+
+def output_fingerprint():
+    run = command_runner.runs.get(output_command)
+    if run is None:
+        return (output_command, None)
+    return (output_command, id(run), run.state, run.output.total, output_top, output_follow)
+
+# 按键处理函数：依次处理按键事件队列中的按下事件
+def handle_button_press(events):
+    for event in events:
+        if event.pressed:
+            handle_key(event.name)
+
+# 单个按键按下的处理：左右键在页面间切换，其余按键交给当前页面处理
+def handle_key(name):
+    global current_page
+
+    # 摇杆按下作为确认键
+    if name == "Press":
+        name = "KEY1"
+
+    # 检测左右按键按下事件（密码输入页等子页面不参与切换）
+    if name in ("Left", "Right") and current_page in PAGE_ORDER:
+        index = PAGE_ORDER.index(current_page) + (1 if name == "Right" else -1)
+        if 0 <= index < len(PAGE_ORDER):
+            current_page = PAGE_ORDER[index]
+            print(f"{'右' if name == 'Right' else '左'}键按下，切换到页面", current_page)
+        return
+
+    handler = PAGES[current_page].handle_input
+    if handler is not None:
+        handler(name)
+
+# Wi-Fi列表页按键
+def handle_wifi_list_key(name):
+    global current_page, selected_wifi_index, current_wifi_password, selected_key_row, selected_key_col, start_key_row, connection_status, password_ssid
+
+    # 检测上/下按键按下事件
+    if name == "Down":
+        if len(wifi_list) > 0:
+            selected_wifi_index = min(selected_wifi_index + 1, len(wifi_list) - 1)
+            print("下键按下，选中的Wi-Fi索引:", selected_wifi_index)
+    elif name == "Up":
+        if len(wifi_list) > 0:
+            selected_wifi_index = max(selected_wifi_index - 1, 0)
+            print("上键按下，选中的Wi-Fi索引:", selected_wifi_index)
+
+    # 检测KEY3按下事件（刷新Wi-Fi列表）
+    elif name == "KEY3":
+        print("KEY3按下，开始刷新Wi-Fi列表")  # 调试信息
+        if not wifi_scanner.scan():
+            print("Wi-Fi列表正在扫描中")  # 调试信息
+
+    # 检测KEY1按下事件（进入密码输入页）
+    elif name == "KEY1":
+        if selected_wifi_index >= len(wifi_list):
+            return
+        password_ssid = wifi_list[selected_wifi_index].ssid
+        current_page = 102
+        current_wifi_password = ""
+        selected_key_row = 0
+        selected_key_col = 0
+        start_key_row = 0
+        connection_status = ""  # 重置连接状态
+        print("KEY1按下，进入密码输入页")
+
+# 密码输入页按键
+def handle_password_key(name):
+    global current_page, current_wifi_password, selected_key_row, selected_key_col, start_key_row, connection_status
+
+    # 正在连接Wi-Fi时只响应KEY2（取消）
+    if wifi_connector.busy() and name != "KEY2":
+        return
+
+    # 检测KEY3按下事件（连接Wi-Fi）
+    if name == "KEY3":
+        print("KEY3按下，开始连接Wi-Fi")
+        wifi_connector.connect(password_ssid, current_wifi_password)
+
+    # 检测KEY1按下事件（输入密码字符）
+    elif name == "KEY1":
+        selected_char = keyboard_layout[selected_key_row][selected_key_col]
+        current_wifi_password += selected_char
+        print(f"KEY1按下，输入字符: {selected_char}, 当前密码: {current_wifi_password}")
+
+    # 检测KEY2按下事件（取消连接并退出密码输入页）
+    elif name == "KEY2":
+        wifi_connector.cancel()
         current_page = 2
         current_wifi_password = ""
         selected_key_row = 0
@@ -780,92 +1230,285 @@ def handle_button_press():
         start_key_row = 0
         connection_status = ""  # 重置连接状态
         print("KEY2按下，退出密码输入页")
-    
-    # 检测上/下/左/右按键按下事件（在密码输入页有效）
-    if current_page == 102:  # 密码输入页
-        if current_values.get("Down", 1) == 0 and prev_values.get("Down", 1) == 1:
-            selected_key_row = min(selected_key_row + 1, len(keyboard_layout) - 1)
-            print("下键按下，选中的键盘行:", selected_key_row)
-        elif current_values.get("Up", 1) == 0 and prev_values.get("Up", 1) == 1:
-            selected_key_row = max(selected_key_row - 1, 0)
-            print("上键按下，选中的键盘行:", selected_key_row)
-        elif current_values.get("Right", 1) == 0 and prev_values.get("Right", 1) == 1:
-            selected_key_col = min(selected_key_col + 1, len(keyboard_layout[selected_key_row]) - 1)
-            print("右键按下，选中的键盘列:", selected_key_col)
-        elif current_values.get("Left", 1) == 0 and prev_values.get("Left", 1) == 1:
-            selected_key_col = max(selected_key_col - 1, 0)
-            print("左键按下，选中的键盘列:", selected_key_col)
-    
-    # 检测上/下按键按下事件（在便携命令页有效）
-    if current_page == 3:  # 便携命令页
-        global selected_cmd_index, start_cmd_index  # 添加声明全局变量
-        if current_values.get("Down", 1) == 0 and prev_values.get("Down", 1) == 1:
-            selected_cmd_index = min(selected_cmd_index + 1, len(cmd_list) - 1)
-            print("下键按下，选中的命令索引:", selected_cmd_index)
-        elif current_values.get("Up", 1) == 0 and prev_values.get("Up", 1) == 1:
-            selected_cmd_index = max(selected_cmd_index - 1, 0)
-            print("上键按下，选中的命令索引:", selected_cmd_index)
-    # 检测KEY1按下事件（在便携命令页执行命令）
-    if current_values.get("KEY1", 1) == 0 and prev_values.get("KEY1", 1) == 1 and current_page == 3:
+
+    # 检测上/下/左/右按键按下事件
+    elif name == "Down":
+        selected_key_row = min(selected_key_row + 1, len(keyboard_layout) - 1)
+        print("下键按下，选中的键盘行:", selected_key_row)
+    elif name == "Up":
+        selected_key_row = max(selected_key_row - 1, 0)
+        print("上键按下，选中的键盘行:", selected_key_row)
+    elif name == "Right":
+        selected_key_col = min(selected_key_col + 1, len(keyboard_layout[selected_key_row]) - 1)
+        print("右键按下，选中的键盘列:", selected_key_col)
+    elif name == "Left":
+        selected_key_col = max(selected_key_col - 1, 0)
+        print("左键按下，选中的键盘列:", selected_key_col)
+
+# 便携命令页按键
+def handle_command_key(name):
+    global selected_cmd_index
+
+    # 检测上/下按键按下事件
+    if name == "Down":
+        selected_cmd_index = min(selected_cmd_index + 1, len(cmd_list) - 1)
+        print("下键按下，选中的命令索引:", selected_cmd_index)
+    elif name == "Up":
+        selected_cmd_index = max(selected_cmd_index - 1, 0)
+        print("上键按下，选中的命令索引:", selected_cmd_index)
+
+    # 检测KEY1按下事件（在后台执行命令）
+    elif name == "KEY1":
         if selected_cmd_index < len(cmd_list):
-            cmd_name = list(cmd_dict.keys())[selected_cmd_index]
-            cmd = cmd_dict[cmd_name]
+            cmd_name = cmd_list[selected_cmd_index]
             try:
-                result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                print(f"执行命令: {cmd}")
-                print(f"输出: {result.stdout.decode()}")
-                print(f"错误: {result.stderr.decode()}")
-            except Exception as e:
-                print(f"执行命令时发生错误: {e}")
-    
-    prev_values.update(current_values)
+                cmd, timeout = command_spec(cmd_dict[cmd_name])
+            except (TypeError, ValueError) as e:
+                print(f"命令 {cmd_name} 配置错误: {e}")
+                return
+            if command_runner.run(cmd_name, cmd, timeout) is None:
+                print(f"命令 {cmd_name} 正在运行或已达到同时运行上限")
+            else:
+                print(f"KEY1按下，开始执行命令: {cmd}")
+
+    # 检测KEY2按下事件（取消正在运行的命令）
+    elif name == "KEY2":
+        if selected_cmd_index < len(cmd_list) and command_runner.cancel(cmd_list[selected_cmd_index]):
+            print(f"KEY2按下，取消命令: {cmd_list[selected_cmd_index]}")
+
+    # 检测KEY3按下事件（查看命令输出）
+    elif name == "KEY3":
+        if selected_cmd_index < len(cmd_list):
+            open_output(cmd_list[selected_cmd_index])
+
+# 进入命令输出页，从最新的输出开始显示
+def open_output(cmd_name):
+    global current_page, output_command, output_top, output_follow
+    output_command = cmd_name
+    output_top = 0
+    output_follow = True
+    current_page = 103
+    print(f"KEY3按下，查看命令输出: {cmd_name}")
+
+# 命令输出页按键
+def handle_output_key(name):
+    global current_page, output_top, output_follow
+    run = command_runner.runs.get(output_command)
+
+    # 检测上/下按键按下事件（滚动输出，滚动到底部时恢复跟随最新输出）
+    if name in ("Up", "Down") and run is not None:
+        ring = run.output
+        bottom = max(ring.first(), ring.total - OUTPUT_ROWS)
+        if name == "Up":
+            output_top = max(min(output_top, bottom) - 1, ring.first())
+        else:
+            output_top = min(output_top + 1, bottom)
+        output_follow = output_top >= bottom
+
+    # 检测KEY3按下事件（取消正在运行的命令）
+    elif name == "KEY3":
+        if command_runner.cancel(output_command):
+            print(f"KEY3按下，取消命令: {output_command}")
+
+    # 检测KEY2按下事件（返回便携命令页）
+    elif name == "KEY2":
+        current_page = 3
+        print("KEY2按下，返回便携命令页")
+
+# 趋势页按键
+def handle_trend_key(name):
+    global trend_resolution, trend_top
+
+    # 检测上/下按键按下事件（滚动指标列表）
+    if name == "Down":
+        trend_top = min(trend_top + 1, max(0, len(trend_names()) - (ROWS - 1)))
+    elif name == "Up":
+        trend_top = max(trend_top - 1, 0)
+
+    # 检测KEY3按下事件（切换分辨率）
+    elif name == "KEY3":
+        trend_resolution = (trend_resolution + 1) % len(RESOLUTIONS)
+        print(f"KEY3按下，趋势分辨率: {RESOLUTIONS[trend_resolution]} 秒")
+
+# 流量页按键
+def handle_traffic_key(name):
+    global traffic_interface
+
+    # 检测上/下按键按下事件（切换网络接口）
+    if name in ("Up", "Down"):
+        interfaces = traffic_interfaces()
+        if not interfaces:
+            return
+        index = interfaces.index(traffic_interface) if traffic_interface in interfaces else 0
+        index = min(index + 1, len(interfaces) - 1) if name == "Down" else max(index - 1, 0)
+        traffic_interface = interfaces[index]
+        print(f"{'下' if name == 'Down' else '上'}键按下，查看网络接口: {traffic_interface}")
+
+# 存储页按键
+def handle_storage_key(name):
+    global storage_top
+
+    # 检测上/下按键按下事件（滚动挂载点列表）
+    if name == "Down":
+        mounts = sampler.snapshot.get('mounts', ())
+        storage_top = min(storage_top + 1, max(0, len(mounts) - (ROWS - 1) // STORAGE_MOUNT_ROWS))
+    elif name == "Up":
+        storage_top = max(storage_top - 1, 0)
+
+# 进程页按键
+def handle_process_key(name):
+    global process_sort
+
+    # 检测KEY3按下事件（切换CPU/内存排序）
+    if name == "KEY3":
+        process_sort = 'rss' if process_sort == 'cpu' else 'cpu'
+        print(f"KEY3按下，进程排序: {process_sort}")
+
+# 页面注册表：页面索引 -> 渲染函数、按键处理函数和刷新策略
+PAGES = {
+    0: Page('system', update_system_display, refresh=REFRESH_INTERVAL, interval=SYSTEM_REFRESH, align=True),
+    1: Page('network', update_network_display, refresh=REFRESH_ON_CHANGE, fingerprint=network_fingerprint),
+    2: Page('wifi', update_wifi_list_display, handle_wifi_list_key, refresh=REFRESH_ON_CHANGE,
+            fingerprint=wifi_list_fingerprint),
+    3: Page('command', update_command_display, handle_command_key, refresh=REFRESH_ON_CHANGE,
+            fingerprint=command_fingerprint, poll=COMMAND_TICK),
+    4: Page('trend', update_trend_display, handle_trend_key, refresh=REFRESH_ON_CHANGE,
+            fingerprint=trend_fingerprint),
+    5: Page('traffic', update_traffic_display, handle_traffic_key, refresh=REFRESH_ON_CHANGE,
+            fingerprint=traffic_fingerprint),
+    6: Page('storage', update_storage_display, handle_storage_key, refresh=REFRESH_ON_CHANGE,
+            fingerprint=storage_fingerprint),
+    7: Page('processes', update_process_display, handle_process_key, refresh=REFRESH_ON_CHANGE,
+            fingerprint=process_fingerprint),
+    102: Page('password', update_password_input_display, handle_password_key, refresh=REFRESH_ON_INPUT),
+    103: Page('output', update_output_display, handle_output_key, refresh=REFRESH_ON_CHANGE,
+              fingerprint=output_fingerprint, poll=CHANGE_POLL_INTERVAL),
+}
+
+# 左右键切换的页面顺序
+PAGE_ORDER = [0, 7, 1, 5, 2, 3, 4, 6]
+
+# 各页面已渲染的帧数
+def page_frame_counts():
+    return {page.name: page.frames for page in PAGES.values()}
 
 # 注册信号处理函数
 def signal_handler(sig, frame):
     print("脚本已停止")
-    for chip in chips.values():
-        chip.close()
+    if keys is not None:
+        keys.close()
+    if fb is not None:
+        fb.close()
+    if instruments is not None:
+        instruments.close()
+    if exporter is not None:
+        exporter.close()
+    command_runner.shutdown()
     sys.exit(0)
 
-# 注册信号处理函数
-signal.signal(signal.SIGINT, signal_handler)
-signal.signal(signal.SIGTERM, signal_handler)
-signal.signal(signal.SIGTSTP, signal_handler)
-
 # 主循环
-try:
-    # 先显示启动图片
+def main():
+    global fb, keys, instruments, exporter
+
+    # 注册信号处理函数
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGTSTP, signal_handler)
+
+    # 打开并映射帧缓冲设备，先显示启动图片
+    fb = FrameBuffer('/dev/fb0', WIDTH, HEIGHT)
     show_splash_image()
+    splash_at = time.monotonic()
+    print(f"首帧时间: {(splash_at - STARTED_AT) * 1000:.0f} ms")
+
+    # 启用耗时统计，配置错误时不启用，继续运行
+    try:
+        instruments = open_instruments(INSTRUMENT)
+    except (ValueError, OSError) as e:
+        print(f"启用耗时统计失败，已关闭耗时统计: {e}")
+        instruments = None
+    if instruments is not None:
+        fb.observe = instruments.observe
+        sampler.observe = instruments.observe
+
+    # 启用指标导出（只读取采样线程发布的快照），配置错误或地址被占用时不启用，继续运行
+    try:
+        exporter = open_exporter(EXPORT, sampler, instruments)
+    except (ValueError, OSError) as e:
+        print(f"启用指标导出失败，已关闭指标导出: {e}")
+        exporter = None
+
+    try:
+        # 显示启动图片期间完成初始化
+        initialize()
+        time.sleep(max(0.0, splash_at + SPLASH_MIN_TIME - time.monotonic()))
+
+        last_stats = time.monotonic()
+        last_cpu = time.process_time()
+        scheduler = PageScheduler()
+        while True:
+            # 等待按键事件，直到当前页面需要新的一帧或帧统计到期
+            now = time.monotonic()
+            wait = last_stats + STATS_INTERVAL - now
+            for timeout in (scheduler.timeout(PAGES[current_page], now), connection_timeout(now)):
+                if timeout is not None:
+                    wait = min(wait, timeout)
+            wait_start = time.perf_counter()
+            events = keys.read_events(max(0.0, wait))
+            input_start = time.perf_counter()
+            if events:
+                scheduler.notify_input()
+            if wakeup.clear():
+                scheduler.notify_change()
+            handle_button_press(events)
+            sync_wifi_list()
+            sync_commands()
+            sync_process_sampling()
+            status = connection_status
+            update_connection()
+            if connection_status != status:
+                scheduler.invalidate()
+            if instruments is not None:
+                instruments.observe('sleep', input_start - wait_start)
+                instruments.observe('input', time.perf_counter() - input_start)
+
+            # 根据当前页面的刷新策略决定是否重绘
+            page = PAGES[current_page]
+            now = time.monotonic()
+            if scheduler.due(page, now):
+                if instruments is not None:
+                    render_start = time.perf_counter()
+                    image = page.render()
+                    instruments.observe('render', time.perf_counter() - render_start)
+                else:
+                    image = page.render()
+                fb.show(image)
+                if scheduler.page is None:
+                    print(f"可交互时间: {(time.monotonic() - STARTED_AT) * 1000:.0f} ms")
+                scheduler.rendered(page, now)
+
+            # 定期输出帧统计和本进程CPU占用
+            now = time.monotonic()
+            if now - last_stats >= STATS_INTERVAL:
+                cpu = (time.process_time() - last_cpu) / (now - last_stats) * 100
+                last_stats = now
+                last_cpu = time.process_time()
+                stats = fb.stats()
+                print(f"帧统计: {stats['fps']:.1f} 帧/秒, 跳过重绘 {scheduler.skipped} 帧, "
+                      f"跳过写入 {stats['skipped']} 帧, 写入 {stats['bytes_per_sec'] / 1024:.1f} KB/秒, CPU {cpu:.1f}%")
+                text_stats = text_cache.stats()
+                print(f"文字缓存: {text_stats['size']} 条, 精灵命中 {text_stats['sprites_hits']} 次/未命中 "
+                      f"{text_stats['sprites_misses']} 次, 尺寸命中 {text_stats['metrics_hits']} 次/未命中 "
+                      f"{text_stats['metrics_misses']} 次")
+                print(f"各页面帧数: {page_frame_counts()}")
+                if instruments is not None:
+                    print("各阶段P95耗时: " + ", ".join(f"{stage} {ms:.1f} ms" for stage, ms in instruments.summary().items()))
+                scheduler.skipped = 0
+
+    except KeyboardInterrupt:
+        print("退出程序")
+    except Exception as e:
+        print(f"发生错误：{e}")
 
-    # 加载便携命令
-    load_commands()
-
-    while True:
-        # 处理按键
-        handle_button_press()
-        
-        # 根据当前页面索引更新显示
-        if current_page == 0:
-            image = update_system_display()
-        elif current_page == 1:
-            image = update_network_display()
-        elif current_page == 2:
-            image = update_wifi_list_display()
-        elif current_page == 3:
-            image = update_command_display()
-        elif current_page == 102:
-            image = update_password_input_display()
-        
-        # 将图像转换为RGB565格式
-        byte_data = rgb_to_rgb565(image)
-        
-        # 写入帧缓冲设备
-        with open('/dev/fb0', 'wb') as fb:
-            fb.write(byte_data)
-        
-        time.sleep(0.5)
-
-except KeyboardInterrupt:
-    print("退出程序")
-except Exception as e:
-    print(f"发生错误：{e}")
+if __name__ == "__main__":
+    main()
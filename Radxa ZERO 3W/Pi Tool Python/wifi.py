@@ -0,0 +1,271 @@
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from netinfo import decode_ssid_escapes, get_wireless_info
+
+# 扫描到的Wi-Fi：名称、BSSID、信号强度（dBm）、信道、加密方式
+WifiNetwork = namedtuple('WifiNetwork', ['ssid', 'bssid', 'signal', 'channel', 'encryption'])
+
+# 扫描结果缓存有效期（秒），过期后进入Wi-Fi列表页会在后台自动重新扫描
+SCAN_TTL = 60
+
+# iwlist扫描超时（秒）
+SCAN_TIMEOUT = 30
+
+CELL_ADDRESS = re.compile(r'Address: ([0-9A-Fa-f:]{17})')
+CELL_CHANNEL = re.compile(r'Channel[:\s](\d+)')
+CELL_SIGNAL = re.compile(r'Signal level=(-?\d+)(?:/(\d+))?')
+CELL_QUALITY = re.compile(r'Quality=(\d+)/(\d+)')
+CELL_ESSID = re.compile(r'ESSID:"(.*)"')
+
+
+# 判断加密方式
+def _encryption(cell):
+    if 'Encryption key:off' in cell:
+        return 'Open'
+    if 'SAE' in cell:
+        return 'WPA3'
+    if 'WPA2' in cell:
+        return 'WPA2'
+    if 'WPA Version' in cell:
+        return 'WPA'
+    return 'WEP'
+
+
+# 把相对信号强度（0~1）换算为dBm，与NetworkManager的换算相同：-100 dBm为0%，-50 dBm及以上为100%
+def _relative_dbm(value, maximum):
+    return round(min(max(value / maximum, 0), 1) * 50 - 100) if maximum else -100
+
+
+# 信号强度（dBm）：有的驱动只给出相对值（Signal level=70/100），有的没有Signal level，只能用Quality换算
+def _signal(cell):
+    signal = CELL_SIGNAL.search(cell)
+    if signal and signal.group(2) is None:
+        return int(signal.group(1))
+    if signal:
+        return _relative_dbm(int(signal.group(1)), int(signal.group(2)))
+    quality = CELL_QUALITY.search(cell)
+    if quality:
+        return _relative_dbm(int(quality.group(1)), int(quality.group(2)))
+    return -100
+
+
+# 解析iwlist扫描输出，同名Wi-Fi只保留信号最强的一个，按信号强度从强到弱排序
+def parse_scan(output):
+    networks = {}
+    for cell in output.split('Cell ')[1:]:
+        essid = CELL_ESSID.search(cell)
+        if not essid or not essid.group(1):
+            continue
+        ssid = decode_ssid_escapes(essid.group(1))
+        address = CELL_ADDRESS.search(cell)
+        channel = CELL_CHANNEL.search(cell)
+        network = WifiNetwork(
+            ssid=ssid,
+            bssid=address.group(1) if address else '',
+            signal=_signal(cell),
+            channel=int(channel.group(1)) if channel else 0,
+            encryption=_encryption(cell),
+        )
+        if ssid not in networks or network.signal > networks[ssid].signal:
+            networks[ssid] = network
+    return sorted(networks.values(), key=lambda n: n.signal, reverse=True)
+
+
+# 扫描周围Wi-Fi
+def scan_wifi(ifname='wlan0'):
+    result = subprocess.run(['iwlist', ifname, 'scan'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            timeout=SCAN_TIMEOUT, check=True)
+    return parse_scan(result.stdout.decode('utf-8', errors='replace'))
+
+
+# 后台Wi-Fi扫描：扫描在工作线程中进行，界面只读取缓存的结果，不会被阻塞
+class WifiScanner:
+    def __init__(self, ifname='wlan0', ttl=SCAN_TTL):
+        self.ifname = ifname
+        self.ttl = ttl
+        self.networks = []  # 最近一次成功扫描的结果（不含当前连接的Wi-Fi）
+        self.connected = ""  # 扫描时连接的Wi-Fi名称
+        self.scanned_at = None  # 最近一次成功扫描的时间（time.time()）
+        self.scanning = False
+        self.error = None  # 最近一次扫描失败的原因
+        self.version = 0  # 结果或状态每次变化加1
+        self.notify = None  # 结果或状态变化后的回调（如唤醒主循环）
+        self._lock = threading.Lock()
+
+    # 缓存是否仍在有效期内
+    def fresh(self):
+        return self.scanned_at is not None and time.time() - self.scanned_at < self.ttl
+
+    # 启动一次后台扫描，已有扫描在进行时返回False
+    def scan(self):
+        with self._lock:
+            if self.scanning:
+                return False
+            self.scanning = True
+            self.version += 1
+        if self.notify is not None:
+            self.notify()
+        threading.Thread(target=self._worker, name='wifi-scan', daemon=True).start()
+        return True
+
+    # 缓存过期时在后台刷新
+    def refresh_if_stale(self):
+        if self.scanned_at is not None and not self.fresh():
+            self.scan()
+
+    def _worker(self):
+        try:
+            networks = scan_wifi(self.ifname)
+            connected = get_wireless_info(self.ifname)['essid']
+            with self._lock:
+                self.connected = connected
+                self.networks = [n for n in networks if n.ssid != connected]
+                self.scanned_at = time.time()
+                self.error = None
+            print("Wi-Fi列表已更新:", [n.ssid for n in self.networks])  # 调试信息
+        except Exception as e:
+            with self._lock:
+                self.error = str(e)
+            print(f"扫描Wi-Fi失败: {e}")  # 调试信息
+        finally:
+            with self._lock:
+                self.scanning = False
+                self.version += 1
+            if self.notify is not None:
+                self.notify()
+
+
+# 连接超时（秒）
+CONNECT_TIMEOUT = 45
+
+# 连接过程中查询NetworkManager设备状态的间隔（秒）
+CONNECT_POLL_INTERVAL = 0.5
+
+# 连接状态
+CONNECT_IDLE = 'idle'
+CONNECT_ASSOCIATING = 'associating'
+CONNECT_DHCP = 'dhcp'
+CONNECT_CONNECTED = 'connected'
+CONNECT_FAILED = 'failed'
+CONNECT_CANCELLED = 'cancelled'
+
+
+# 查询NetworkManager设备状态码（如 70 表示正在获取IP配置）
+def get_device_state(ifname='wlan0'):
+    try:
+        result = subprocess.run(['nmcli', '-g', 'GENERAL.STATE', 'device', 'show', ifname],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=5)
+        return int(result.stdout.decode().split()[0])
+    except (ValueError, IndexError, OSError, subprocess.SubprocessError):
+        return None
+
+
+# 启动nmcli，密码不放在命令行参数里（其他用户可以从/proc/<pid>/cmdline看到），用--ask从标准输入读取。
+# 密码预先写入管道并关闭写入端，密码错误时nmcli再次询问会读到EOF直接失败，而不是一直等到超时
+def _start_nmcli(argv, password):
+    if not password:
+        return subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    read_fd, write_fd = os.pipe()
+    try:
+        os.write(write_fd, password.encode('utf-8') + b'\n')
+        os.close(write_fd)
+        write_fd = None
+        return subprocess.Popen([argv[0], '--ask'] + argv[1:], stdin=read_fd,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    finally:
+        os.close(read_fd)
+        if write_fd is not None:
+            os.close(write_fd)
+
+
+# 后台Wi-Fi连接：nmcli以参数列表方式调用，连接过程在工作线程中进行并上报实时状态
+class WifiConnector:
+    def __init__(self, ifname='wlan0', timeout=CONNECT_TIMEOUT):
+        self.ifname = ifname
+        self.timeout = timeout
+        self.state = CONNECT_IDLE
+        self.reason = ""  # 失败原因
+        self.ssid = ""
+        self.finished_at = None  # 进入最终状态的时间（time.monotonic()）
+        self.version = 0  # 状态每次变化加1
+        self.notify = None  # 状态变化后的回调（如唤醒主循环）
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    # 是否正在连接
+    def busy(self):
+        return self.state in (CONNECT_ASSOCIATING, CONNECT_DHCP)
+
+    def _set_state(self, state, reason=""):
+        with self._lock:
+            if state == self.state and reason == self.reason:
+                return
+            self.state = state
+            self.reason = reason
+            if state in (CONNECT_CONNECTED, CONNECT_FAILED, CONNECT_CANCELLED):
+                self.finished_at = time.monotonic()
+            self.version += 1
+        if self.notify is not None:
+            self.notify()
+
+    # 开始连接，已有连接在进行时返回False
+    def connect(self, ssid, password):
+        with self._lock:
+            if self.busy():
+                return False
+            self.ssid = ssid
+            self.finished_at = None
+        self._cancel.clear()
+        self._set_state(CONNECT_ASSOCIATING)
+        threading.Thread(target=self._worker, args=(ssid, password), name='wifi-connect', daemon=True).start()
+        return True
+
+    # 取消正在进行的连接
+    def cancel(self):
+        if self.busy():
+            self._cancel.set()
+
+    # 回到空闲状态
+    def reset(self):
+        self._set_state(CONNECT_IDLE)
+        self.finished_at = None
+
+    def _worker(self, ssid, password):
+        argv = ['nmcli', '--wait', str(int(self.timeout)), 'device', 'wifi', 'connect', ssid, 'ifname', self.ifname]
+        try:
+            proc = _start_nmcli(argv, password)
+        except OSError as e:
+            self._set_state(CONNECT_FAILED, str(e))
+            return
+
+        deadline = time.monotonic() + self.timeout
+        while proc.poll() is None:
+            if self._cancel.wait(CONNECT_POLL_INTERVAL):
+                proc.terminate()
+                proc.wait()
+                subprocess.run(['nmcli', 'device', 'disconnect', self.ifname],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self._set_state(CONNECT_CANCELLED)
+                return
+            if time.monotonic() >= deadline:
+                proc.kill()
+                proc.wait()
+                self._set_state(CONNECT_FAILED, "timeout")
+                return
+            # NetworkManager设备状态：40-60 关联认证中，70-90 获取IP配置中
+            state = get_device_state(self.ifname)
+            if state is not None and 70 <= state < 100:
+                self._set_state(CONNECT_DHCP)
+
+        _, stderr = proc.communicate()
+        if proc.returncode == 0:
+            self._set_state(CONNECT_CONNECTED)
+        else:
+            reason = stderr.decode('utf-8', errors='replace').strip().splitlines()
+            reason = reason[-1] if reason else f"exit {proc.returncode}"
+            self._set_state(CONNECT_FAILED, reason.replace('Error: ', ''))